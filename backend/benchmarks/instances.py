@@ -0,0 +1,145 @@
+"""
+Benchmark instances for the route optimizer.
+
+Synthetic instances scatter delivery stops around Metro Vancouver
+population centers with a fixed seed, so every run sees the same stops.
+TSPLIB instances come with their proven optimal tour lengths.
+"""
+import math
+import os
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+
+DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
+
+# Kitchen the synthetic routes start from (the optimizer's default start)
+DEPOT = (49.1042, -122.6604)
+
+# (name, latitude, longitude, share of stops, spread in km)
+METRO_VANCOUVER_CENTERS = (
+    ('Surrey', 49.1913, -122.8490, 0.24, 4.0),
+    ('Vancouver', 49.2627, -123.1207, 0.20, 3.5),
+    ('Burnaby', 49.2488, -122.9805, 0.14, 2.5),
+    ('Richmond', 49.1666, -123.1336, 0.12, 3.0),
+    ('Langley', 49.1044, -122.6600, 0.10, 3.0),
+    ('Coquitlam', 49.2838, -122.7932, 0.10, 2.5),
+    ('Delta', 49.0847, -123.0586, 0.06, 3.0),
+    ('Abbotsford', 49.0504, -122.3045, 0.04, 3.5),
+)
+
+# Proven optimal (closed) tour lengths, from TSPLIB
+TSPLIB_OPTIMA = {
+    'berlin52': 7542,
+    'ulysses16': 6859,
+}
+
+
+def synthetic_instance(stops: int, seed: int = 0) -> Dict:
+    """Seeded delivery stops around Metro Vancouver; coordinates[0] is the depot."""
+    rng = np.random.default_rng(seed + stops)
+    shares = np.array([center[3] for center in METRO_VANCOUVER_CENTERS])
+    which = rng.choice(len(METRO_VANCOUVER_CENTERS), size=stops, p=shares / shares.sum())
+    centers = np.array([(center[1], center[2]) for center in METRO_VANCOUVER_CENTERS])[which]
+    spread_km = np.array([center[4] for center in METRO_VANCOUVER_CENTERS])[which]
+
+    offsets_km = rng.normal(size=(stops, 2)) * spread_km[:, None]
+    latitudes = centers[:, 0] + offsets_km[:, 0] / 111.195
+    longitudes = centers[:, 1] + offsets_km[:, 1] / (111.195 * np.cos(np.radians(centers[:, 0])))
+
+    return {
+        'name': f'metro_vancouver_{stops}',
+        'kind': 'synthetic',
+        'coordinates': [DEPOT] + list(zip(latitudes.tolist(), longitudes.tolist())),
+        'stops': stops,
+        'optimum': None,
+    }
+
+
+def read_tsplib(path: str) -> Tuple[str, str, List[Tuple[float, float]]]:
+    """Parse the name, edge weight type and node coordinates of a TSPLIB file."""
+    name, weight_type, coords = os.path.splitext(os.path.basename(path))[0], None, []
+    in_coords = False
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line == 'EOF':
+                continue
+            if in_coords:
+                _, x, y = line.split()[:3]
+                coords.append((float(x), float(y)))
+            elif line.startswith('NODE_COORD_SECTION'):
+                in_coords = True
+            elif ':' in line:
+                key, value = (part.strip() for part in line.split(':', 1))
+                if key == 'NAME':
+                    name = value
+                elif key == 'EDGE_WEIGHT_TYPE':
+                    weight_type = value
+    return name, weight_type, coords
+
+
+def _geo_radians(value: float) -> float:
+    degrees = int(value)
+    return math.pi * (degrees + 5.0 * (value - degrees) / 3.0) / 180.0
+
+
+def tsplib_matrix(weight_type: str, coords: List[Tuple[float, float]]) -> np.ndarray:
+    """Integer TSPLIB distances (EUC_2D or GEO) as a float32 matrix."""
+    points = np.asarray(coords, dtype=np.float64)
+    if weight_type == 'EUC_2D':
+        diff = points[:, None, :] - points[None, :, :]
+        matrix = np.floor(np.sqrt((diff ** 2).sum(axis=2)) + 0.5)
+    elif weight_type == 'GEO':
+        lat = np.array([_geo_radians(x) for x in points[:, 0]])
+        lon = np.array([_geo_radians(y) for y in points[:, 1]])
+        q1 = np.cos(lon[:, None] - lon[None, :])
+        q2 = np.cos(lat[:, None] - lat[None, :])
+        q3 = np.cos(lat[:, None] + lat[None, :])
+        matrix = np.floor(6378.388 * np.arccos(np.clip(0.5 * ((1 + q1) * q2 - (1 - q1) * q3), -1, 1)) + 1.0)
+    else:
+        raise ValueError(f"Unsupported TSPLIB edge weight type: {weight_type}")
+    np.fill_diagonal(matrix, 0)
+    return matrix.astype(np.float32)
+
+
+def closed_tour_matrix(matrix: np.ndarray) -> Tuple[np.ndarray, float]:
+    """
+    Turn a round trip into an open route the optimizer can solve.
+
+    A copy of node 0 is appended as the last node. Every edge touching it
+    costs the return to node 0 plus a penalty larger than any tour, so the
+    copy is entered once, at the end of the route, and the route's length
+    minus the penalty is the round-trip length. The matrix stays symmetric,
+    which the local search moves rely on.
+
+    Returns:
+        The (n + 1) x (n + 1) matrix and the penalty to subtract
+    """
+    n = len(matrix)
+    penalty = float(matrix.max()) * n + 1
+    closed = np.zeros((n + 1, n + 1), dtype=np.float32)
+    closed[:n, :n] = matrix
+    closed[:n, n] = closed[n, :n] = matrix[:, 0] + penalty
+    closed[n, n] = 0
+    return closed, penalty
+
+
+def tsplib_instance(name: str) -> Dict:
+    """A bundled TSPLIB instance with its distance matrix and optimum."""
+    tsp_name, weight_type, coords = read_tsplib(os.path.join(DATA_DIR, f'{name}.tsp'))
+    # TSPLIB optima are round trips; see closed_tour_matrix
+    matrix, penalty = closed_tour_matrix(tsplib_matrix(weight_type, coords))
+    return {
+        'name': tsp_name,
+        'kind': 'tsplib',
+        'matrix': matrix,
+        'length_offset': penalty,
+        'stops': len(coords),
+        'optimum': TSPLIB_OPTIMA.get(tsp_name),
+    }
+
+
+def default_instances(sizes: Optional[List[int]] = None, seed: int = 0) -> List[Dict]:
+    sizes = sizes or [10, 50, 100, 250, 500, 1000, 2000]
+    return [tsplib_instance(name) for name in sorted(TSPLIB_OPTIMA)] + \
+        [synthetic_instance(size, seed) for size in sizes]
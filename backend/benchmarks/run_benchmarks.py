@@ -0,0 +1,199 @@
+"""
+Route optimizer benchmark and quality regression suite.
+
+Runs every algorithm in ALGORITHMS on the benchmark instances (the exact
+Held-Karp solver only on those small enough for it) and records wall time, peak traced memory (from a second, traced run), route length
+and gap. The gap is measured against the proven optimum for TSPLIB
+instances and against the best route any algorithm found for synthetic
+ones.
+
+Usage (from the backend directory):
+    python -m benchmarks.run_benchmarks --output benchmark_report.json
+    python -m benchmarks.run_benchmarks --compare benchmarks/baseline.json
+    python -m benchmarks.run_benchmarks --save-baseline benchmarks/baseline.json
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.utils.route_optimizer import RouteOptimizer
+from src.utils.local_search import LocalSearch
+from src.utils.held_karp import HELD_KARP_MAX_STOPS, held_karp_path
+from benchmarks.instances import default_instances
+
+
+Coordinates = Optional[List[Tuple[float, float]]]
+
+
+def _nearest_neighbor(optimizer: RouteOptimizer, matrix: np.ndarray, time_budget_ms: float,
+                      coordinates: Coordinates) -> List[int]:
+    return optimizer.nearest_neighbor_tsp(matrix, start_index=0, coordinates=coordinates)
+
+
+def _two_opt(optimizer: RouteOptimizer, matrix: np.ndarray, time_budget_ms: float,
+             coordinates: Coordinates) -> List[int]:
+    route = optimizer.nearest_neighbor_tsp(matrix, start_index=0, coordinates=coordinates)
+    return optimizer.two_opt_improvement(route, matrix, coordinates=coordinates)
+
+
+def _local_search(optimizer: RouteOptimizer, matrix: np.ndarray, time_budget_ms: float,
+                  coordinates: Coordinates) -> List[int]:
+    route = optimizer.nearest_neighbor_tsp(matrix, start_index=0, coordinates=coordinates)
+    return LocalSearch(matrix, coordinates=coordinates).improve(route)
+
+
+def _anytime(optimizer: RouteOptimizer, matrix: np.ndarray, time_budget_ms: float,
+             coordinates: Coordinates) -> List[int]:
+    route = optimizer.nearest_neighbor_tsp(matrix, start_index=0, coordinates=coordinates)
+    route, _ = LocalSearch(matrix, coordinates=coordinates).anytime(route, time_budget_ms, seed=0)
+    return route
+
+
+def _held_karp(optimizer: RouteOptimizer, matrix: np.ndarray, time_budget_ms: float,
+               coordinates: Coordinates) -> List[int]:
+    route, _ = held_karp_path(matrix)
+    return route
+
+
+# Algorithm name -> solver(optimizer, matrix, time_budget_ms, coordinates) returning a
+# route from index 0; coordinates are None for instances given only as a matrix
+ALGORITHMS: Dict[str, Callable[[RouteOptimizer, np.ndarray, float, Coordinates], List[int]]] = {
+    'nearest_neighbor': _nearest_neighbor,
+    'two_opt': _two_opt,
+    'local_search': _local_search,
+    'anytime': _anytime,
+    'held_karp': _held_karp,
+}
+
+# Largest instance (stops besides node 0) an algorithm is run on
+ALGORITHM_MAX_STOPS = {
+    'held_karp': HELD_KARP_MAX_STOPS,
+}
+
+
+def route_length(route: List[int], matrix: np.ndarray) -> float:
+    return float(sum(matrix[route[k], route[k + 1]] for k in range(len(route) - 1)))
+
+
+def run_instance(optimizer: RouteOptimizer, instance: Dict, algorithms: List[str],
+                 time_budget_ms: float) -> List[Dict]:
+    """Benchmark the algorithms on one instance."""
+    matrix = instance.get('matrix')
+    if matrix is None:
+        matrix = optimizer.create_distance_matrix(instance['coordinates'])
+
+    results = []
+    for name in algorithms:
+        if len(matrix) - 1 > ALGORITHM_MAX_STOPS.get(name, len(matrix)):
+            continue
+        solver = ALGORITHMS[name]
+        started = time.perf_counter()
+        route = solver(optimizer, matrix, time_budget_ms, instance.get('coordinates'))
+        wall_ms = (time.perf_counter() - started) * 1000
+
+        # Tracing slows Python down several times, so memory gets its own run
+        tracemalloc.start()
+        solver(optimizer, matrix, time_budget_ms, instance.get('coordinates'))
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        if sorted(route) != list(range(len(matrix))) or route[0] != 0:
+            raise AssertionError(f"{name} returned an invalid route for {instance['name']}")
+        results.append({
+            'instance': instance['name'],
+            'kind': instance['kind'],
+            'stops': instance['stops'],
+            'algorithm': name,
+            'length': round(route_length(route, matrix) - instance.get('length_offset', 0.0), 3),
+            'wall_ms': round(wall_ms, 2),
+            'peak_memory_kb': round(peak / 1024, 1),
+        })
+
+    reference = instance['optimum'] or min(result['length'] for result in results)
+    for result in results:
+        result['reference'] = 'optimum' if instance['optimum'] else 'best_found'
+        result['gap_pct'] = round((result['length'] - reference) / reference * 100, 3) if reference else 0.0
+    return results
+
+
+def compare(results: List[Dict], baseline: Dict, length_tolerance_pct: float,
+            time_tolerance_pct: float, min_time_ms: float = 5.0) -> List[Dict]:
+    """Results that got longer routes or slower runs than the baseline allows."""
+    previous = {(row['instance'], row['algorithm']): row for row in baseline.get('results', [])}
+    regressions = []
+    for row in results:
+        old = previous.get((row['instance'], row['algorithm']))
+        if old is None:
+            continue
+        if row['length'] > old['length'] * (1 + length_tolerance_pct / 100) + 1e-9:
+            regressions.append({'instance': row['instance'], 'algorithm': row['algorithm'],
+                                'metric': 'length', 'baseline': old['length'], 'current': row['length']})
+        if max(row['wall_ms'], old['wall_ms']) >= min_time_ms and \
+                row['wall_ms'] > old['wall_ms'] * (1 + time_tolerance_pct / 100):
+            regressions.append({'instance': row['instance'], 'algorithm': row['algorithm'],
+                                'metric': 'wall_ms', 'baseline': old['wall_ms'], 'current': row['wall_ms']})
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmark the route optimizer')
+    parser.add_argument('--sizes', type=int, nargs='+', help='Synthetic instance sizes (stops)')
+    parser.add_argument('--algorithms', nargs='+', choices=sorted(ALGORITHMS), default=list(ALGORITHMS))
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--time-budget-ms', type=float, default=500, help='Budget for anytime algorithms')
+    parser.add_argument('--output', default='benchmark_report.json', help='Where to write the JSON report')
+    parser.add_argument('--compare', help='Baseline report to check for regressions')
+    parser.add_argument('--save-baseline', help='Also write the report here as the new baseline')
+    parser.add_argument('--length-tolerance-pct', type=float, default=1.0)
+    parser.add_argument('--time-tolerance-pct', type=float, default=50.0)
+    args = parser.parse_args(argv)
+
+    optimizer = RouteOptimizer()
+    results = []
+    for instance in default_instances(args.sizes, args.seed):
+        for row in run_instance(optimizer, instance, args.algorithms, args.time_budget_ms):
+            results.append(row)
+            print(f"{row['instance']:<24} {row['algorithm']:<18} length={row['length']:<12} "
+                  f"gap={row['gap_pct']:>7.2f}%  {row['wall_ms']:>9.1f} ms  {row['peak_memory_kb']:>9.1f} KB")
+
+    report = {
+        'generated_at': datetime.utcnow().isoformat(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'seed': args.seed,
+        'time_budget_ms': args.time_budget_ms,
+        'results': results,
+    }
+
+    status = 0
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.length_tolerance_pct, args.time_tolerance_pct)
+        report['baseline'] = args.compare
+        report['regressions'] = regressions
+        for regression in regressions:
+            print(f"REGRESSION {regression['instance']} {regression['algorithm']} {regression['metric']}: "
+                  f"{regression['baseline']} -> {regression['current']}")
+        if not regressions:
+            print(f"No regressions against {args.compare}")
+        status = 1 if regressions else 0
+
+    for path in filter(None, (args.output, args.save_baseline)):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+    print(f"Report written to {args.output}")
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
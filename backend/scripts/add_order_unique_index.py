@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Add the orders unique index on (subscription_id, order_date, meal_type)
+to a database created before it existed. Order generation refuses to run
+until the index is present.
+
+Duplicate orders must be deleted before the index can be created. By
+default this only lists the orders and deliveries that would be deleted;
+pass --apply to delete them and create the index.
+"""
+
+import argparse
+import os
+import sys
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from main import app
+from src.utils.order_generation import add_order_unique_index, has_order_unique_index
+
+def main(apply=False):
+    """Report duplicate orders and, with apply, delete them and add the index."""
+    with app.app_context():
+        if has_order_unique_index():
+            print("The orders unique index is already present")
+            return
+
+        duplicates = add_order_unique_index(apply=apply)
+        for entry in duplicates:
+            print(f"Order {entry['order_id']} duplicates order {entry['kept_order_id']} "
+                  f"(subscription {entry['subscription_id']}, {entry['order_date']}, {entry['meal_type']}); "
+                  f"deliveries {entry['delivery_ids'] or 'none'}")
+
+        if apply:
+            print(f"Deleted {len(duplicates)} duplicate orders and added the orders unique index")
+        else:
+            print(f"{len(duplicates)} duplicate orders would be deleted; run again with --apply to delete them "
+                  f"and add the index")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--apply', action='store_true',
+                        help='delete the duplicate orders and create the index (default: only report them)')
+    main(apply=parser.parse_args().apply)
@@ -39,7 +39,7 @@ def create_app():
     CORS(app, origins=app.config['CORS_ORIGINS'])
     
     # Import models to ensure they're registered
-    from src.models.database import User, Customer, Plan, Subscription, Order, Delivery, Payment
+    from src.models.database import User, Customer, Plan, Subscription, Order, Delivery, Payment, GeocodeCache, GeocodeMiss, TravelModelParameter, RouteOptimizationJob, Depot
     
     # Register blueprints
     from src.routes.auth import auth_bp
@@ -51,6 +51,7 @@ def create_app():
     from src.routes.payments import payments_bp
     from src.routes.reports import reports_bp
     from src.routes.portal import portal_bp
+    from src.routes.depots import depots_bp
     
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
     app.register_blueprint(customers_bp, url_prefix='/api/customers')
@@ -61,11 +62,18 @@ def create_app():
     app.register_blueprint(payments_bp, url_prefix='/api/payments')
     app.register_blueprint(reports_bp, url_prefix='/api/reports')
     app.register_blueprint(portal_bp, url_prefix='/api/portal')
+    app.register_blueprint(depots_bp, url_prefix='/api/depots')
     
     # Create database tables
     with app.app_context():
         db.create_all()
         
+        # Jobs left queued or running by a previous process will never finish
+        from src.utils.optimization_jobs import fail_stale_jobs
+        abandoned = fail_stale_jobs()
+        if abandoned:
+            print(f"Marked {abandoned} abandoned optimization jobs as failed")
+        
         # Initialize default data if needed
         initialize_default_data()
     
@@ -16,6 +16,10 @@ class Customer(db.Model):
     city = db.Column(db.String(100), nullable=False)
     province = db.Column(db.String(100), nullable=False)
     postal_code = db.Column(db.String(10), nullable=False)
+    latitude = db.Column(db.Float)
+    longitude = db.Column(db.Float)
+    delivery_window_start = db.Column(db.Time)
+    delivery_window_end = db.Column(db.Time)
     delivery_instructions = db.Column(db.Text)
     dietary_restrictions = db.Column(db.Text)
     emergency_contact_name = db.Column(db.String(100))
@@ -42,6 +46,10 @@ class Customer(db.Model):
             'city': self.city,
             'province': self.province,
             'postal_code': self.postal_code,
+            'latitude': self.latitude,
+            'longitude': self.longitude,
+            'delivery_window_start': self.delivery_window_start.strftime('%H:%M') if self.delivery_window_start else None,
+            'delivery_window_end': self.delivery_window_end.strftime('%H:%M') if self.delivery_window_end else None,
             'delivery_instructions': self.delivery_instructions,
             'dietary_restrictions': self.dietary_restrictions,
             'emergency_contact_name': self.emergency_contact_name,
@@ -151,6 +159,9 @@ class Subscription(db.Model):
 
 class Order(db.Model):
     __tablename__ = 'orders'
+    # One order per subscription, day and meal, however many generation runs overlap
+    __table_args__ = (db.UniqueConstraint('subscription_id', 'order_date', 'meal_type',
+                                          name='uq_order_subscription_date_meal'),)
     
     id = db.Column(db.Integer, primary_key=True)
     subscription_id = db.Column(db.Integer, db.ForeignKey('subscriptions.id'), nullable=False)
@@ -194,10 +205,14 @@ class Delivery(db.Model):
     delivery_address = db.Column(db.Text, nullable=False)
     delivery_instructions = db.Column(db.Text)
     assigned_delivery_person_id = db.Column(db.Integer, db.ForeignKey('users.id'))
+    delivery_window_start = db.Column(db.Time)
+    delivery_window_end = db.Column(db.Time)
     estimated_delivery_time = db.Column(db.Time)
     actual_delivery_time = db.Column(db.Time)
     delivery_status = db.Column(db.String(20), default='scheduled')
     route_sequence = db.Column(db.Integer)
+    route_id = db.Column(db.String(64), index=True)
+    depot_id = db.Column(db.Integer, db.ForeignKey('depots.id'))
     delivery_notes = db.Column(db.Text)
     customer_rating = db.Column(db.Integer)
     customer_feedback = db.Column(db.Text)
@@ -213,10 +228,14 @@ class Delivery(db.Model):
             'delivery_address': self.delivery_address,
             'delivery_instructions': self.delivery_instructions,
             'assigned_delivery_person_id': self.assigned_delivery_person_id,
+            'delivery_window_start': self.delivery_window_start.strftime('%H:%M') if self.delivery_window_start else None,
+            'delivery_window_end': self.delivery_window_end.strftime('%H:%M') if self.delivery_window_end else None,
             'estimated_delivery_time': self.estimated_delivery_time.isoformat() if self.estimated_delivery_time else None,
             'actual_delivery_time': self.actual_delivery_time.isoformat() if self.actual_delivery_time else None,
             'delivery_status': self.delivery_status,
             'route_sequence': self.route_sequence,
+            'route_id': self.route_id,
+            'depot_id': self.depot_id,
             'delivery_notes': self.delivery_notes,
             'customer_rating': self.customer_rating,
             'customer_feedback': self.customer_feedback,
@@ -346,3 +365,130 @@ class Expense(db.Model):
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
 
+class GeocodeCache(db.Model):
+    __tablename__ = 'geocode_cache'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    normalized_address = db.Column(db.String(500), unique=True, nullable=False, index=True)
+    latitude = db.Column(db.Float, nullable=False)
+    longitude = db.Column(db.Float, nullable=False)
+    source = db.Column(db.String(50))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'normalized_address': self.normalized_address,
+            'latitude': self.latitude,
+            'longitude': self.longitude,
+            'source': self.source,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+class GeocodeMiss(db.Model):
+    __tablename__ = 'geocode_misses'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    normalized_address = db.Column(db.String(500), unique=True, nullable=False, index=True)
+    attempts = db.Column(db.Integer, nullable=False, default=1)
+    last_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'normalized_address': self.normalized_address,
+            'attempts': self.attempts,
+            'last_attempt_at': self.last_attempt_at.isoformat() if self.last_attempt_at else None
+        }
+
+class TravelModelParameter(db.Model):
+    __tablename__ = 'travel_model_parameters'
+    __table_args__ = (db.UniqueConstraint('scope', 'scope_key', name='uq_travel_model_scope'),)
+    
+    id = db.Column(db.Integer, primary_key=True)
+    scope = db.Column(db.String(20), nullable=False)  # global, zone, driver
+    scope_key = db.Column(db.String(100), nullable=False, default='')
+    service_minutes = db.Column(db.Float, nullable=False)
+    minutes_per_km = db.Column(db.Float, nullable=False)
+    sample_count = db.Column(db.Integer, default=0)
+    fitted_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'scope': self.scope,
+            'scope_key': self.scope_key,
+            'service_minutes': self.service_minutes,
+            'minutes_per_km': self.minutes_per_km,
+            'sample_count': self.sample_count,
+            'fitted_at': self.fitted_at.isoformat() if self.fitted_at else None,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+class Depot(db.Model):
+    __tablename__ = 'depots'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    address = db.Column(db.Text)
+    latitude = db.Column(db.Float, nullable=False)
+    longitude = db.Column(db.Float, nullable=False)
+    max_deliveries = db.Column(db.Integer)  # daily deliveries the kitchen can send out, None = unlimited
+    status = db.Column(db.String(20), default='active')
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    # Relationships
+    deliveries = db.relationship('Delivery', backref='depot', lazy=True)
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'address': self.address,
+            'latitude': self.latitude,
+            'longitude': self.longitude,
+            'max_deliveries': self.max_deliveries,
+            'status': self.status,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+
+class RouteOptimizationJob(db.Model):
+    __tablename__ = 'route_optimization_jobs'
+    
+    id = db.Column(db.String(36), primary_key=True)  # uuid4 hex
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued, running, completed, failed
+    delivery_date = db.Column(db.Date)
+    parameters = db.Column(db.JSON)
+    progress = db.Column(db.JSON)
+    result = db.Column(db.JSON)
+    error = db.Column(db.Text)
+    requested_by = db.Column(db.String(100))
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def to_dict(self, include_result=True):
+        data = {
+            'id': self.id,
+            'status': self.status,
+            'delivery_date': self.delivery_date.isoformat() if self.delivery_date else None,
+            'parameters': self.parameters,
+            'progress': self.progress or {},
+            'error': self.error,
+            'requested_by': self.requested_by,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
+        if include_result:
+            data['result'] = self.result
+        return data
@@ -1,9 +1,44 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, current_app, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from src.models.database import db, Customer
+from src.models.database import db, Customer, RouteOptimizationJob
+from src.utils.geocoding import GeocodeStore, ADDRESS_FIELDS
+from src.utils.optimization_jobs import OptimizationJobRunner
 from datetime import datetime
 
 customers_bp = Blueprint('customers', __name__)
+geocode_store = GeocodeStore()
+# Batch geocoding runs as background jobs (stored with the route optimization
+# jobs), one at a time so they do not compete for the geocoder's rate limit
+geocode_job_runner = OptimizationJobRunner(workers=1)
+GEOCODE_TASK = 'geocode_customers'
+GEOCODE_JOB_CHUNK_SIZE = 100
+
+GEOCODE_WARNING = 'Address could not be geocoded; routing falls back to the postal code until coordinates are set'
+
+def apply_customer_coordinates(customer, data):
+    """
+    Use explicit coordinates from the request, otherwise geocode the address.
+    When the address cannot be resolved the coordinates are cleared, so an
+    old location is never kept for a new address; returns False then.
+    """
+    if data.get('latitude') is not None and data.get('longitude') is not None:
+        customer.latitude = float(data['latitude'])
+        customer.longitude = float(data['longitude'])
+        return True
+    if geocode_store.update_customer_coordinates(customer):
+        return True
+    customer.latitude = customer.longitude = None
+    return False
+
+def apply_delivery_window(customer, data):
+    """Set the preferred delivery window from 'HH:MM' strings (empty clears it)."""
+    for field in ('delivery_window_start', 'delivery_window_end'):
+        if field in data:
+            value = data[field]
+            setattr(customer, field, datetime.strptime(value, '%H:%M').time() if value else None)
+    if customer.delivery_window_start and customer.delivery_window_end and \
+            customer.delivery_window_start > customer.delivery_window_end:
+        raise ValueError('delivery_window_start must be before delivery_window_end')
 
 @customers_bp.route('', methods=['GET'])
 @jwt_required()
@@ -104,16 +139,27 @@ def create_customer():
             emergency_contact_name=data.get('emergency_contact_name'),
             emergency_contact_phone=data.get('emergency_contact_phone')
         )
+        apply_delivery_window(new_customer, data)
+        geocoded = apply_customer_coordinates(new_customer, data)
         
         db.session.add(new_customer)
         db.session.commit()
         
-        return jsonify({
+        response = {
             'success': True,
             'message': 'Customer created successfully',
             'data': new_customer.to_dict()
-        }), 201
+        }
+        if not geocoded:
+            response['warning'] = GEOCODE_WARNING
+        return jsonify(response), 201
         
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
     except Exception as e:
         db.session.rollback()
         return jsonify({
@@ -121,11 +167,92 @@ def create_customer():
             'message': f'Failed to create customer: {str(e)}'
         }), 500
 
+def geocode_missing_customers(parameters, progress):
+    """
+    Background task: resolve coordinates for customers that have none
+    (e.g. after an import), optionally limited to customer_ids. Customers
+    are resolved and committed GEOCODE_JOB_CHUNK_SIZE at a time, so an
+    interrupted job keeps what it already found.
+    """
+    query = Customer.query.filter(db.or_(Customer.latitude.is_(None), Customer.longitude.is_(None)))
+    if parameters.get('customer_ids'):
+        query = query.filter(Customer.id.in_(parameters['customer_ids']))
+    customer_ids = [cid for (cid,) in query.with_entities(Customer.id).order_by(Customer.id).all()]
+    
+    geocoded, unresolved_ids = 0, []
+    for start in range(0, len(customer_ids), GEOCODE_JOB_CHUNK_SIZE):
+        customers = Customer.query.filter(Customer.id.in_(customer_ids[start:start + GEOCODE_JOB_CHUNK_SIZE])).all()
+        geocoded += geocode_store.update_many_customer_coordinates(customers)
+        unresolved_ids.extend(c.id for c in customers if c.latitude is None or c.longitude is None)
+        db.session.commit()
+        progress({'stage': 'geocoding', 'customers_done': start + len(customers),
+                  'customers_total': len(customer_ids)})
+    
+    return {'total': len(customer_ids), 'geocoded': geocoded, 'unresolved_ids': unresolved_ids}
+
+@customers_bp.route('/geocode', methods=['POST'])
+@jwt_required()
+def geocode_customers():
+    """
+    Queue a job resolving coordinates for customers that have none,
+    optionally limited to customer_ids; poll it at /geocode/jobs/<job_id>.
+    Addresses go through the geocode cache first; misses are geocoded
+    concurrently within the rate limit.
+    """
+    try:
+        data = request.get_json(silent=True) or {}
+        parameters = {'task': GEOCODE_TASK,
+                      'customer_ids': [int(cid) for cid in data.get('customer_ids') or []]}
+        
+        job = geocode_job_runner.submit(current_app._get_current_object(), geocode_missing_customers,
+                                        parameters, requested_by=str(get_jwt_identity()))
+        
+        return jsonify({
+            'success': True,
+            'data': job.to_dict(include_result=False)
+        }), 202
+        
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'message': f'Failed to geocode customers: {str(e)}'
+        }), 500
+
+@customers_bp.route('/geocode/jobs/<job_id>', methods=['GET'])
+@jwt_required()
+def get_geocode_job(job_id):
+    """Poll a geocoding job: status and progress, plus the result once completed."""
+    try:
+        job = db.session.get(RouteOptimizationJob, job_id)
+        if not job or (job.parameters or {}).get('task') != GEOCODE_TASK:
+            return jsonify({
+                'success': False,
+                'message': 'Job not found'
+            }), 404
+        
+        return jsonify({
+            'success': True,
+            'data': job.to_dict()
+        }), 200
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Failed to retrieve geocoding job: {str(e)}'
+        }), 500
+
 @customers_bp.route('/<int:customer_id>', methods=['GET'])
 @jwt_required()
 def get_customer(customer_id):
     try:
-        customer = Customer.query.get(customer_id)
+        customer = db.session.get(Customer, customer_id)
         
         if not customer:
             return jsonify({
@@ -154,7 +281,7 @@ def get_customer(customer_id):
 @jwt_required()
 def update_customer(customer_id):
     try:
-        customer = Customer.query.get(customer_id)
+        customer = db.session.get(Customer, customer_id)
         
         if not customer:
             return jsonify({
@@ -182,22 +309,40 @@ def update_customer(customer_id):
                     'message': 'Customer with this email already exists'
                 }), 400
         
+        address_changed = any(
+            field in data and data[field] != getattr(customer, field) for field in ADDRESS_FIELDS
+        )
+        
         # Update customer fields
         for field in ['first_name', 'last_name', 'phone_number', 'email', 'address_line1', 
                      'address_line2', 'city', 'province', 'postal_code', 'delivery_instructions',
                      'dietary_restrictions', 'emergency_contact_name', 'emergency_contact_phone', 'status']:
             if field in data:
                 setattr(customer, field, data[field])
+        apply_delivery_window(customer, data)
+        
+        geocoded = True
+        if address_changed or customer.latitude is None or 'latitude' in data:
+            geocoded = apply_customer_coordinates(customer, data)
         
         customer.updated_at = datetime.utcnow()
         db.session.commit()
         
-        return jsonify({
+        response = {
             'success': True,
             'message': 'Customer updated successfully',
             'data': customer.to_dict()
-        }), 200
+        }
+        if not geocoded:
+            response['warning'] = GEOCODE_WARNING
+        return jsonify(response), 200
         
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
     except Exception as e:
         db.session.rollback()
         return jsonify({
@@ -209,7 +354,7 @@ def update_customer(customer_id):
 @jwt_required()
 def delete_customer(customer_id):
     try:
-        customer = Customer.query.get(customer_id)
+        customer = db.session.get(Customer, customer_id)
         
         if not customer:
             return jsonify({
@@ -238,7 +383,7 @@ def delete_customer(customer_id):
 @jwt_required()
 def get_customer_balance(customer_id):
     try:
-        customer = Customer.query.get(customer_id)
+        customer = db.session.get(Customer, customer_id)
         
         if not customer:
             return jsonify({
@@ -268,7 +413,7 @@ def get_customer_balance(customer_id):
 @jwt_required()
 def add_customer_balance(customer_id):
     try:
-        customer = Customer.query.get(customer_id)
+        customer = db.session.get(Customer, customer_id)
         
         if not customer:
             return jsonify({
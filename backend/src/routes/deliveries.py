@@ -1,12 +1,30 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, Response, current_app, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from ..models.database import db, Delivery, Order, Customer
+from ..models.database import db, Delivery, Depot, Order, Customer, User, TravelModelParameter, RouteOptimizationJob
 from ..utils.route_optimizer import RouteOptimizer
+from ..utils.geocoding import GeocodeStore
+from ..utils.travel_model import TravelModel
+from ..utils.route_persistence import assign_driver, route_assignments, save_route_assignments
+from ..utils.optimization_jobs import FINISHED_STATUSES, OptimizationJobRunner, fail_stale_jobs, is_stale
 from datetime import datetime, date
 import json
+import os
+import time
+from typing import Callable, Dict, Optional
 
 deliveries_bp = Blueprint('deliveries', __name__)
-route_optimizer = RouteOptimizer()
+geocode_store = GeocodeStore()
+# Plan on road-graph distances when a local road graph is configured; the
+# optimizer's last-resort geocodes go through the store's cache and rate limit
+route_optimizer = RouteOptimizer(distance_mode='road' if os.environ.get('ROAD_GRAPH_PATH') else 'haversine',
+                                 geocode_store=geocode_store)
+job_runner = OptimizationJobRunner()
+ROUTE_TASK = 'optimize_route'
+
+# Event streams: longest life, slowest re-read of a job run elsewhere, keep-alive interval
+EVENT_STREAM_MAX_SECONDS = 600
+EVENT_STREAM_MAX_POLL_SECONDS = 5.0
+EVENT_STREAM_KEEP_ALIVE_SECONDS = 15.0
 
 @deliveries_bp.route('', methods=['GET'])
 @jwt_required()
@@ -175,87 +193,344 @@ def update_delivery_status(delivery_id):
         db.session.rollback()
         return jsonify({'success': False, 'message': str(e)}), 500
 
+def plan_delivery_routes(data: Dict, progress: Optional[Callable[[Dict], None]] = None) -> Dict:
+    """
+    Geocode, optimize and store the routes for one delivery date.
+    
+    Shared by the synchronous optimize-route endpoint and background
+    optimization jobs; progress, if given, receives stage updates.
+    """
+    delivery_date = data.get('delivery_date', date.today().isoformat())
+    start_location = data.get('start_location', {
+        'latitude': 49.1042,
+        'longitude': -122.6604,
+        'address': 'Langley, BC, Canada'
+    })
+    
+    # Parse delivery date
+    if isinstance(delivery_date, str):
+        delivery_date = datetime.strptime(delivery_date, '%Y-%m-%d').date()
+    
+    # Get deliveries for the specified date
+    deliveries_query = db.session.query(
+        Delivery.id,
+        Delivery.delivery_address,
+        Delivery.delivery_instructions,
+        Delivery.delivery_zone,
+        Delivery.assigned_delivery_person_id,
+        Delivery.estimated_delivery_time,
+        Delivery.delivery_window_start,
+        Delivery.delivery_window_end,
+        Customer.id.label('customer_id'),
+        Customer.first_name.label('customer_first_name'),
+        Customer.last_name.label('customer_last_name'),
+        Customer.phone_number.label('customer_phone'),
+        Customer.city,
+        Customer.province,
+        Customer.postal_code,
+        Customer.latitude,
+        Customer.longitude,
+        Customer.delivery_window_start.label('customer_window_start'),
+        Customer.delivery_window_end.label('customer_window_end')
+    ).join(Order, Delivery.order_id == Order.id)\
+     .join(Customer, Order.customer_id == Customer.id)\
+     .filter(Delivery.delivery_date == delivery_date)\
+     .filter(Delivery.delivery_status.in_(['scheduled', 'in_transit']))
+    
+    deliveries = deliveries_query.all()
+    
+    if not deliveries:
+        return {
+            'optimized_route': [],
+            'total_distance_km': 0,
+            'estimated_duration': '0h 0m',
+            'total_deliveries': 0,
+            'optimality_gap_pct': 0.0,
+            'message': 'No deliveries found for optimization'
+        }
+    
+    # Customers without coordinates use the offline postal-code table first;
+    # only those it does not cover are geocoded over the network, and those
+    # results are stored so later optimizations read them from the customer row
+    coordinates = {d.customer_id: (d.latitude, d.longitude) for d in deliveries}
+    missing_ids = set()
+    for d in deliveries:
+        latitude, longitude = coordinates[d.customer_id]
+        if (latitude is not None and longitude is not None) or d.customer_id in missing_ids:
+            continue
+        coord = route_optimizer.postal_geocoder.lookup(d.postal_code or '') or \
+            route_optimizer.postal_geocoder.lookup_address(d.delivery_address or '')
+        if coord:
+            coordinates[d.customer_id] = coord
+        else:
+            missing_ids.add(d.customer_id)
+    if missing_ids:
+        customers = Customer.query.filter(Customer.id.in_(missing_ids)).all()
+        report = None
+        if progress:
+            def report(done, total):
+                progress({'stage': 'geocoding', 'stops_geocoded': done, 'stops_total': total})
+        geocode_store.update_many_customer_coordinates(customers, report)
+        for customer in customers:
+            if customer.latitude is not None and customer.longitude is not None:
+                coordinates[customer.id] = (customer.latitude, customer.longitude)
+        db.session.commit()
+    
+    # Convert to list of dictionaries for the optimizer
+    delivery_list = []
+    for delivery in deliveries:
+        latitude, longitude = coordinates[delivery.customer_id]
+        delivery_list.append({
+            'id': delivery.id,
+            'delivery_address': delivery.delivery_address,
+            'delivery_instructions': delivery.delivery_instructions,
+            'delivery_zone': delivery.delivery_zone,
+            'assigned_delivery_person_id': delivery.assigned_delivery_person_id,
+            'customer_name': f"{delivery.customer_first_name} {delivery.customer_last_name}",
+            'customer_phone': delivery.customer_phone,
+            'city': delivery.city,
+            'province': delivery.province,
+            'postal_code': delivery.postal_code,
+            'latitude': latitude,
+            'longitude': longitude,
+            'delivery_window_start': delivery.delivery_window_start or delivery.customer_window_start,
+            'delivery_window_end': delivery.delivery_window_end or delivery.customer_window_end
+        })
+    
+    # Service times and driving speeds fitted from delivery history
+    TravelModel.from_database().annotate(delivery_list)
+    
+    # Optimize the route
+    time_budget_ms = data.get('time_budget_ms')
+    time_budget_ms = int(time_budget_ms) if time_budget_ms is not None else None
+    vehicle_count = data.get('vehicle_count')
+    vehicle_capacity = data.get('vehicle_capacity')
+    drivers = data.get('drivers')
+    depot_ids = data.get('depot_ids')
+    
+    if data.get('multi_depot') or depot_ids:
+        # Serve each delivery from its cheapest kitchen; the kitchens are planned separately
+        depots_query = Depot.query.filter(Depot.id.in_(depot_ids)) if depot_ids else \
+            Depot.query.filter(Depot.status == 'active')
+        depots = [depot.to_dict() for depot in depots_query.order_by(Depot.id).all()]
+        if not depots:
+            raise ValueError('No depots available for multi-depot planning')
+        depot_plans = route_optimizer.optimize_multi_depot_routes(
+            delivery_list, depots,
+            vehicle_count=int(vehicle_count) if vehicle_count else None,
+            vehicle_capacity=int(vehicle_capacity) if vehicle_capacity else None,
+            time_budget_ms=time_budget_ms, plan_key=delivery_date.isoformat()
+        )
+        routes = [route for plan in depot_plans for route in plan['routes']]
+        optimized_result = {
+            'depots': [dict({key: value for key, value in plan.items() if key != 'routes'},
+                            total_routes=len(plan['routes'])) for plan in depot_plans],
+            'routes': routes,
+            'total_routes': len(routes),
+            'total_distance_km': round(sum(route['total_distance_km'] for route in routes), 2),
+            'total_deliveries': sum(plan['total_deliveries'] for plan in depot_plans),
+            'optimality_gap_pct': route_optimizer.combined_optimality_gap(routes)
+        }
+        planned_routes = routes
+    elif drivers:
+        # Min-max workload balancing: [{'id', 'shift_minutes'}] per available driver,
+        # stops are assigned to the drivers as they are written back
+        driver_ids = [driver['id'] for driver in drivers]
+        known_ids = {row.id for row in User.query.filter(User.id.in_(driver_ids)).all()}
+        unknown_ids = [driver_id for driver_id in driver_ids if driver_id not in known_ids]
+        if unknown_ids:
+            raise ValueError(f"Unknown drivers: {unknown_ids}")
+        routes = route_optimizer.optimize_balanced_routes(
+            delivery_list, start_location, drivers, time_budget_ms=time_budget_ms,
+            plan_key=delivery_date.isoformat()
+        )
+        optimized_result = {
+            'routes': routes,
+            'total_routes': len(routes),
+            'total_distance_km': round(sum(route['total_distance_km'] for route in routes), 2),
+            'total_deliveries': sum(route['total_deliveries'] for route in routes),
+            'optimality_gap_pct': route_optimizer.combined_optimality_gap(routes),
+            'longest_workload_minutes': max(route['workload_minutes'] for route in routes),
+            'peak_utilization_pct': max(route['utilization_pct'] for route in routes)
+        }
+        planned_routes = routes
+    elif data.get('time_windows'):
+        # Plan around each delivery's window, reporting any stops that end up late
+        routes = route_optimizer.optimize_time_window_routes(
+            delivery_list, start_location,
+            vehicle_count=int(vehicle_count) if vehicle_count else None,
+            vehicle_capacity=int(vehicle_capacity) if vehicle_capacity else None,
+            route_start_time=data.get('route_start_time', '09:00'),
+            plan_key=delivery_date.isoformat()
+        )
+        optimized_result = {
+            'routes': routes,
+            'total_routes': len(routes),
+            'total_distance_km': round(sum(route['total_distance_km'] for route in routes), 2),
+            'total_deliveries': sum(route['total_deliveries'] for route in routes),
+            'optimality_gap_pct': route_optimizer.combined_optimality_gap(routes),
+            'late_stops': sum(route['late_stops'] for route in routes),
+            'total_lateness_minutes': sum(route['total_lateness_minutes'] for route in routes),
+            'over_capacity_routes': sum(1 for route in routes if route['over_capacity'])
+        }
+        planned_routes = routes
+    elif vehicle_count or vehicle_capacity:
+        # Split the day between vehicles in one capacitated VRP solve,
+        # or by geographic clustering when requested ('kmeans' or 'sweep')
+        routes = route_optimizer.optimize_multiple_routes(
+            delivery_list, start_location,
+            vehicle_count=int(vehicle_count) if vehicle_count else None,
+            vehicle_capacity=int(vehicle_capacity) if vehicle_capacity else None,
+            time_budget_ms=time_budget_ms,
+            clustering=data.get('clustering'),
+            plan_key=delivery_date.isoformat()
+        )
+        optimized_result = {
+            'routes': routes,
+            'total_routes': len(routes),
+            'total_distance_km': round(sum(route['total_distance_km'] for route in routes), 2),
+            'total_deliveries': sum(route.get('total_deliveries', 0) for route in routes),
+            'optimality_gap_pct': route_optimizer.combined_optimality_gap(routes)
+        }
+        planned_routes = routes
+    else:
+        # Keyed by date so a re-plan after late changes patches the last plan
+        optimized_result = route_optimizer.optimize_delivery_route(
+            delivery_list, start_location, time_budget_ms=time_budget_ms,
+            plan_key=delivery_date.isoformat(), progress=progress
+        )
+        planned_routes = [optimized_result]
+    
+    if progress:
+        progress({'stage': 'saving', 'best_distance_km': optimized_result['total_distance_km']})
+    
+    # Store sequence, ETA and route for every stop in one bulk statement
+    save_route_assignments(route_assignments(planned_routes, delivery_date))
+    db.session.commit()
+    return optimized_result
+
 @deliveries_bp.route('/optimize-route', methods=['POST'])
 @jwt_required()
 def optimize_delivery_route():
     try:
-        data = request.get_json()
-        delivery_date = data.get('delivery_date', date.today().isoformat())
-        start_location = data.get('start_location', {
-            'latitude': 49.1042,
-            'longitude': -122.6604,
-            'address': 'Langley, BC, Canada'
-        })
-        
-        # Parse delivery date
-        if isinstance(delivery_date, str):
-            delivery_date = datetime.strptime(delivery_date, '%Y-%m-%d').date()
-        
-        # Get deliveries for the specified date
-        deliveries_query = db.session.query(
-            Delivery.id,
-            Delivery.delivery_address,
-            Delivery.delivery_instructions,
-            Delivery.estimated_delivery_time,
-            Customer.first_name.label('customer_first_name'),
-            Customer.last_name.label('customer_last_name'),
-            Customer.phone_number.label('customer_phone'),
-            Customer.city,
-            Customer.province
-        ).join(Order, Delivery.order_id == Order.id)\
-         .join(Customer, Order.customer_id == Customer.id)\
-         .filter(Delivery.delivery_date == delivery_date)\
-         .filter(Delivery.delivery_status.in_(['scheduled', 'in_transit']))
-        
-        deliveries = deliveries_query.all()
+        optimized_result = plan_delivery_routes(request.get_json())
         
-        if not deliveries:
-            return jsonify({
-                'success': True,
-                'data': {
-                    'optimized_route': [],
-                    'total_distance_km': 0,
-                    'estimated_duration': '0h 0m',
-                    'total_deliveries': 0,
-                    'message': 'No deliveries found for optimization'
-                }
-            })
+        return jsonify({
+            'success': True,
+            'data': optimized_result
+        })
         
-        # Convert to list of dictionaries for the optimizer
-        delivery_list = []
-        for delivery in deliveries:
-            delivery_list.append({
-                'id': delivery.id,
-                'delivery_address': delivery.delivery_address,
-                'delivery_instructions': delivery.delivery_instructions,
-                'customer_name': f"{delivery.customer_first_name} {delivery.customer_last_name}",
-                'customer_phone': delivery.customer_phone,
-                'city': delivery.city,
-                'province': delivery.province
-            })
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+@deliveries_bp.route('/optimize-route/jobs', methods=['POST'])
+@jwt_required()
+def submit_route_optimization_job():
+    """Queue an optimize-route request and return its job id right away."""
+    try:
+        data = request.get_json() or {}
+        delivery_date = data.get('delivery_date', date.today().isoformat())
+        delivery_date = datetime.strptime(delivery_date, '%Y-%m-%d').date()
+        data['delivery_date'] = delivery_date.isoformat()
+        data['task'] = ROUTE_TASK
         
-        # Optimize the route
-        optimized_result = route_optimizer.optimize_delivery_route(delivery_list, start_location)
+        job = job_runner.submit(current_app._get_current_object(), plan_delivery_routes, data,
+                                delivery_date=delivery_date, requested_by=str(get_jwt_identity()))
         
-        # Update delivery sequence in database
-        for route_item in optimized_result['optimized_route']:
-            delivery = Delivery.query.get(route_item['delivery_id'])
-            if delivery:
-                # Update estimated delivery time based on optimized sequence
-                estimated_time = datetime.strptime(route_item['estimated_time'], '%H:%M').time()
-                delivery.estimated_delivery_time = datetime.combine(delivery_date, estimated_time)
+        return jsonify({
+            'success': True,
+            'data': job.to_dict(include_result=False)
+        }), 202
         
-        db.session.commit()
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+def is_route_job(job: Optional[RouteOptimizationJob]) -> bool:
+    """Whether a job row is a route optimization (the table also holds geocoding jobs)."""
+    return job is not None and (job.parameters or {}).get('task', ROUTE_TASK) == ROUTE_TASK
+
+@deliveries_bp.route('/optimize-route/jobs/<job_id>', methods=['GET'])
+@jwt_required()
+def get_route_optimization_job(job_id):
+    """Poll a job: status and progress, plus the result once completed."""
+    try:
+        job = db.session.get(RouteOptimizationJob, job_id)
+        if not is_route_job(job):
+            return jsonify({'success': False, 'message': 'Job not found'}), 404
         
         return jsonify({
             'success': True,
-            'data': optimized_result
+            'data': job.to_dict()
         })
         
     except Exception as e:
-        db.session.rollback()
         return jsonify({'success': False, 'message': str(e)}), 500
 
+@deliveries_bp.route('/optimize-route/jobs/<job_id>/events', methods=['GET'])
+@jwt_required()
+def stream_route_optimization_job(job_id):
+    """
+    Server-Sent Events for a job: a progress event per update and a final
+    done event carrying the stored job. Jobs this process does not track
+    (run by another process, evicted, or left by a restart) are followed
+    by re-reading the job row, backing off up to
+    EVENT_STREAM_MAX_POLL_SECONDS between reads; one that has gone stale
+    is marked failed (see fail_stale_jobs). A stream ends with a
+    timeout event after EVENT_STREAM_MAX_SECONDS; reconnect to go on.
+    """
+    if not is_route_job(db.session.get(RouteOptimizationJob, job_id)):
+        return jsonify({'success': False, 'message': 'Job not found'}), 404
+    app = current_app._get_current_object()
+    
+    def events():
+        version, last_sent, status, progress = 0, None, None, {}
+        started = last_write = time.monotonic()
+        poll_seconds = 0.25
+        while True:
+            state = job_runner.wait(job_id, version, timeout=1.0) if job_runner.owns(job_id) else None
+            if state is not None:
+                version = state['version']
+                status, progress = state['status'], state['progress']
+            elif not job_runner.owns(job_id):
+                if last_sent is not None:
+                    time.sleep(poll_seconds)
+                    poll_seconds = min(poll_seconds * 2, EVENT_STREAM_MAX_POLL_SECONDS)
+                with app.app_context():
+                    job = db.session.get(RouteOptimizationJob, job_id)
+                    if is_stale(job):
+                        fail_stale_jobs()
+                        db.session.refresh(job)
+                    status, progress = job.status, job.progress or {}
+            
+            if status in FINISHED_STATUSES:
+                with app.app_context():
+                    job = db.session.get(RouteOptimizationJob, job_id)
+                    if job.status in FINISHED_STATUSES:
+                        yield f"event: done\ndata: {json.dumps(job.to_dict())}\n\n"
+                        return
+            now = time.monotonic()
+            payload = json.dumps({'status': status, 'progress': progress})
+            if payload != last_sent:
+                last_sent, last_write, poll_seconds = payload, now, 0.25
+                yield f"event: progress\ndata: {payload}\n\n"
+            elif now - last_write >= EVENT_STREAM_KEEP_ALIVE_SECONDS:
+                last_write = now
+                yield ": keep-alive\n\n"
+            if now - started >= EVENT_STREAM_MAX_SECONDS:
+                yield f"event: timeout\ndata: {payload}\n\n"
+                return
+    
+    return Response(events(), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 @deliveries_bp.route('/bulk-assign', methods=['POST'])
 @jwt_required()
 def bulk_assign_deliveries():
@@ -263,21 +538,17 @@ def bulk_assign_deliveries():
         data = request.get_json()
         delivery_ids = data.get('delivery_ids', [])
         driver_id = data.get('driver_id')
-        vehicle_id = data.get('vehicle_id')
         
         if not delivery_ids:
             return jsonify({'success': False, 'message': 'No delivery IDs provided'}), 400
-        
-        updated_count = 0
-        for delivery_id in delivery_ids:
-            delivery = Delivery.query.get(delivery_id)
-            if delivery:
-                if driver_id:
-                    delivery.driver_id = driver_id
-                if vehicle_id:
-                    delivery.vehicle_id = vehicle_id
-                updated_count += 1
-        
+        if data.get('vehicle_id') is not None:
+            # Deliveries have no vehicle column; refuse rather than drop it silently
+            return jsonify({'success': False, 'message': 'Deliveries cannot be assigned to a vehicle; '
+                                                         'assign a driver_id instead'}), 400
+        if driver_id is not None and not db.session.get(User, driver_id):
+            return jsonify({'success': False, 'message': 'Driver not found'}), 404
+        
+        updated_count = assign_driver(delivery_ids, driver_id)
         db.session.commit()
         
         return jsonify({
@@ -290,6 +561,39 @@ def bulk_assign_deliveries():
         db.session.rollback()
         return jsonify({'success': False, 'message': str(e)}), 500
 
+@deliveries_bp.route('/travel-model', methods=['GET'])
+@jwt_required()
+def get_travel_model():
+    try:
+        return jsonify({
+            'success': True,
+            'data': {'parameters': [row.to_dict() for row in TravelModelParameter.query.all()]}
+        })
+        
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+@deliveries_bp.route('/travel-model/fit', methods=['POST'])
+@jwt_required()
+def fit_travel_model():
+    try:
+        data = request.get_json(silent=True) or {}
+        months = int(data.get('months', 6))
+        
+        # Refit service times and speeds from completed deliveries
+        model = TravelModel()
+        model.fit_from_history(months=months)
+        
+        return jsonify({
+            'success': True,
+            'message': f'Fitted {len(model.parameters)} travel model parameter sets',
+            'data': {'parameters': model.to_list()}
+        })
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': str(e)}), 500
+
 @deliveries_bp.route('/zones', methods=['GET'])
 @jwt_required()
 def get_delivery_zones():
@@ -0,0 +1,109 @@
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required
+from src.models.database import db, Depot
+from src.utils.geocoding import GeocodeStore
+
+depots_bp = Blueprint('depots', __name__)
+
+DEPOT_FIELDS = ['name', 'address', 'latitude', 'longitude', 'max_deliveries', 'status']
+
+
+def locate_depot(depot):
+    """Geocode the depot's address when no coordinates were given."""
+    if depot.latitude is not None and depot.longitude is not None:
+        return
+    coord = GeocodeStore().resolve(depot.address) if depot.address else None
+    if not coord:
+        raise ValueError('Depot needs latitude/longitude or an address that can be geocoded')
+    depot.latitude, depot.longitude = coord
+
+@depots_bp.route('', methods=['GET'])
+@jwt_required()
+def get_depots():
+    try:
+        status = request.args.get('status', 'active')
+        
+        query = Depot.query
+        if status:
+            query = query.filter(Depot.status == status)
+        
+        depots = query.order_by(Depot.name).all()
+        
+        return jsonify({
+            'success': True,
+            'data': [depot.to_dict() for depot in depots]
+        }), 200
+    
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Failed to retrieve depots: {str(e)}'
+        }), 500
+
+@depots_bp.route('', methods=['POST'])
+@jwt_required()
+def create_depot():
+    try:
+        data = request.get_json()
+        if not data.get('name'):
+            return jsonify({'success': False, 'message': 'name is required'}), 400
+        
+        new_depot = Depot(**{field: data.get(field) for field in DEPOT_FIELDS if field in data})
+        locate_depot(new_depot)
+        
+        db.session.add(new_depot)
+        db.session.commit()
+        
+        return jsonify({
+            'success': True,
+            'message': 'Depot created successfully',
+            'data': new_depot.to_dict()
+        }), 201
+    
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'message': f'Failed to create depot: {str(e)}'
+        }), 500
+
+@depots_bp.route('/<int:depot_id>', methods=['PUT'])
+@jwt_required()
+def update_depot(depot_id):
+    try:
+        depot = Depot.query.get(depot_id)
+        
+        if not depot:
+            return jsonify({
+                'success': False,
+                'message': 'Depot not found'
+            }), 404
+        
+        data = request.get_json()
+        for field in DEPOT_FIELDS:
+            if field in data:
+                setattr(depot, field, data[field])
+        if 'address' in data and not ('latitude' in data and 'longitude' in data):
+            depot.latitude = depot.longitude = None
+        locate_depot(depot)
+        
+        db.session.commit()
+        
+        return jsonify({
+            'success': True,
+            'message': 'Depot updated successfully',
+            'data': depot.to_dict()
+        }), 200
+    
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({'success': False, 'message': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'message': f'Failed to update depot: {str(e)}'
+        }), 500
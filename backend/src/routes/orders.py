@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required
 from src.models.database import db, Order, Subscription, Customer, Plan, Delivery
+from src.utils.order_generation import generate_orders
 from datetime import datetime, date
 
 orders_bp = Blueprint('orders', __name__)
@@ -69,101 +70,65 @@ def get_orders():
 @orders_bp.route('/bulk-create', methods=['POST'])
 @jwt_required()
 def bulk_create_orders():
+    """
+    Generate orders and deliveries for every active subscription on
+    order_date, or on each day from start_date to end_date. Safe to repeat:
+    existing (subscription, day, meal) orders are skipped by the database.
+    """
     try:
         data = request.get_json()
         order_date_str = data.get('order_date')
+        start_date_str = data.get('start_date') or order_date_str
+        end_date_str = data.get('end_date') or start_date_str
         meal_type = data.get('meal_type', 'lunch')
         exclude_customers = data.get('exclude_customers', [])
         
-        if not order_date_str:
+        if not start_date_str:
             return jsonify({
                 'success': False,
                 'message': 'Order date is required'
             }), 400
         
-        order_date = datetime.strptime(order_date_str, '%Y-%m-%d').date()
-        
-        # Get all active subscriptions for the date
-        active_subscriptions = Subscription.query.filter(
-            Subscription.status == 'active',
-            Subscription.start_date <= order_date,
-            (Subscription.end_date.is_(None)) | (Subscription.end_date >= order_date),
-            (Subscription.pause_start_date.is_(None)) | 
-            (Subscription.pause_start_date > order_date) |
-            (Subscription.pause_end_date < order_date)
-        ).join(Customer).join(Plan).all()
-        
-        # Filter out excluded customers
-        if exclude_customers:
-            active_subscriptions = [s for s in active_subscriptions if s.customer_id not in exclude_customers]
-        
-        # Check if orders already exist for this date
-        existing_orders = Order.query.filter(
-            Order.order_date == order_date,
-            Order.meal_type == meal_type
-        ).all()
-        
-        existing_customer_ids = [o.customer_id for o in existing_orders]
-        
-        created_orders = []
-        skipped_customers = []
-        
-        for subscription in active_subscriptions:
-            # Skip if order already exists for this customer and date
-            if subscription.customer_id in existing_customer_ids:
-                skipped_customers.append({
-                    'customer_id': subscription.customer_id,
-                    'customer_name': f"{subscription.customer.first_name} {subscription.customer.last_name}",
-                    'reason': 'Order already exists'
-                })
-                continue
-            
-            # Create order
-            new_order = Order(
-                subscription_id=subscription.id,
-                customer_id=subscription.customer_id,
-                order_date=order_date,
-                meal_type=meal_type,
-                status='pending',
-                total_amount=subscription.plan.price / subscription.plan.meals_per_week  # Daily rate
-            )
-            
-            db.session.add(new_order)
-            db.session.flush()  # Get the order ID
-            
-            # Create delivery record
-            delivery_address = f"{subscription.customer.address_line1}"
-            if subscription.customer.address_line2:
-                delivery_address += f", {subscription.customer.address_line2}"
-            delivery_address += f", {subscription.customer.city}, {subscription.customer.province} {subscription.customer.postal_code}"
-            
-            new_delivery = Delivery(
-                order_id=new_order.id,
-                delivery_date=order_date,
-                delivery_zone=subscription.customer.city,  # Use city as zone for now
-                delivery_address=delivery_address,
-                delivery_instructions=subscription.customer.delivery_instructions,
-                delivery_status='scheduled'
-            )
-            
-            db.session.add(new_delivery)
-            created_orders.append(new_order.to_dict())
+        start_date = datetime.strptime(start_date_str, '%Y-%m-%d').date()
+        end_date = datetime.strptime(end_date_str, '%Y-%m-%d').date()
         
-        db.session.commit()
+        # Orders and deliveries for every active subscription, committed in chunks
+        created_orders, skipped_customers = generate_orders(start_date, end_date, meal_type, exclude_customers)
+        
+        result = {
+            'created_orders': len(created_orders),
+            'skipped_customers': len(skipped_customers),
+            'meal_type': meal_type
+        }
+        if start_date == end_date:
+            result.update({
+                'order_date': start_date.isoformat(),
+                'orders': created_orders,
+                'skipped': skipped_customers
+            })
+        else:
+            # A range can hold tens of thousands of orders: report counts per day only
+            orders_per_day = {}
+            for order in created_orders:
+                orders_per_day[order['order_date']] = orders_per_day.get(order['order_date'], 0) + 1
+            result.update({
+                'start_date': start_date.isoformat(),
+                'end_date': end_date.isoformat(),
+                'orders_per_day': orders_per_day
+            })
         
         return jsonify({
             'success': True,
             'message': f'Successfully created {len(created_orders)} orders',
-            'data': {
-                'created_orders': len(created_orders),
-                'skipped_customers': len(skipped_customers),
-                'order_date': order_date_str,
-                'meal_type': meal_type,
-                'orders': created_orders,
-                'skipped': skipped_customers
-            }
+            'data': result
         }), 201
         
+    except ValueError as e:
+        db.session.rollback()
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
     except Exception as e:
         db.session.rollback()
         return jsonify({
@@ -0,0 +1,355 @@
+"""
+Offline route planning for a range of delivery dates.
+
+Plans every day without the web app: deliveries come from a CSV/JSON file
+or straight from the database, the days are planned in a process pool and
+the routes are written as JSON or as one CSV row per stop.
+
+Usage (from the backend directory):
+    python -m src.utils.batch_planner plan --from 2026-10-19 --to 2026-10-25 \\
+        --input deliveries.csv --vehicle-count 4 --output week.json
+    python -m src.utils.batch_planner plan --from 2026-10-19 --to 2026-10-25 \\
+        --database-url postgresql://... --format csv --output week.csv
+
+Input files have one delivery per row/object with a delivery_date
+(YYYY-MM-DD) and the fields the optimizer reads: id, latitude, longitude,
+delivery_address, postal_code, city, customer_name, tiffin_count,
+delivery_window_start/end, service_minutes, minutes_per_km.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime
+from typing import Dict, List, Optional, Tuple
+
+from .parallel import default_worker_count
+from .route_optimizer import DISTANCE_MODES, RouteOptimizer
+
+# Fields converted from CSV text; empty cells become None
+NUMERIC_FIELDS = {
+    'id': int,
+    'latitude': float,
+    'longitude': float,
+    'tiffin_count': int,
+    'service_minutes': float,
+    'minutes_per_km': float,
+    'assigned_delivery_person_id': int,
+    'max_deliveries': int,
+}
+
+CSV_COLUMNS = ('delivery_date', 'route_id', 'depot_id', 'vehicle', 'sequence', 'delivery_id', 'customer_name',
+               'address', 'estimated_time', 'latitude', 'longitude')
+
+_planner: Optional[RouteOptimizer] = None
+
+
+def parse_date(value: str) -> date:
+    return datetime.strptime(value, '%Y-%m-%d').date()
+
+
+def read_records(path: str) -> List[Dict]:
+    """Rows of a CSV file, or the objects of a JSON list (or of its 'deliveries' key)."""
+    if path.lower().endswith('.json'):
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        return data.get('deliveries', []) if isinstance(data, dict) else data
+
+    records = []
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            record = {}
+            for key, value in row.items():
+                value = value.strip() if value is not None else ''
+                if key in NUMERIC_FIELDS:
+                    record[key] = NUMERIC_FIELDS[key](value) if value else None
+                else:
+                    record[key] = value or None
+            records.append(record)
+    return records
+
+
+def group_by_day(records: List[Dict], start: date, end: date) -> Dict[date, List[Dict]]:
+    """Deliveries between start and end (inclusive) grouped by delivery_date."""
+    days = {}
+    for record in records:
+        if not record.get('delivery_date'):
+            raise ValueError(f"Delivery {record.get('id')} has no delivery_date")
+        day = parse_date(str(record['delivery_date'])[:10])
+        if start <= day <= end:
+            days.setdefault(day, []).append(record)
+    return days
+
+
+def read_database(database_url: str, start: date, end: date,
+                  multi_depot: bool = False) -> Tuple[Dict[date, List[Dict]], List[Dict]]:
+    """
+    Scheduled and in-transit deliveries between start and end from the
+    database, annotated with the fitted travel model, plus the active
+    depots when multi_depot is set. Uses a plain engine, no app context.
+    """
+    from sqlalchemy import create_engine, select
+    from src.models.database import Customer, Delivery, Depot, Order, TravelModelParameter
+    from .travel_model import TravelModel
+
+    engine = create_engine(database_url)
+    query = select(
+        Delivery.id,
+        Delivery.delivery_date,
+        Delivery.delivery_address,
+        Delivery.delivery_instructions,
+        Delivery.delivery_zone,
+        Delivery.assigned_delivery_person_id,
+        Delivery.delivery_window_start,
+        Delivery.delivery_window_end,
+        Customer.first_name,
+        Customer.last_name,
+        Customer.phone_number,
+        Customer.city,
+        Customer.province,
+        Customer.postal_code,
+        Customer.latitude,
+        Customer.longitude,
+        Customer.delivery_window_start.label('customer_window_start'),
+        Customer.delivery_window_end.label('customer_window_end')
+    ).join(Order, Delivery.order_id == Order.id)\
+     .join(Customer, Order.customer_id == Customer.id)\
+     .where(Delivery.delivery_date.between(start, end))\
+     .where(Delivery.delivery_status.in_(['scheduled', 'in_transit']))\
+     .order_by(Delivery.delivery_date, Delivery.id)
+
+    with engine.connect() as connection:
+        rows = connection.execute(query).all()
+        parameters = connection.execute(select(TravelModelParameter)).all()
+        depots = []
+        if multi_depot:
+            depots = [{'id': depot.id, 'name': depot.name, 'address': depot.address,
+                       'latitude': depot.latitude, 'longitude': depot.longitude,
+                       'max_deliveries': depot.max_deliveries}
+                      for depot in connection.execute(
+                          select(Depot).where(Depot.status == 'active').order_by(Depot.id)).all()]
+    engine.dispose()
+
+    days = {}
+    for row in rows:
+        days.setdefault(row.delivery_date, []).append({
+            'id': row.id,
+            'delivery_address': row.delivery_address,
+            'delivery_instructions': row.delivery_instructions,
+            'delivery_zone': row.delivery_zone,
+            'assigned_delivery_person_id': row.assigned_delivery_person_id,
+            'customer_name': f"{row.first_name} {row.last_name}",
+            'customer_phone': row.phone_number,
+            'city': row.city,
+            'province': row.province,
+            'postal_code': row.postal_code,
+            'latitude': row.latitude,
+            'longitude': row.longitude,
+            'delivery_window_start': row.delivery_window_start or row.customer_window_start,
+            'delivery_window_end': row.delivery_window_end or row.customer_window_end
+        })
+
+    model = TravelModel({(row.scope, row.scope_key): {
+        'service_minutes': row.service_minutes,
+        'minutes_per_km': row.minutes_per_km,
+        'sample_count': row.sample_count
+    } for row in parameters})
+    for deliveries in days.values():
+        model.annotate(deliveries)
+    return days, depots
+
+
+def plan_day(day: date, deliveries: List[Dict], options: Dict) -> Dict:
+    """
+    Plan one day the way the optimize-route endpoint would: by depot,
+    around time windows, split between vehicles, or as a single route.
+    Runs in a worker process; the optimizer is reused between days. A day
+    that cannot be planned (e.g. too little capacity) is returned without
+    routes and with the error.
+    """
+    global _planner
+    from .route_persistence import route_identifier
+
+    if _planner is None or _planner.distance_mode != options['distance_mode']:
+        _planner = RouteOptimizer(distance_mode=options['distance_mode'], workers=1)
+    started = time.perf_counter()
+    plan_key = day.isoformat()
+    try:
+        routes = _plan_routes(deliveries, options, plan_key)
+    except ValueError as e:
+        return {'delivery_date': plan_key, 'routes': [], 'total_routes': 0, 'total_deliveries': len(deliveries),
+                'total_distance_km': 0, 'optimality_gap_pct': 0.0, 'error': str(e),
+                'elapsed_ms': round((time.perf_counter() - started) * 1000, 2)}
+
+    for route in routes:
+        route['route_id'] = route_identifier(day, route.get('vehicle'), route.get('depot_id'))
+    return {
+        'delivery_date': plan_key,
+        'routes': routes,
+        'total_routes': len(routes),
+        'total_deliveries': len(deliveries),
+        'total_distance_km': round(sum(route['total_distance_km'] for route in routes), 2),
+        'optimality_gap_pct': RouteOptimizer.combined_optimality_gap(routes),
+        'elapsed_ms': round((time.perf_counter() - started) * 1000, 2)
+    }
+
+
+def _plan_routes(deliveries: List[Dict], options: Dict, plan_key: str) -> List[Dict]:
+    vehicle_count = options.get('vehicle_count')
+    vehicle_capacity = options.get('vehicle_capacity')
+    if options.get('depots'):
+        plans = _planner.optimize_multi_depot_routes(
+            deliveries, options['depots'], vehicle_count=vehicle_count, vehicle_capacity=vehicle_capacity,
+            time_budget_ms=options.get('time_budget_ms'), plan_key=plan_key
+        )
+        return [route for plan in plans for route in plan['routes']]
+    if options.get('time_windows'):
+        return _planner.optimize_time_window_routes(
+            deliveries, options['start_location'], vehicle_count=vehicle_count,
+            vehicle_capacity=vehicle_capacity, route_start_time=options.get('route_start_time', '09:00'),
+            plan_key=plan_key
+        )
+    if vehicle_count or vehicle_capacity:
+        return _planner.optimize_multiple_routes(
+            deliveries, options['start_location'], vehicle_count=vehicle_count,
+            vehicle_capacity=vehicle_capacity, time_budget_ms=options.get('time_budget_ms'),
+            clustering=options.get('clustering'), plan_key=plan_key
+        )
+    return [_planner.optimize_delivery_route(deliveries, options['start_location'],
+                                             time_budget_ms=options.get('time_budget_ms'), plan_key=plan_key)]
+
+
+def plan_days(days: Dict[date, List[Dict]], options: Dict, workers: int) -> List[Dict]:
+    """Plan each day, in a process pool when more than one worker is given; results in date order."""
+    ordered = sorted(days.items())
+    if workers <= 1 or len(ordered) <= 1:
+        return [plan_day(day, deliveries, options) for day, deliveries in ordered]
+    with ProcessPoolExecutor(max_workers=min(workers, len(ordered))) as pool:
+        futures = [pool.submit(plan_day, day, deliveries, options) for day, deliveries in ordered]
+        return [future.result() for future in futures]
+
+
+def write_json(plans: List[Dict], parameters: Dict, stream):
+    json.dump({
+        'generated_at': datetime.utcnow().isoformat(),
+        'parameters': parameters,
+        'days': plans,
+        'total_distance_km': round(sum(plan['total_distance_km'] for plan in plans), 2),
+        'total_deliveries': sum(plan['total_deliveries'] for plan in plans)
+    }, stream, indent=2, default=str)
+    stream.write('\n')
+
+
+def write_csv(plans: List[Dict], stream):
+    writer = csv.writer(stream)
+    writer.writerow(CSV_COLUMNS)
+    for plan in plans:
+        for route in plan['routes']:
+            for stop in route['optimized_route']:
+                latitude, longitude = stop['coordinates']
+                writer.writerow([plan['delivery_date'], route['route_id'], route.get('depot_id') or '',
+                                 route.get('vehicle') or 1, stop['sequence'], stop['delivery_id'],
+                                 stop['customer_name'], stop['address'], stop['estimated_time'],
+                                 round(latitude, 6), round(longitude, 6)])
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog='python -m src.utils.batch_planner',
+                                     description='Route optimizer command line tools')
+    commands = parser.add_subparsers(dest='command', required=True)
+    plan = commands.add_parser('plan', help='Plan the routes of a range of delivery dates')
+    plan.add_argument('--from', dest='start', type=parse_date, required=True, help='First date (YYYY-MM-DD)')
+    plan.add_argument('--to', dest='end', type=parse_date, help='Last date (default: the first date)')
+    source = plan.add_mutually_exclusive_group()
+    source.add_argument('--input', help='CSV or JSON file of deliveries')
+    source.add_argument('--database-url', help='Read deliveries from this database (default: DATABASE_URL)')
+    plan.add_argument('--format', choices=('json', 'csv'), help='Output format (default: from --output)')
+    plan.add_argument('--output', default='-', help='Output file (default: stdout)')
+    plan.add_argument('--workers', type=int, help='Days planned in parallel (default: ROUTE_OPTIMIZER_WORKERS; '
+                                                  '0 = one per CPU)')
+    plan.add_argument('--distance-mode', choices=DISTANCE_MODES, default='haversine')
+    plan.add_argument('--vehicle-count', type=int)
+    plan.add_argument('--vehicle-capacity', type=int)
+    plan.add_argument('--clustering', choices=('kmeans', 'sweep'))
+    plan.add_argument('--time-windows', action='store_true', help="Plan around delivery windows")
+    plan.add_argument('--route-start-time', default='09:00')
+    plan.add_argument('--time-budget-ms', type=int, help='Anytime search budget per route')
+    plan.add_argument('--start-latitude', type=float,
+                      default=float(os.environ.get('DEFAULT_START_LATITUDE', 49.1042)))
+    plan.add_argument('--start-longitude', type=float,
+                      default=float(os.environ.get('DEFAULT_START_LONGITUDE', -122.6604)))
+    plan.add_argument('--start-address', default=os.environ.get('DEFAULT_START_ADDRESS', 'Langley, BC, Canada'))
+    plan.add_argument('--depots', help='CSV or JSON file of depots (id, name, latitude, longitude, max_deliveries)')
+    plan.add_argument('--multi-depot', action='store_true', help='Plan from the active depots in the database')
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    end = args.end or args.start
+    if end < args.start:
+        print('--to must not be before --from', file=sys.stderr)
+        return 2
+
+    depots = read_records(args.depots) if args.depots else []
+    if args.input:
+        days = group_by_day(read_records(args.input), args.start, end)
+    else:
+        database_url = args.database_url or os.environ.get('DATABASE_URL')
+        if not database_url:
+            print('Give --input, --database-url or set DATABASE_URL', file=sys.stderr)
+            return 2
+        days, active_depots = read_database(database_url, args.start, end, args.multi_depot and not depots)
+        depots = depots or active_depots
+    if args.multi_depot and not depots:
+        print('No depots available for multi-depot planning', file=sys.stderr)
+        return 2
+
+    options = {
+        'distance_mode': args.distance_mode,
+        'vehicle_count': args.vehicle_count,
+        'vehicle_capacity': args.vehicle_capacity,
+        'clustering': args.clustering,
+        'time_windows': args.time_windows,
+        'route_start_time': args.route_start_time,
+        'time_budget_ms': args.time_budget_ms,
+        'start_location': {'latitude': args.start_latitude, 'longitude': args.start_longitude,
+                           'address': args.start_address},
+        'depots': depots
+    }
+    workers = args.workers if args.workers is not None else default_worker_count()
+    if workers <= 0:
+        workers = os.cpu_count() or 1
+
+    started = time.perf_counter()
+    plans = plan_days(days, options, workers)
+    for plan in plans:
+        if plan.get('error'):
+            print(f"{plan['delivery_date']}: not planned: {plan['error']}", file=sys.stderr)
+            continue
+        print(f"{plan['delivery_date']}: {plan['total_deliveries']} deliveries, {plan['total_routes']} routes, "
+              f"{plan['total_distance_km']} km (gap {plan['optimality_gap_pct']}%) in "
+              f"{plan['elapsed_ms'] / 1000:.1f}s", file=sys.stderr)
+    print(f"Planned {len(plans)} days in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+    output_format = args.format or ('csv' if args.output.lower().endswith('.csv') else 'json')
+    parameters = dict({key: value for key, value in options.items() if key != 'depots'},
+                      start_date=args.start.isoformat(), end_date=end.isoformat(),
+                      depots=[depot.get('id') for depot in depots])
+    stream = sys.stdout if args.output == '-' else open(args.output, 'w', newline='', encoding='utf-8')
+    try:
+        if output_format == 'csv':
+            write_csv(plans, stream)
+        else:
+            write_json(plans, parameters, stream)
+    finally:
+        if stream is not sys.stdout:
+            stream.close()
+    return 1 if any(plan.get('error') for plan in plans) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
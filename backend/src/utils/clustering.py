@@ -0,0 +1,230 @@
+import math
+from typing import Optional, Sequence, Tuple
+import numpy as np
+
+CLUSTERING_METHODS = ('kmeans', 'sweep')
+
+KM_PER_DEGREE = 111.195
+
+
+def project_coordinates(coordinates, origin: Optional[Tuple[float, float]] = None) -> np.ndarray:
+    """
+    Project (lat, lon) pairs onto a local plane in kilometers.
+
+    Equirectangular projection around the origin (default: the mean of the
+    points); accurate to well under a percent across a metro area, which is
+    all clustering needs.
+    """
+    coords = np.asarray(coordinates, dtype=np.float64).reshape(-1, 2)
+    if origin is None:
+        origin = coords.mean(axis=0) if len(coords) else (0.0, 0.0)
+    lat0, lon0 = origin
+    x = (coords[:, 1] - lon0) * KM_PER_DEGREE * math.cos(math.radians(lat0))
+    y = (coords[:, 0] - lat0) * KM_PER_DEGREE
+    return np.column_stack([x, y])
+
+
+def cluster_count(demands: np.ndarray, capacity: Optional[int], cluster_count: Optional[int]) -> int:
+    """Clusters needed: the requested count, or enough to respect the capacity."""
+    if cluster_count:
+        return max(1, min(int(cluster_count), len(demands)))
+    if not capacity:
+        return 1
+    return max(1, min(math.ceil(demands.sum() / capacity), len(demands)))
+
+
+def capacitated_kmeans(coordinates, demands: Optional[Sequence[int]] = None, capacity: Optional[int] = None,
+                       k: Optional[int] = None, max_iter: int = 15, seed: int = 0) -> np.ndarray:
+    """
+    Split points into k compact clusters of roughly equal demand.
+
+    Centers are seeded with k-means++ and refined Lloyd-style, except that
+    the assignment step is capacity constrained: points are assigned in
+    order of regret (how much farther their second-best center is) to the
+    nearest center with room left. Each cluster holds at most
+    ceil(total demand / k) unless a single demand is larger than that.
+    When a capacity is given, a point that fits in no cluster (uneven
+    demands need not pack into ceil(total / capacity) clusters) starts a
+    new one at its position rather than overfilling one.
+
+    Args:
+        coordinates: (n, 2) array of latitude/longitude pairs
+        demands: Load of each point (default 1)
+        capacity: Maximum load per cluster; sets k when k is not given
+        k: Number of clusters (raised if the capacity requires more)
+        max_iter: Maximum assignment/update rounds
+        seed: Seed for the k-means++ initialization
+
+    Returns:
+        Cluster label (0, 1, ...) for each point; labels past k - 1 are the
+        clusters the capacity required, and a label may end up unused
+    """
+    points = project_coordinates(coordinates)
+    n = len(points)
+    demands = np.ones(n, dtype=np.int64) if demands is None else np.asarray(demands, dtype=np.int64)
+    if n == 0:
+        return np.zeros(0, dtype=np.int64)
+    k = cluster_count(demands, capacity, k)
+    if k == 1:
+        return np.zeros(n, dtype=np.int64)
+
+    limit = max(math.ceil(demands.sum() / k), int(demands.max()))
+    if capacity:
+        limit = min(limit, max(int(capacity), int(demands.max())))
+    rng = np.random.default_rng(seed)
+
+    # k-means++ seeding
+    centers = np.empty((k, 2))
+    centers[0] = points[rng.integers(n)]
+    closest = ((points - centers[0]) ** 2).sum(axis=1)
+    for c in range(1, k):
+        total = closest.sum()
+        index = rng.choice(n, p=closest / total) if total > 0 else rng.integers(n)
+        centers[c] = points[index]
+        closest = np.minimum(closest, ((points - centers[c]) ** 2).sum(axis=1))
+
+    # Most points land in one of their few nearest clusters; the full
+    # ranking is only computed for points whose candidates are all full
+    labels = np.full(n, -1, dtype=np.int64)
+    for _ in range(max_iter):
+        candidate_count = min(k, 8)
+        dist = (np.subtract.outer(points[:, 0], centers[:, 0]) ** 2 +
+                np.subtract.outer(points[:, 1], centers[:, 1]) ** 2)
+        candidates = np.argpartition(dist, candidate_count - 1, axis=1)[:, :candidate_count]
+        candidate_dist = np.take_along_axis(dist, candidates, axis=1)
+        ranking = np.argsort(candidate_dist, axis=1)
+        candidates = np.take_along_axis(candidates, ranking, axis=1)
+        candidate_dist = np.take_along_axis(candidate_dist, ranking, axis=1)
+        regret = candidate_dist[:, 1] - candidate_dist[:, 0]
+
+        new_labels = np.empty(n, dtype=np.int64)
+        load = [0] * k
+        candidate_lists = candidates.tolist()
+        demand_list = demands.tolist()
+        for p in np.argsort(-regret, kind='stable').tolist():
+            demand = demand_list[p]
+            chosen = None
+            for c in candidate_lists[p]:
+                if load[c] + demand <= limit:
+                    chosen = c
+                    break
+            if chosen is None:
+                # Also ranks the clusters opened below, which dist lacks
+                nearest = np.argsort(((centers - points[p]) ** 2).sum(axis=1)).tolist()
+                chosen = next((c for c in nearest if load[c] + demand <= limit), None)
+                if chosen is None and capacity:
+                    chosen = next((c for c in nearest if load[c] + demand <= capacity), None)
+            if chosen is None and capacity:
+                # Nothing has room (uneven demands): open a cluster here
+                centers = np.vstack([centers, points[p]])
+                load.append(0)
+                chosen = k
+                k += 1
+            elif chosen is None:
+                # Nothing has room (uneven demands): take the emptiest cluster
+                chosen = load.index(min(load))
+            new_labels[p] = chosen
+            load[chosen] += demand
+
+        if np.array_equal(new_labels, labels):
+            break
+        labels = new_labels
+
+        counts = np.bincount(labels, minlength=k)
+        sums_x = np.bincount(labels, weights=points[:, 0], minlength=k)
+        sums_y = np.bincount(labels, weights=points[:, 1], minlength=k)
+        filled = counts > 0
+        centers[filled, 0] = sums_x[filled] / counts[filled]
+        centers[filled, 1] = sums_y[filled] / counts[filled]
+
+    return labels
+
+
+def polar_sweep(coordinates, depot: Tuple[float, float], demands: Optional[Sequence[int]] = None,
+                capacity: Optional[int] = None, k: Optional[int] = None) -> np.ndarray:
+    """
+    Split points into k angular sectors around the depot of roughly equal demand.
+
+    The sweep starts at the widest angular gap between points, so a sector
+    never straddles the emptiest direction, and cuts the sorted points by
+    cumulative demand. With a capacity, a sector is also cut before the
+    point that would overfill it, which can add sectors beyond k.
+
+    Returns:
+        Cluster label (0, 1, ...) for each point, numbered in sweep order
+    """
+    points = project_coordinates(coordinates, origin=depot)
+    n = len(points)
+    demands = np.ones(n, dtype=np.int64) if demands is None else np.asarray(demands, dtype=np.int64)
+    if n == 0:
+        return np.zeros(0, dtype=np.int64)
+    k = cluster_count(demands, capacity, k)
+
+    angles = np.arctan2(points[:, 1], points[:, 0])
+    order = np.argsort(angles, kind='stable')
+    sorted_angles = angles[order]
+    gaps = np.diff(np.append(sorted_angles, sorted_angles[0] + 2 * np.pi))
+    order = np.roll(order, -(int(np.argmax(gaps)) + 1))
+
+    total = demands.sum()
+    before = np.cumsum(demands[order]) - demands[order]
+    sectors = np.minimum(before * k // total, k - 1)
+    if capacity:
+        cut, label, load, previous = [], 0, 0, 0
+        for sector, demand in zip(sectors.tolist(), demands[order].tolist()):
+            if load and (sector != previous or load + demand > capacity):
+                label += 1
+                load = 0
+            cut.append(label)
+            load += demand
+            previous = sector
+        sectors = np.asarray(cut, dtype=np.int64)
+    labels = np.empty(n, dtype=np.int64)
+    labels[order] = sectors
+    return labels
+
+
+def assign_to_depots(depot_distances: np.ndarray, capacities: Optional[Sequence[Optional[int]]] = None,
+                     demands: Optional[Sequence[int]] = None) -> np.ndarray:
+    """
+    Assign each point to the depot that serves it most cheaply.
+
+    Without capacities every point goes to its nearest depot. With them,
+    points are placed in order of regret (how much more the second-nearest
+    depot costs), so points with a clear best depot get it first and the
+    overflow of a full depot goes to the points that lose least by moving.
+
+    Args:
+        depot_distances: (n, m) cost of serving each point from each depot
+        capacities: Maximum demand per depot (None = unlimited)
+        demands: Load of each point (default 1)
+
+    Returns:
+        Depot index (0..m-1) for each point
+    """
+    costs = np.asarray(depot_distances, dtype=np.float64)
+    n, m = costs.shape
+    nearest = costs.argmin(axis=1) if m else np.zeros(n, dtype=np.int64)
+    if not capacities or all(capacity is None for capacity in capacities) or m <= 1:
+        return nearest.astype(np.int64)
+
+    demands = np.ones(n, dtype=np.int64) if demands is None else np.asarray(demands, dtype=np.int64)
+    limits = [math.inf if capacity is None else int(capacity) for capacity in capacities]
+    if sum(limits) < demands.sum():
+        raise ValueError(f"{int(demands.sum())} deliveries exceed the combined depot capacity of {sum(limits)}")
+
+    ranking = np.argsort(costs, axis=1)
+    ranked = np.take_along_axis(costs, ranking, axis=1)
+    regret = ranked[:, 1] - ranked[:, 0]
+    labels = np.empty(n, dtype=np.int64)
+    load = [0] * m
+    ranking_list = ranking.tolist()
+    demand_list = demands.tolist()
+    for p in np.argsort(-regret, kind='stable').tolist():
+        chosen = next((d for d in ranking_list[p] if load[d] + demand_list[p] <= limits[d]), None)
+        if chosen is None:
+            # Uneven demands can strand a point: take the depot with the most room
+            chosen = max(range(m), key=lambda d: limits[d] - load[d])
+        labels[p] = chosen
+        load[chosen] += demand_list[p]
+    return labels
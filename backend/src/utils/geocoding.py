@@ -0,0 +1,294 @@
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from geopy.geocoders import Nominatim
+from src.models.database import db, GeocodeCache, GeocodeMiss
+
+ADDRESS_FIELDS = ('address_line1', 'address_line2', 'city', 'province', 'postal_code')
+
+# The public Nominatim service allows one request per second; raise
+# GEOCODER_RATE_LIMIT for a self-hosted or commercial backend
+DEFAULT_REQUESTS_PER_SECOND = 1.0
+DEFAULT_CONCURRENCY = 4
+
+# Cache keys per IN (...) query
+LOOKUP_CHUNK_SIZE = 500
+
+# Addresses the geocoder found nothing for are not asked again for this long
+# (GEOCODE_MISS_TTL_HOURS)
+DEFAULT_MISS_TTL_HOURS = 24 * 7
+
+
+def normalize_address(address: str) -> str:
+    """
+    Canonical form of an address used as the geocode cache key.
+    Case, punctuation and repeated whitespace do not change the key.
+    """
+    address = (address or '').lower()
+    address = re.sub(r'[^\w\s]', ' ', address)
+    return ' '.join(address.split())
+
+
+def format_customer_address(customer) -> str:
+    """Build the single-line delivery address for a customer."""
+    address = f"{customer.address_line1}"
+    if customer.address_line2:
+        address += f", {customer.address_line2}"
+    address += f", {customer.city}, {customer.province} {customer.postal_code}"
+    return address
+
+
+def default_geocoder():
+    """
+    Nominatim geocoder, pointed at GEOCODER_DOMAIN when set (a self-hosted
+    instance, or a local stand-in server; GEOCODER_SCHEME defaults to https).
+    """
+    domain = os.environ.get('GEOCODER_DOMAIN')
+    if domain:
+        return Nominatim(user_agent="tiffin_crm", domain=domain,
+                         scheme=os.environ.get('GEOCODER_SCHEME', 'https'))
+    return Nominatim(user_agent="tiffin_crm")
+
+
+def _env_number(name: str, default: float) -> float:
+    try:
+        return float(os.environ.get(name) or default)
+    except ValueError:
+        return default
+
+
+class RateLimiter:
+    """
+    Spaces calls at least 1 / requests_per_second apart, across threads.
+    A rate of 0 or less disables the limit.
+    """
+
+    def __init__(self, requests_per_second: float):
+        self.interval = 1.0 / requests_per_second if requests_per_second > 0 else 0.0
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next)
+            self._next = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class GeocodeStore:
+    """
+    Address geocoding backed by the persistent geocode_cache table.
+    Network lookups only happen for addresses that have never been resolved.
+
+    The geocoder is any object with geopy's geocode(address, timeout=...)
+    method. Network lookups share one rate limiter; batches of addresses
+    are resolved by resolve_many(), which runs the misses on a small
+    thread pool while the calling thread does all database work.
+    Addresses the geocoder answered with no result are recorded in
+    geocode_misses and skipped for miss_ttl_hours; network errors are not
+    recorded, so those addresses are retried on the next call.
+    """
+
+    def __init__(self, geocoder=None, timeout: int = 10, requests_per_second: Optional[float] = None,
+                 concurrency: Optional[int] = None, miss_ttl_hours: Optional[float] = None):
+        self.geocoder = geocoder or default_geocoder()
+        self.timeout = timeout
+        if requests_per_second is None:
+            requests_per_second = _env_number('GEOCODER_RATE_LIMIT', DEFAULT_REQUESTS_PER_SECOND)
+        self.rate_limiter = RateLimiter(requests_per_second)
+        self.concurrency = max(1, int(concurrency or _env_number('GEOCODER_CONCURRENCY', DEFAULT_CONCURRENCY)))
+        if miss_ttl_hours is None:
+            miss_ttl_hours = _env_number('GEOCODE_MISS_TTL_HOURS', DEFAULT_MISS_TTL_HOURS)
+        self.miss_ttl = timedelta(hours=miss_ttl_hours)
+
+    def lookup(self, address: str) -> Optional[Tuple[float, float]]:
+        """Return cached coordinates for an address without touching the network."""
+        key = normalize_address(address)
+        if not key:
+            return None
+        entry = GeocodeCache.query.filter_by(normalized_address=key).first()
+        if entry:
+            return (entry.latitude, entry.longitude)
+        return None
+
+    def save(self, address: str, coord: Tuple[float, float], source: str = 'nominatim'):
+        """Store coordinates for an address, replacing any previous entry."""
+        key = normalize_address(address)
+        if not key:
+            return
+        entry = GeocodeCache.query.filter_by(normalized_address=key).first()
+        if entry is None:
+            entry = GeocodeCache(normalized_address=key)
+            db.session.add(entry)
+        entry.latitude, entry.longitude = coord
+        entry.source = source
+
+    def lookup_many(self, addresses: Iterable[str]) -> Dict[str, Tuple[float, float]]:
+        """Cached coordinates for many addresses, keyed by normalized address."""
+        return {key: (entry.latitude, entry.longitude)
+                for key, entry in self._entries({normalize_address(address) for address in addresses}).items()}
+
+    def _entries(self, keys: Iterable[str]) -> Dict[str, GeocodeCache]:
+        keys = [key for key in keys if key]
+        entries = {}
+        for start in range(0, len(keys), LOOKUP_CHUNK_SIZE):
+            chunk = keys[start:start + LOOKUP_CHUNK_SIZE]
+            for entry in GeocodeCache.query.filter(GeocodeCache.normalized_address.in_(chunk)).all():
+                entries[entry.normalized_address] = entry
+        return entries
+
+    def save_many(self, coords: Dict[str, Tuple[float, float]], source: str = 'nominatim'):
+        """Store coordinates for many normalized addresses, replacing previous entries."""
+        existing = self._entries(coords)
+        for key, coord in coords.items():
+            entry = existing.get(key)
+            if entry is None:
+                entry = GeocodeCache(normalized_address=key)
+                db.session.add(entry)
+            entry.latitude, entry.longitude = coord
+            entry.source = source
+
+    def recent_misses(self, keys: Iterable[str]) -> set:
+        """Normalized addresses the geocoder found nothing for within the miss TTL."""
+        keys = [key for key in keys if key]
+        cutoff = datetime.utcnow() - self.miss_ttl
+        missed = set()
+        for start in range(0, len(keys), LOOKUP_CHUNK_SIZE):
+            chunk = keys[start:start + LOOKUP_CHUNK_SIZE]
+            missed.update(db.session.execute(
+                db.select(GeocodeMiss.normalized_address).where(
+                    GeocodeMiss.normalized_address.in_(chunk), GeocodeMiss.last_attempt_at >= cutoff)
+            ).scalars())
+        return missed
+
+    def record_misses(self, keys: Iterable[str]):
+        """Remember normalized addresses the geocoder found nothing for."""
+        keys = [key for key in keys if key]
+        if not keys:
+            return
+        now = datetime.utcnow()
+        existing = {}
+        for start in range(0, len(keys), LOOKUP_CHUNK_SIZE):
+            chunk = keys[start:start + LOOKUP_CHUNK_SIZE]
+            for entry in GeocodeMiss.query.filter(GeocodeMiss.normalized_address.in_(chunk)).all():
+                existing[entry.normalized_address] = entry
+        for key in keys:
+            entry = existing.get(key)
+            if entry is None:
+                db.session.add(GeocodeMiss(normalized_address=key, attempts=1, last_attempt_at=now))
+            else:
+                entry.attempts += 1
+                entry.last_attempt_at = now
+
+    def _geocode(self, address: str) -> Tuple[Optional[Tuple[float, float]], bool]:
+        """
+        One rate-limited network lookup; safe to call from worker threads.
+        Returns the coordinates and whether the geocoder answered (False on errors).
+        """
+        self.rate_limiter.wait()
+        try:
+            location = self.geocoder.geocode(address, timeout=self.timeout)
+        except Exception as e:
+            print(f"Geocoding error for {address}: {e}")
+            return None, False
+        if location:
+            return (location.latitude, location.longitude), True
+        return None, True
+
+    def resolve(self, address: str) -> Optional[Tuple[float, float]]:
+        """Resolve an address through the cache first, then the network geocoder."""
+        coord = self.lookup(address)
+        if coord:
+            return coord
+        key = normalize_address(address)
+        if not key or self.recent_misses([key]):
+            return None
+
+        coord, answered = self._geocode(address)
+        if coord:
+            self.save(address, coord)
+        elif answered:
+            self.record_misses([key])
+        return coord
+
+    def resolve_many(self, addresses: Iterable[str],
+                     progress: Optional[Callable[[int, int], None]] = None) -> Dict[str, Optional[Tuple[float, float]]]:
+        """
+        Resolve a batch of addresses.
+
+        Addresses are deduplicated by normalized form and looked up in the
+        cache in a few queries; only the misses that have not recently
+        failed reach the geocoder, up to concurrency at a time and within
+        the rate limit. New results and failures are added to the session
+        (the caller commits).
+
+        Args:
+            addresses: Addresses to resolve
+            progress: Called as progress(done, total) after each network lookup
+
+        Returns:
+            Coordinates (or None when unresolved) for every input address
+        """
+        addresses = list(addresses)
+        representative = {}
+        for address in addresses:
+            key = normalize_address(address)
+            if key:
+                representative.setdefault(key, address)
+
+        coords = self.lookup_many(representative)
+        misses = [key for key in representative if key not in coords]
+        failed_recently = self.recent_misses(misses)
+        misses = [key for key in misses if key not in failed_recently]
+        if misses:
+            resolved, not_found = {}, []
+            with ThreadPoolExecutor(max_workers=min(self.concurrency, len(misses)),
+                                    thread_name_prefix='geocode') as executor:
+                futures = {executor.submit(self._geocode, representative[key]): key for key in misses}
+                for done, future in enumerate(as_completed(futures), 1):
+                    coord, answered = future.result()
+                    if coord:
+                        resolved[futures[future]] = coord
+                    elif answered:
+                        not_found.append(futures[future])
+                    if progress:
+                        progress(done, len(misses))
+            self.save_many(resolved)
+            self.record_misses(not_found)
+            coords.update(resolved)
+        return {address: coords.get(normalize_address(address)) for address in addresses}
+
+    def update_customer_coordinates(self, customer) -> bool:
+        """
+        Fill customer.latitude/longitude from the customer's address.
+        Returns False when the address could not be resolved.
+        """
+        coord = self.resolve(format_customer_address(customer))
+        if not coord:
+            return False
+        customer.latitude, customer.longitude = coord
+        return True
+
+    def update_many_customer_coordinates(self, customers: List,
+                                         progress: Optional[Callable[[int, int], None]] = None) -> int:
+        """
+        Fill latitude/longitude for many customers through resolve_many().
+        Returns how many customers were resolved.
+        """
+        addresses = [format_customer_address(customer) for customer in customers]
+        coords = self.resolve_many(addresses, progress)
+        resolved = 0
+        for customer, address in zip(customers, addresses):
+            coord = coords[address]
+            if coord:
+                customer.latitude, customer.longitude = coord
+                resolved += 1
+        return resolved
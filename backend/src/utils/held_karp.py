@@ -0,0 +1,160 @@
+import time
+from typing import List, Optional, Tuple
+import numpy as np
+
+# Largest number of stops (depot excluded) solved exactly; the DP table has
+# 2^n * n entries, 1M at 16 stops
+HELD_KARP_MAX_STOPS = 16
+
+
+def held_karp_path(distance_matrix: np.ndarray) -> Tuple[List[int], float]:
+    """
+    Shortest open route from matrix index 0 through every other node.
+
+    Bitmask dynamic programming: best[S, j] is the shortest path that
+    leaves the depot, visits exactly the stops in S and ends at j. The
+    subsets are processed one popcount layer at a time, each layer in a
+    single NumPy minimum over (subset, last stop, previous stop).
+
+    Returns:
+        The route (starting with 0) and its length
+    """
+    matrix = np.asarray(distance_matrix, dtype=np.float64)
+    n = len(matrix) - 1
+    if n <= 0:
+        return [0], 0.0
+    if n > HELD_KARP_MAX_STOPS:
+        raise ValueError(f"Held-Karp is limited to {HELD_KARP_MAX_STOPS} stops, got {n}")
+
+    stops = matrix[1:, 1:]
+    bits = 1 << np.arange(n)
+    masks = np.arange(1 << n)
+    popcount = ((masks[:, None] & bits) != 0).sum(axis=1)
+
+    best = np.full((1 << n, n), np.inf)
+    parent = np.full((1 << n, n), -1, dtype=np.int8)
+    best[bits, np.arange(n)] = matrix[0, 1:]
+
+    # Reaching j from k costs stops[k, j]; candidates are laid out [subset, j, k]
+    arrive = stops.T[None, :, :]
+    for size in range(2, n + 1):
+        layer = masks[popcount == size]
+        contains = (layer[:, None] & bits) != 0
+        candidates = best[layer[:, None] ^ bits] + arrive
+        previous = candidates.argmin(axis=2)
+        cost = np.take_along_axis(candidates, previous[:, :, None], axis=2)[:, :, 0]
+        best[layer] = np.where(contains, cost, np.inf)
+        parent[layer] = np.where(contains, previous, -1)
+
+    mask = (1 << n) - 1
+    last = int(np.argmin(best[mask]))
+    length = float(best[mask, last])
+    order = []
+    while last >= 0:
+        order.append(last + 1)
+        last, mask = int(parent[mask, last]), mask ^ (1 << last)
+    return [0] + order[::-1], length
+
+
+def one_tree_bound(distance_matrix: np.ndarray, upper_bound: Optional[float] = None,
+                   max_iterations: int = 100, time_budget_ms: Optional[float] = None,
+                   symmetric: bool = False) -> float:
+    """
+    Held-Karp lower bound on the shortest open route from matrix index 0.
+
+    An open route plus a dummy node joined to the depot and to the last
+    stop is a tour, so its length is at least the weight of a minimum
+    spanning tree over the real nodes plus those two zero-cost edges.
+    Node penalties are then tuned by subgradient ascent to push every
+    degree towards 2, which tightens the bound. Directed distances are
+    relaxed to the cheaper direction of each pair unless the matrix is
+    known to be symmetric.
+
+    Args:
+        distance_matrix: Square distance matrix, depot at index 0
+        upper_bound: Length of a known route, for the step size (and to stop
+            once the bound reaches it)
+        max_iterations: Subgradient iterations
+        time_budget_ms: Stops iterating once this much time has passed;
+            the first spanning tree is always completed unless the budget
+            is 0, which returns the cheaper entry_bound() instead
+        symmetric: Skip reading the transpose (d[i, j] == d[j, i])
+
+    Returns:
+        A length no route can beat
+    """
+    matrix = np.asarray(distance_matrix)
+    n = len(matrix)
+    if n <= 1:
+        return 0.0
+    if n == 2:
+        return float(matrix[0, 1])
+    if time_budget_ms is not None and time_budget_ms <= 0:
+        return entry_bound(matrix)
+
+    deadline = None if time_budget_ms is None else time.perf_counter() + time_budget_ms / 1000
+    penalties = np.zeros(n)
+    best_bound = 0.0
+    step_scale = 2.0
+    stalled = 0
+    for _ in range(max(1, max_iterations)):
+        weight, degrees = _penalized_spanning_tree(matrix, penalties, symmetric)
+        end = 1 + int(np.argmin(penalties[1:]))
+        degrees[0] += 1
+        degrees[end] += 1
+        bound = weight + penalties[0] + penalties[end] - 2 * penalties.sum()
+        if bound > best_bound + 1e-9:
+            best_bound, stalled = bound, 0
+        else:
+            stalled += 1
+            if stalled >= 5:
+                step_scale, stalled = step_scale / 2, 0
+
+        subgradient = degrees - 2
+        norm = float((subgradient ** 2).sum())
+        if norm == 0 or (upper_bound is not None and best_bound >= upper_bound - 1e-9):
+            break  # the tree is a route: the bound is exact
+        if deadline is not None and time.perf_counter() > deadline:
+            break
+        target = upper_bound if upper_bound is not None else bound * 1.05
+        penalties += step_scale * max(target - bound, 1e-9) / norm * subgradient
+    return float(best_bound)
+
+
+def entry_bound(distance_matrix: np.ndarray) -> float:
+    """
+    Quick lower bound on the shortest open route from matrix index 0: every
+    stop is entered exactly once, so the route is at least the sum of each
+    stop's cheapest incoming edge.
+    """
+    matrix = np.array(distance_matrix, dtype=np.float64)
+    if len(matrix) <= 1:
+        return 0.0
+    np.fill_diagonal(matrix, np.inf)
+    return float(matrix[:, 1:].min(axis=0).sum())
+
+
+def _penalized_spanning_tree(matrix: np.ndarray, penalties: np.ndarray,
+                             symmetric: bool) -> Tuple[float, np.ndarray]:
+    """Prim's algorithm on min(d[i, j], d[j, i]) + p[i] + p[j]; returns the weight and node degrees."""
+    n = len(matrix)
+    in_tree = np.zeros(n, dtype=bool)
+    in_tree[0] = True
+    key = (matrix[0] if symmetric else np.minimum(matrix[0], matrix[:, 0])) + penalties + penalties[0]
+    key[0] = np.inf
+    attach = np.zeros(n, dtype=np.int64)
+    weight = 0.0
+    degrees = np.zeros(n, dtype=np.int64)
+    for _ in range(n - 1):
+        node = int(np.argmin(key))
+        weight += float(key[node])
+        degrees[node] += 1
+        degrees[attach[node]] += 1
+        in_tree[node] = True
+        key[node] = np.inf
+        row = matrix[node] if symmetric else np.minimum(matrix[node], matrix[:, node])
+        cost = row + penalties + penalties[node]
+        closer = ~in_tree & (cost < key)
+        key[closer] = cost[closer]
+        attach[closer] = node
+    return weight, degrees
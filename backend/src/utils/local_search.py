@@ -0,0 +1,473 @@
+import random
+import time
+from collections import deque
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+import numpy as np
+from .spatial_index import GRID_MIN_CANDIDATE_POINTS, SpatialGrid
+
+# Longest improve()/two_opt() run when the caller gives no deadline
+MAX_SEARCH_SECONDS = 10.0
+
+
+class LocalSearch:
+    """
+    Local search for open delivery routes that start at a fixed depot.
+
+    Routes are lists of distance-matrix indices whose first entry (the depot)
+    never moves and whose last stop does not return. Every move is scored by
+    an O(1) delta on the edges it changes, candidates are restricted to each
+    node's K nearest neighbors, and don't-look bits keep the search focused on
+    the part of the route that changed last.
+
+    The moves reverse route segments, which only keeps their cost when the
+    matrix is symmetric. An asymmetric matrix (a directed road graph) is
+    therefore searched on its symmetric part, (D + D.T) / 2, so every
+    applied move really shortens that route and the search terminates.
+    route_length() and the routes returned by improve(), two_opt() and
+    anytime() are scored on the real matrix, and improve() never returns a
+    route that is longer there than the one it was given.
+    """
+
+    def __init__(self, distance_matrix, neighbor_count: int = 10,
+                 coordinates: Optional[Sequence[Tuple[float, float]]] = None):
+        matrix = np.asarray(distance_matrix, dtype=np.float64)
+        self.size = len(matrix)
+        self.symmetric = bool(np.allclose(matrix, matrix.T))
+        # Plain nested lists: scalar lookups in the move loops are several
+        # times faster than indexing into a NumPy array
+        self.cost = matrix.tolist()
+        if not self.symmetric:
+            matrix = (matrix + matrix.T) / 2
+        self.dist = self.cost if self.symmetric else matrix.tolist()
+        self.neighbors = self.build_neighbor_lists(matrix, neighbor_count, coordinates)
+
+    @staticmethod
+    def build_neighbor_lists(matrix: np.ndarray, k: int,
+                             coordinates: Optional[Sequence[Tuple[float, float]]] = None) -> List[List[int]]:
+        """
+        K nearest neighbors of every node, nearest first.
+
+        For large matrices with known (lat, lon) coordinates, a spatial grid
+        nominates the 2k planar-nearest nodes of each node and only those
+        are ranked by the matrix, instead of partitioning every full row.
+        """
+        n = len(matrix)
+        k = min(k, n - 1)
+        if k <= 0:
+            return [[] for _ in range(n)]
+
+        if coordinates is not None and n >= GRID_MIN_CANDIDATE_POINTS:
+            pool = SpatialGrid.from_coordinates(coordinates).k_nearest(2 * k)
+            order = np.take_along_axis(np.asarray(matrix), pool, axis=1).argsort(axis=1, kind='stable')[:, :k]
+            return np.take_along_axis(pool, order, axis=1).tolist()
+
+        masked = np.array(matrix, dtype=np.float64)
+        np.fill_diagonal(masked, np.inf)
+        nearest = np.argpartition(masked, k - 1, axis=1)[:, :k]
+        order = np.take_along_axis(masked, nearest, axis=1).argsort(axis=1)
+        return np.take_along_axis(nearest, order, axis=1).tolist()
+
+    def route_length(self, route: List[int]) -> float:
+        """Total length of an open route, on the real (possibly asymmetric) matrix."""
+        dist = self.cost
+        return sum(dist[route[k]][route[k + 1]] for k in range(len(route) - 1))
+
+    def _edge(self, a: Optional[int], b: Optional[int]) -> float:
+        """Edge length where None stands for the open end of the route."""
+        if a is None or b is None:
+            return 0.0
+        return self.dist[a][b]
+
+    def _reverse(self, route: List[int], pos: List[int], start: int, end: int):
+        """Reverse route[start..end] in place and refresh positions."""
+        route[start:end + 1] = route[start:end + 1][::-1]
+        for k in range(start, end + 1):
+            pos[route[k]] = k
+
+    def _positions(self, route: List[int]) -> List[int]:
+        """Position of every node in the route (-1 when absent)."""
+        pos = [-1] * self.size
+        for k, node in enumerate(route):
+            pos[node] = k
+        return pos
+
+    def _queue(self, route: List[int], active: Optional[Iterable[int]]) -> Tuple[deque, List[bool]]:
+        """Don't-look-bit queue seeded with the active nodes (all nodes when None)."""
+        nodes = route if active is None else [node for node in active if node is not None]
+        queue = deque()
+        queued = [False] * self.size
+        for node in nodes:
+            if not queued[node]:
+                queued[node] = True
+                queue.append(node)
+        return queue, queued
+
+    @staticmethod
+    def _wake(queue: deque, queued: List[bool], nodes: Iterable[Optional[int]], touched: Set[int]):
+        """Clear the don't-look bits of nodes whose surroundings changed."""
+        for node in nodes:
+            if node is None:
+                continue
+            touched.add(node)
+            if not queued[node]:
+                queued[node] = True
+                queue.append(node)
+
+    @staticmethod
+    def _expired(deadline: Optional[float], checks: int) -> bool:
+        return deadline is not None and checks % 64 == 0 and time.perf_counter() > deadline
+
+    def two_opt(self, route: List[int], deadline: Optional[float] = None) -> Tuple[List[int], int]:
+        """
+        Apply improving 2-opt moves until none is left (or the deadline passes).
+
+        Args:
+            route: Route starting at the depot
+            deadline: time.perf_counter() value to stop at (default
+                MAX_SEARCH_SECONDS from now)
+
+        Returns:
+            The improved route and the number of moves applied
+        """
+        improved, moves, _ = self._two_opt(list(route), None, self._deadline(deadline))
+        if self._longer(improved, route):
+            return list(route), 0
+        return improved, moves
+
+    def _two_opt(self, route: List[int], active: Optional[Iterable[int]],
+                 deadline: Optional[float]) -> Tuple[List[int], int, Set[int]]:
+        n = len(route)
+        touched = set()
+        if n < 3:
+            return route, 0, touched
+
+        dist, neighbors, edge = self.dist, self.neighbors, self._edge
+        last = n - 1
+        pos = self._positions(route)
+        queue, queued = self._queue(route, active)
+
+        moves = 0
+        round_start = 0
+        checks = 0
+        while queue:
+            checks += 1
+            if self._expired(deadline, checks):
+                break
+
+            t1 = queue.popleft()
+            queued[t1] = False
+            i = pos[t1]
+            changed = None
+
+            # Successor direction: replace (t1, t2) and (t3, t4) with (t1, t3) and (t2, t4)
+            t2 = route[i + 1] if i < last else None
+            d12 = dist[t1][t2] if t2 is not None else 0.0
+            for t3 in neighbors[t1]:
+                d13 = dist[t1][t3]
+                if t2 is not None and d13 >= d12:
+                    break
+                j = pos[t3]
+                if j < 0 or t3 == t2:
+                    continue
+                t4 = route[j + 1] if j < last else None
+                if t4 == t1:
+                    continue
+                delta = d13 + edge(t2, t4) - d12 - edge(t3, t4)
+                if delta < -1e-9:
+                    if i < j:
+                        self._reverse(route, pos, i + 1, j)
+                    else:
+                        self._reverse(route, pos, j + 1, i)
+                    changed = (t1, t2, t3, t4)
+                    break
+
+            # Predecessor direction: replace (t2, t1) and (t4, t3) with (t4, t2) and (t3, t1)
+            if changed is None and i > 0:
+                t2 = route[i - 1]
+                d12 = dist[t1][t2]
+                for t3 in neighbors[t1]:
+                    d13 = dist[t1][t3]
+                    if d13 >= d12:
+                        break
+                    j = pos[t3]
+                    if j <= 0 or t3 == t2:
+                        continue
+                    t4 = route[j - 1]
+                    if t4 == t1:
+                        continue
+                    delta = d13 + dist[t2][t4] - d12 - dist[t3][t4]
+                    if delta < -1e-9:
+                        if i < j:
+                            self._reverse(route, pos, i, j - 1)
+                        else:
+                            self._reverse(route, pos, j, i - 1)
+                        changed = (t1, t2, t3, t4)
+                        break
+
+            if changed is not None:
+                moves += 1
+                self._wake(queue, queued, changed, touched)
+
+            # Reversals elsewhere can flip a pair of edges into an improving
+            # orientation without touching their endpoints, so confirm the
+            # optimum with one more full round once the queue drains
+            if not queue and moves > round_start:
+                round_start = moves
+                queue, queued = self._queue(route, None)
+
+        return route, moves, touched
+
+    def or_opt(self, route: List[int], segment_lengths: Tuple[int, ...] = (1, 2, 3),
+               deadline: Optional[float] = None) -> Tuple[List[int], int]:
+        """
+        Move segments of consecutive stops to a better place in the route.
+
+        With segment length 1 this is the relocate move. Every segment is
+        tried in both orientations, so longer segments also cover the
+        reversed-insertion (or2h) subset of 3-opt.
+        """
+        route, moves, _ = self._or_opt(list(route), segment_lengths, None, deadline)
+        return route, moves
+
+    def _or_opt(self, route: List[int], segment_lengths: Tuple[int, ...], active: Optional[Iterable[int]],
+                deadline: Optional[float]) -> Tuple[List[int], int, Set[int]]:
+        n = len(route)
+        touched = set()
+        dist, neighbors, edge = self.dist, self.neighbors, self._edge
+        pos = self._positions(route)
+        queue, queued = self._queue(route, active)
+
+        moves = 0
+        checks = 0
+        while queue:
+            checks += 1
+            if self._expired(deadline, checks):
+                break
+
+            u = queue.popleft()
+            queued[u] = False
+            best_delta, best_move = -1e-9, None
+
+            # Segments starting or ending at u
+            for seg_len in segment_lengths:
+                for i in {pos[u], pos[u] - seg_len + 1}:
+                    end = i + seg_len - 1
+                    if i < 1 or end >= n:
+                        continue
+                    s0, s1 = route[i], route[end]
+                    p = route[i - 1]
+                    nx = route[end + 1] if end + 1 < n else None
+                    removal_gain = dist[p][s0] + edge(s1, nx) - edge(p, nx)
+                    if removal_gain <= 1e-9:
+                        continue
+
+                    for head in (s0, s1):
+                        for c in neighbors[head]:
+                            j = pos[c]
+                            if j < 0 or i <= j <= end:
+                                continue
+                            # Insert right after c, or right before it
+                            before_c = p if c == nx else (route[j - 1] if j > 0 else None)
+                            for a in (c, before_c):
+                                if a is None:
+                                    continue
+                                # Successor of a once the segment has been taken out
+                                if a == p:
+                                    b = nx
+                                else:
+                                    b = route[pos[a] + 1] if pos[a] + 1 < n else None
+                                base = edge(a, b)
+                                forward = dist[a][s0] + edge(s1, b) - base - removal_gain
+                                backward = dist[a][s1] + edge(s0, b) - base - removal_gain
+                                if a != p and forward < best_delta:
+                                    best_delta, best_move = forward, (i, end, a, b, False)
+                                if backward < best_delta:
+                                    best_delta, best_move = backward, (i, end, a, b, True)
+
+            if best_move is None:
+                continue
+
+            i, end, a, b, reverse = best_move
+            segment = route[i:end + 1]
+            changed = [route[i - 1], route[end + 1] if end + 1 < n else None, a, b] + segment
+            if reverse:
+                segment.reverse()
+            # Rotate only the stretch between the segment and its new place
+            if pos[a] < i:
+                lo, hi = pos[a] + 1, end + 1
+                route[lo:hi] = segment + route[lo:i]
+            else:
+                lo, hi = i, pos[a] + 1
+                route[lo:hi] = route[end + 1:hi] + segment
+            for k in range(lo, hi):
+                pos[route[k]] = k
+            moves += 1
+            self._wake(queue, queued, changed, touched)
+
+        return route, moves, touched
+
+    def swap(self, route: List[int], deadline: Optional[float] = None) -> Tuple[List[int], int]:
+        """Exchange pairs of stops while that shortens the route."""
+        route, moves, _ = self._swap(list(route), None, deadline)
+        return route, moves
+
+    def _swap(self, route: List[int], active: Optional[Iterable[int]],
+              deadline: Optional[float]) -> Tuple[List[int], int, Set[int]]:
+        n = len(route)
+        touched = set()
+        dist, neighbors, edge = self.dist, self.neighbors, self._edge
+        pos = self._positions(route)
+        queue, queued = self._queue(route, active)
+
+        moves = 0
+        checks = 0
+        while queue:
+            checks += 1
+            if self._expired(deadline, checks):
+                break
+
+            u = queue.popleft()
+            queued[u] = False
+            if pos[u] <= 0:
+                continue
+            for v in neighbors[u]:
+                j = pos[v]
+                if j <= 0:
+                    continue
+                lo, hi = min(pos[u], j), max(pos[u], j)
+                x, y = route[lo], route[hi]
+                before_x = route[lo - 1]
+                after_y = route[hi + 1] if hi + 1 < n else None
+                if hi == lo + 1:
+                    old = dist[before_x][x] + dist[x][y] + edge(y, after_y)
+                    new = dist[before_x][y] + dist[y][x] + edge(x, after_y)
+                    changed = (before_x, x, y, after_y)
+                else:
+                    after_x, before_y = route[lo + 1], route[hi - 1]
+                    old = dist[before_x][x] + dist[x][after_x] + dist[before_y][y] + edge(y, after_y)
+                    new = dist[before_x][y] + dist[y][after_x] + dist[before_y][x] + edge(x, after_y)
+                    changed = (before_x, x, after_x, before_y, y, after_y)
+                if new - old < -1e-9:
+                    route[lo], route[hi] = y, x
+                    pos[x], pos[y] = hi, lo
+                    moves += 1
+                    self._wake(queue, queued, changed, touched)
+                    break
+
+        return route, moves, touched
+
+    def improve(self, route: List[int], deadline: Optional[float] = None,
+                stats: Optional[Dict] = None, active: Optional[Iterable[int]] = None) -> List[int]:
+        """
+        Cycle through 2-opt, relocate, Or-opt and swap until no neighborhood
+        improves the route (or the deadline passes).
+
+        Only the active nodes (all nodes when None) and those touched by a
+        later move are examined. Move counts and time per neighborhood are
+        accumulated into stats. Without a deadline the search stops after
+        MAX_SEARCH_SECONDS.
+        """
+        improved = self._improve(list(route), self._deadline(deadline), stats, active)
+        return list(route) if self._longer(improved, route) else improved
+
+    @staticmethod
+    def _deadline(deadline: Optional[float]) -> float:
+        return deadline if deadline is not None else time.perf_counter() + MAX_SEARCH_SECONDS
+
+    def _longer(self, route: List[int], original: List[int]) -> bool:
+        """Whether a route searched on the symmetric part is longer than the original on the real matrix."""
+        return not self.symmetric and self.route_length(route) > self.route_length(original) + 1e-9
+
+    def _improve(self, route: List[int], deadline: Optional[float], stats: Optional[Dict],
+                 active: Optional[Iterable[int]]) -> List[int]:
+        """improve() on a route it may modify in place; the phases share one list."""
+        stats = stats if stats is not None else {}
+        phases = (
+            ('two_opt', lambda r, nodes: self._two_opt(r, nodes, deadline)),
+            ('relocate', lambda r, nodes: self._or_opt(r, (1,), nodes, deadline)),
+            ('or_opt', lambda r, nodes: self._or_opt(r, (2, 3), nodes, deadline)),
+            ('swap', lambda r, nodes: self._swap(r, nodes, deadline)),
+        )
+        dirty = None if active is None else set(active)
+        while dirty is None or dirty:
+            round_touched = set()
+            for name, phase in phases:
+                started = time.perf_counter()
+                nodes = None if dirty is None else dirty | round_touched
+                route, moves, touched = phase(route, nodes)
+                phase_stats = stats.setdefault(name, {'moves': 0, 'time_ms': 0.0})
+                phase_stats['moves'] += moves
+                phase_stats['time_ms'] += (time.perf_counter() - started) * 1000
+                round_touched |= touched
+                if deadline is not None and time.perf_counter() > deadline:
+                    return route
+            dirty = round_touched
+        return route
+
+    def anytime(self, route: List[int], time_budget_ms: float, seed: Optional[int] = None,
+                on_improvement: Optional[Callable[[float], None]] = None) -> Tuple[List[int], Dict]:
+        """
+        Iterated local search that returns the best route found in the budget.
+
+        The route is first driven to a local optimum; the remaining time is
+        spent on random segment-exchange (double-bridge) kicks, each followed
+        by local search around the kicked nodes, keeping the best route seen.
+        on_improvement, if given, is called with each new best length.
+        """
+        started = time.perf_counter()
+        deadline = started + time_budget_ms / 1000.0
+        rng = random.Random(seed)
+        moves = {}
+
+        initial_distance = self.route_length(route)
+        best = current = self.improve(route, deadline, moves)
+        best_distance = current_distance = self.route_length(best)
+        if on_improvement:
+            on_improvement(best_distance)
+        kicks = 0
+        accepted = 0
+        stall_limit = 20 * len(route)
+        since_best = 0
+
+        # Small routes run out of distinct kicks long before the budget does
+        while len(route) > 4 and since_best < stall_limit and time.perf_counter() < deadline:
+            kicks += 1
+            since_best += 1
+            kicked, endpoints = self._double_bridge(current, rng)
+            candidate = self._improve(kicked, deadline, moves, endpoints)
+            candidate_distance = self.route_length(candidate)
+            if candidate_distance < current_distance - 1e-9:
+                current, current_distance = candidate, candidate_distance
+                accepted += 1
+                if current_distance < best_distance:
+                    best, best_distance = current, current_distance
+                    since_best = 0
+                    if on_improvement:
+                        on_improvement(best_distance)
+
+        return best, {
+            'initial_distance_km': round(initial_distance, 3),
+            'final_distance_km': round(best_distance, 3),
+            'improvement_pct': round((initial_distance - best_distance) / initial_distance * 100, 2)
+            if initial_distance > 0 else 0.0,
+            'kicks': kicks,
+            'accepted_kicks': accepted,
+            'moves': {name: phase['moves'] for name, phase in moves.items()},
+            'phase_ms': {name: round(phase['time_ms'], 2) for name, phase in moves.items()},
+            'elapsed_ms': round((time.perf_counter() - started) * 1000, 2),
+        }
+
+    @staticmethod
+    def _double_bridge(route: List[int], rng: random.Random,
+                       max_segment: int = 30) -> Tuple[List[int], List[int]]:
+        """
+        Swap two adjacent random segments after the depot.
+        Returns the kicked route and the nodes next to the three cuts.
+        """
+        n = len(route)
+        a = rng.randint(1, n - 3)
+        b = rng.randint(a + 1, min(n - 2, a + max_segment))
+        c = rng.randint(b + 1, min(n, b + max_segment))
+        kicked = route[:a] + route[b:c] + route[a:b] + route[c:]
+        endpoints = [route[k] for k in (a - 1, a, b - 1, b, c - 1, c) if k < n]
+        return kicked, endpoints
@@ -0,0 +1,267 @@
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+import uuid
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: only the in-process lock applies
+    fcntl = None
+
+# Stores untouched for this long are deleted when a new one is created
+MAX_AGE_DAYS = 7
+
+# compute(new_coordinates, all_coordinates) -> (rows new x all, columns all x new)
+BlockFunction = Callable[[List[Tuple[float, float]], List[Tuple[float, float]]], Tuple[np.ndarray, np.ndarray]]
+
+
+def default_store_directory() -> str:
+    """ROUTE_MATRIX_CACHE_DIR, else a directory under the system temp dir."""
+    return os.environ.get('ROUTE_MATRIX_CACHE_DIR') or os.path.join(tempfile.gettempdir(), 'tiffin_route_matrices')
+
+
+def _lock_path(path: str) -> str:
+    """Lock file of the store a matrix file ('{base}-{generation}.f32') belongs to."""
+    directory, name = os.path.split(path)
+    return os.path.join(directory, f"{name.rsplit('-', 1)[0]}.lock")
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        pass
+    return True
+
+
+def pin_file(path: str) -> Optional[str]:
+    """
+    Mark a store file as in use by this process, so a store that outgrows
+    it keeps the file until unpin_file(). Returns the pin, or None when the
+    file has already been superseded and removed.
+    """
+    pin = f"{path}.pin-{os.getpid()}-{uuid.uuid4().hex[:8]}"
+    with open(_lock_path(path), 'a') as lock_file:
+        if fcntl:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        if not os.path.exists(path):
+            return None
+        open(pin, 'w').close()
+    return pin
+
+
+def unpin_file(pin: Optional[str]):
+    if pin:
+        try:
+            os.remove(pin)
+        except OSError:
+            pass
+
+
+def is_pinned(path: str) -> bool:
+    """Whether a live process has pinned a store file; pins of dead processes are removed."""
+    directory, name = os.path.split(path)
+    prefix = f"{name}.pin-"
+    pinned = False
+    for entry in os.listdir(directory):
+        if not entry.startswith(prefix):
+            continue
+        try:
+            pid = int(entry[len(prefix):].split('-')[0])
+        except ValueError:
+            continue
+        if _process_alive(pid):
+            pinned = True
+        else:
+            unpin_file(os.path.join(directory, entry))
+    return pinned
+
+
+def mapped_prefix(matrix: np.ndarray) -> Optional[Tuple[str, int, int]]:
+    """
+    (file path, stored capacity, size) when matrix is a leading square
+    block of a store file, so another process can map the same pages.
+    """
+    base = matrix.base
+    if not isinstance(matrix, np.memmap) or not isinstance(base, np.memmap) or not matrix.filename:
+        return None
+    if matrix.ndim != 2 or base.ndim != 2 or matrix.strides != base.strides:
+        return None
+    if matrix.__array_interface__['data'][0] != base.__array_interface__['data'][0]:
+        return None
+    return matrix.filename, base.shape[0], matrix.shape[0]
+
+
+class DistanceMatrixStore:
+    """
+    Distance matrices of a service day persisted as memory-mapped float32 files.
+
+    Each (day, distance mode) gets one square matrix file with spare
+    capacity plus a JSON index of the coordinates stored in it, in slot
+    order. A request maps its coordinates to slots; coordinates not yet
+    stored are appended as new rows and columns, computing only the
+    distances that involve them. When the request covers the stored slots
+    in order (a re-run of an unchanged or grown day) the result is a view
+    of the mapped file and nothing is copied; otherwise the needed rows
+    and columns are gathered from the mapping. Files that outgrow their
+    capacity are rewritten at twice the size under a new name. The old
+    file is retired rather than deleted: it is removed by a later append
+    once no live process has it pinned (see pin_file), so worker processes
+    handed its path can still open it.
+    """
+
+    def __init__(self, directory: Optional[str] = None, initial_capacity: int = 256):
+        self.directory = directory or default_store_directory()
+        self.initial_capacity = initial_capacity
+        self._lock = threading.Lock()
+        self._maps: Dict[str, np.memmap] = {}
+
+    @staticmethod
+    def coordinate_key(coord: Tuple[float, float]) -> str:
+        return f"{float(coord[0]):.6f},{float(coord[1]):.6f}"
+
+    def _base_name(self, day_key: str, mode: str) -> str:
+        return re.sub(r'[^\w.-]', '_', f"{day_key}-{mode}")
+
+    def _read_index(self, base_name: str) -> Dict:
+        try:
+            with open(os.path.join(self.directory, f"{base_name}.json"), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {'file': None, 'capacity': 0, 'coordinates': [], 'retired': []}
+
+    def _write_index(self, base_name: str, index: Dict):
+        path = os.path.join(self.directory, f"{base_name}.json")
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, 'w', encoding='utf-8') as f:
+            json.dump(index, f)
+        os.replace(temporary, path)
+
+    def _mapping(self, index: Dict) -> np.memmap:
+        """Read-only mapping of the index's current file, reused while it does not change."""
+        path = os.path.join(self.directory, index['file'])
+        mapped = self._maps.get(path)
+        if mapped is None:
+            mapped = np.memmap(path, dtype=np.float32, mode='r', shape=(index['capacity'], index['capacity']))
+            self._maps = {key: value for key, value in self._maps.items() if os.path.exists(key)}
+            self._maps[path] = mapped
+        return mapped
+
+    def _prune(self):
+        cutoff = time.time() - MAX_AGE_DAYS * 86400
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            try:
+                if os.path.getmtime(path) < cutoff and not is_pinned(path):
+                    os.remove(path)
+            except OSError:
+                pass
+
+    def matrix(self, day_key: str, mode: str, coordinates: Sequence[Tuple[float, float]],
+               compute_block: BlockFunction) -> np.ndarray:
+        """
+        The float32 distance matrix of coordinates for a service day.
+
+        Args:
+            day_key: Service day (or any plan key) the matrix belongs to
+            mode: Distance mode; each mode has its own file
+            coordinates: (lat, lon) of every matrix row, in order
+            compute_block: Computes the distances between the new
+                coordinates and all stored ones, in both directions
+
+        Returns:
+            A read-only view of the mapped file when possible, else a copy
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        base_name = self._base_name(day_key, mode)
+        keys = [self.coordinate_key(coord) for coord in coordinates]
+
+        with self._lock, open(os.path.join(self.directory, f"{base_name}.lock"), 'a') as lock_file:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            index = self._read_index(base_name)
+            stored = index['coordinates']
+            slot_of = {key: slot for slot, key in enumerate(stored)}
+            new_keys = list(dict.fromkeys(key for key in keys if key not in slot_of))
+            if new_keys:
+                index = self._append(base_name, index, new_keys,
+                                     [coordinates[keys.index(key)] for key in new_keys], compute_block)
+                slot_of.update({key: slot for slot, key in enumerate(index['coordinates'])})
+            mapped = self._mapping(index)
+
+        slots = np.fromiter((slot_of[key] for key in keys), dtype=np.int64, count=len(keys))
+        if np.array_equal(slots, np.arange(len(keys))):
+            return mapped[:len(keys), :len(keys)]
+        return mapped[np.ix_(slots, slots)]
+
+    def _append(self, base_name: str, index: Dict, new_keys: List[str],
+                new_coordinates: List[Tuple[float, float]], compute_block: BlockFunction) -> Dict:
+        """Add rows and columns for new coordinates, growing the file if needed."""
+        size = len(index['coordinates'])
+        new_size = size + len(new_keys)
+        all_coordinates = [tuple(float(value) for value in key.split(',')) for key in index['coordinates']] + \
+            list(new_coordinates)
+
+        capacity, file_name = index['capacity'], index['file']
+        if new_size > capacity:
+            if not index['file']:
+                self._prune()
+            capacity = max(self.initial_capacity, 2 * new_size)
+            generation = int(time.time() * 1000)
+            file_name = f"{base_name}-{generation}.f32"
+            grown = np.memmap(os.path.join(self.directory, file_name), dtype=np.float32, mode='w+',
+                              shape=(capacity, capacity))
+            if size:
+                grown[:size, :size] = self._mapping(index)[:size, :size]
+            grown.flush()
+            del grown
+            if index['file']:
+                index = dict(index, retired=index.get('retired', []) + [index['file']])
+
+        rows, columns = compute_block(list(new_coordinates), all_coordinates)
+        writable = np.memmap(os.path.join(self.directory, file_name), dtype=np.float32, mode='r+',
+                             shape=(capacity, capacity))
+        writable[size:new_size, :new_size] = rows
+        writable[:new_size, size:new_size] = columns
+        writable[np.arange(size, new_size), np.arange(size, new_size)] = 0.0
+        writable.flush()
+        del writable
+
+        index = {'file': file_name, 'capacity': capacity, 'coordinates': index['coordinates'] + new_keys,
+                 'retired': self._remove_retired(index.get('retired', []))}
+        self._write_index(base_name, index)
+        return index
+
+    def _remove_retired(self, retired: List[str]) -> List[str]:
+        """Delete superseded files no process has pinned; returns those still kept."""
+        kept = []
+        for name in retired:
+            path = os.path.join(self.directory, name)
+            if not os.path.exists(path):
+                continue
+            if is_pinned(path):
+                kept.append(name)
+                continue
+            try:
+                os.remove(path)
+            except OSError:
+                kept.append(name)
+        return kept
+
+    def clear(self):
+        """Delete every stored matrix."""
+        with self._lock:
+            self._maps.clear()
+            if os.path.isdir(self.directory):
+                for name in os.listdir(self.directory):
+                    try:
+                        os.remove(os.path.join(self.directory, name))
+                    except OSError:
+                        pass
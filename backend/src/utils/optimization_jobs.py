@@ -0,0 +1,189 @@
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+from typing import Callable, Dict, Optional
+from sqlalchemy import func, update
+from src.models.database import db, RouteOptimizationJob
+
+FINISHED_STATUSES = ('completed', 'failed')
+
+# Queued or running jobs not updated for this long belong to a process that is gone
+DEFAULT_STALE_JOB_MINUTES = 15
+
+
+def stale_job_minutes() -> float:
+    """Minutes after which an unfinished job counts as abandoned, from ROUTE_JOB_STALE_MINUTES."""
+    try:
+        return float(os.environ.get('ROUTE_JOB_STALE_MINUTES', DEFAULT_STALE_JOB_MINUTES))
+    except ValueError:
+        return DEFAULT_STALE_JOB_MINUTES
+
+
+def is_stale(job: RouteOptimizationJob, stale_minutes: Optional[float] = None) -> bool:
+    """Whether an unfinished job has gone without an update for stale_minutes."""
+    minutes = stale_job_minutes() if stale_minutes is None else stale_minutes
+    touched = job.updated_at or job.created_at
+    return job.status not in FINISHED_STATUSES and touched is not None and \
+        touched < datetime.utcnow() - timedelta(minutes=minutes)
+
+
+def fail_stale_jobs(stale_minutes: Optional[float] = None) -> int:
+    """
+    Mark jobs left queued or running by a stopped process as failed.
+
+    Jobs live in their process's thread pool, so after a restart nothing
+    will ever finish them and their event streams would never end. A job
+    counts as abandoned once its row has not been updated for
+    stale_minutes (default stale_job_minutes()); live jobs bump it
+    whenever they save progress.
+
+    Returns:
+        Number of jobs marked failed
+    """
+    minutes = stale_job_minutes() if stale_minutes is None else stale_minutes
+    now = datetime.utcnow()
+    table = RouteOptimizationJob.__table__
+    result = db.session.execute(
+        update(table)
+        .where(table.c.status.in_(('queued', 'running')))
+        .where(func.coalesce(table.c.updated_at, table.c.created_at) < now - timedelta(minutes=minutes))
+        .values(status='failed', error='Interrupted: the process running this job stopped',
+                finished_at=now, updated_at=now)
+    )
+    db.session.commit()
+    return result.rowcount
+
+
+def default_job_worker_count() -> int:
+    """Background optimization threads, from ROUTE_JOB_WORKERS (default 2)."""
+    try:
+        return max(1, int(os.environ.get('ROUTE_JOB_WORKERS', '2')))
+    except ValueError:
+        return 2
+
+
+class OptimizationJobRunner:
+    """
+    Runs route optimizations in a background thread pool.
+
+    Each job is a route_optimization_jobs row holding its parameters,
+    status, latest progress and final result, so any app process can
+    answer a poll. The process running a job also keeps its progress in
+    memory and wakes waiting Server-Sent Event streams on every update;
+    progress is written to the row at most every persist_interval_s.
+    """
+
+    def __init__(self, workers: Optional[int] = None, persist_interval_s: float = 1.0,
+                 max_finished: int = 256):
+        self.workers = workers or default_job_worker_count()
+        self.persist_interval_s = persist_interval_s
+        self.max_finished = max_finished
+        self._executor = None
+        self._states: 'OrderedDict[str, Dict]' = OrderedDict()
+        self._condition = threading.Condition()
+
+    def submit(self, app, task: Callable[[Dict, Callable[[Dict], None]], Dict], parameters: Dict,
+               delivery_date: Optional[date] = None, requested_by: Optional[str] = None) -> RouteOptimizationJob:
+        """
+        Store a queued job and hand it to the pool.
+
+        Args:
+            app: Flask app the job runs under (for its database session)
+            task: Called as task(parameters, progress) inside an app context;
+                returns the JSON-serializable result
+            parameters: Request parameters, stored with the job
+        """
+        job = RouteOptimizationJob(id=uuid.uuid4().hex, status='queued', delivery_date=delivery_date,
+                                   parameters=parameters, progress={}, requested_by=requested_by)
+        db.session.add(job)
+        db.session.commit()
+        self._publish(job.id, 'queued', {})
+
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='route-job')
+        self._executor.submit(self._run, app, job.id, task, parameters)
+        return job
+
+    def _run(self, app, job_id: str, task: Callable, parameters: Dict):
+        with app.app_context():
+            job = db.session.get(RouteOptimizationJob, job_id)
+            job.status = 'running'
+            job.started_at = datetime.utcnow()
+            db.session.commit()
+            self._publish(job_id, 'running', {})
+
+            progress = {}
+            last_saved = [time.monotonic()]
+
+            def report(update: Dict):
+                progress.update(update)
+                self._publish(job_id, 'running', dict(progress))
+                now = time.monotonic()
+                if now - last_saved[0] >= self.persist_interval_s:
+                    last_saved[0] = now
+                    self._save_progress(job_id, dict(progress))
+
+            try:
+                result = task(parameters, report)
+                job = db.session.get(RouteOptimizationJob, job_id)
+                job.status = 'completed'
+                job.result = result
+                progress['stage'] = 'completed'
+            except Exception as e:
+                db.session.rollback()
+                print(f"Route optimization job {job_id} failed: {e}")
+                job = db.session.get(RouteOptimizationJob, job_id)
+                job.status = 'failed'
+                job.error = str(e)
+            job.progress = dict(progress)
+            job.finished_at = datetime.utcnow()
+            db.session.commit()
+            self._publish(job_id, job.status, dict(progress))
+
+    @staticmethod
+    def _save_progress(job_id: str, progress: Dict):
+        """Write progress on its own connection, leaving the job's session untouched."""
+        table = RouteOptimizationJob.__table__
+        try:
+            with db.engine.begin() as connection:
+                connection.execute(update(table).where(table.c.id == job_id)
+                                   .values(progress=progress, updated_at=datetime.utcnow()))
+        except Exception as e:
+            print(f"Could not save progress of job {job_id}: {e}")
+
+    def _publish(self, job_id: str, status: str, progress: Dict):
+        with self._condition:
+            state = self._states.pop(job_id, {'version': 0})
+            self._states[job_id] = {'version': state['version'] + 1, 'status': status, 'progress': progress}
+            finished = [key for key, value in self._states.items() if value['status'] in FINISHED_STATUSES]
+            for key in finished[:max(0, len(finished) - self.max_finished)]:
+                del self._states[key]
+            self._condition.notify_all()
+
+    def owns(self, job_id: str) -> bool:
+        """Whether this process is tracking the job (it ran here and was not evicted since)."""
+        with self._condition:
+            return job_id in self._states
+
+    def wait(self, job_id: str, after_version: int = 0, timeout: float = 15.0) -> Optional[Dict]:
+        """
+        Block until this process has a newer update of a job than after_version.
+
+        Returns:
+            {'version', 'status', 'progress'}, or None on timeout or when the
+            job is not running in this process
+        """
+        def newer():
+            state = self._states.get(job_id)
+            return state is not None and state['version'] > after_version
+
+        with self._condition:
+            if job_id not in self._states:
+                return None
+            if not self._condition.wait_for(newer, timeout):
+                return None
+            return dict(self._states[job_id])
@@ -0,0 +1,250 @@
+from datetime import date, datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import delete, exists, insert, inspect, select, text
+from sqlalchemy.orm import aliased
+from src.models.database import db, Customer, Delivery, Order, Plan, Subscription
+from src.utils.geocoding import format_customer_address
+
+# Longest range generated by one call
+MAX_GENERATION_DAYS = 31
+
+# (subscription, day) pairs inserted and committed together
+GENERATION_CHUNK_SIZE = 2000
+
+ORDER_UNIQUE_COLUMNS = ('subscription_id', 'order_date', 'meal_type')
+ORDER_UNIQUE_INDEX = 'uq_order_subscription_date_meal'
+
+
+def has_order_unique_index() -> bool:
+    """Whether the orders table enforces one order per subscription, day and meal."""
+    inspector = inspect(db.session.get_bind())
+    wanted = set(ORDER_UNIQUE_COLUMNS)
+    constraints = inspector.get_unique_constraints('orders')
+    indexes = [index for index in inspector.get_indexes('orders') if index.get('unique')]
+    return any(set(entry['column_names']) == wanted for entry in constraints + indexes)
+
+
+def duplicate_orders() -> List[Dict]:
+    """
+    Orders that repeat an earlier (subscription, day, meal) order, with
+    the oldest order kept and the ids of the duplicates' deliveries.
+    """
+    kept = aliased(Order)
+    rows = db.session.execute(
+        select(Order.id, Order.subscription_id, Order.order_date, Order.meal_type,
+               select(kept.id).where(kept.subscription_id == Order.subscription_id,
+                                     kept.order_date == Order.order_date,
+                                     kept.meal_type == Order.meal_type)
+               .order_by(kept.id).limit(1).scalar_subquery().label('kept_id'))
+        .where(exists().where(kept.subscription_id == Order.subscription_id,
+                              kept.order_date == Order.order_date,
+                              kept.meal_type == Order.meal_type,
+                              kept.id < Order.id))
+        .order_by(Order.id)
+    ).all()
+    deliveries: Dict[int, List[int]] = {}
+    if rows:
+        for delivery_id, order_id in db.session.execute(
+                select(Delivery.id, Delivery.order_id).where(Delivery.order_id.in_([row.id for row in rows]))):
+            deliveries.setdefault(order_id, []).append(delivery_id)
+    return [{
+        'order_id': row.id,
+        'kept_order_id': row.kept_id,
+        'subscription_id': row.subscription_id,
+        'order_date': row.order_date.isoformat(),
+        'meal_type': row.meal_type,
+        'delivery_ids': deliveries.get(row.id, [])
+    } for row in rows]
+
+
+def add_order_unique_index(apply: bool = False) -> List[Dict]:
+    """
+    Add the orders unique index to a database created before it existed
+    (db.create_all() does not alter existing tables).
+
+    The index cannot be created while duplicates exist, so duplicate
+    orders and their deliveries are deleted first, keeping the oldest
+    order of each (subscription, day, meal). Without apply nothing is
+    changed: the duplicates that would be deleted are only reported.
+    Run it through scripts/add_order_unique_index.py.
+
+    Returns:
+        The duplicates, as from duplicate_orders()
+    """
+    duplicates = duplicate_orders()
+    if not apply or has_order_unique_index():
+        return duplicates
+    order_ids = [entry['order_id'] for entry in duplicates]
+    if order_ids:
+        db.session.execute(delete(Delivery).where(Delivery.order_id.in_(order_ids)))
+        db.session.execute(delete(Order).where(Order.id.in_(order_ids)))
+    db.session.execute(text(f"CREATE UNIQUE INDEX IF NOT EXISTS {ORDER_UNIQUE_INDEX} "
+                            f"ON orders ({', '.join(ORDER_UNIQUE_COLUMNS)})"))
+    db.session.commit()
+    return duplicates
+
+
+def subscription_rows(start_date: date, end_date: date) -> List:
+    """
+    Active subscriptions overlapping start_date..end_date, joined with the
+    customer and plan columns order generation needs, in a single query.
+    """
+    query = select(
+        Subscription.id,
+        Subscription.customer_id,
+        Subscription.start_date,
+        Subscription.end_date,
+        Subscription.pause_start_date,
+        Subscription.pause_end_date,
+        Plan.price,
+        Plan.meals_per_week,
+        Customer.first_name,
+        Customer.last_name,
+        Customer.address_line1,
+        Customer.address_line2,
+        Customer.city,
+        Customer.province,
+        Customer.postal_code,
+        Customer.delivery_instructions,
+        Customer.delivery_window_start,
+        Customer.delivery_window_end
+    ).join(Customer, Subscription.customer_id == Customer.id)\
+     .join(Plan, Subscription.plan_id == Plan.id)\
+     .where(Subscription.status == 'active')\
+     .where(Subscription.start_date <= end_date)\
+     .where((Subscription.end_date.is_(None)) | (Subscription.end_date >= start_date))\
+     .order_by(Subscription.id)
+    return db.session.execute(query).all()
+
+
+def delivers_on(row, day: date) -> bool:
+    """Whether a subscription row is running and not paused on day."""
+    if row.start_date > day or (row.end_date is not None and row.end_date < day):
+        return False
+    return row.pause_start_date is None or row.pause_start_date > day or \
+        (row.pause_end_date is not None and row.pause_end_date < day)
+
+
+def _insert_ignoring_duplicates(table):
+    """
+    INSERT that skips rows violating a unique constraint, in the bind's
+    dialect. Other dialects would need both a conflict clause and
+    RETURNING, so they are refused rather than allowed to duplicate.
+    """
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as pg_insert
+        return pg_insert(table).on_conflict_do_nothing()
+    if dialect == 'sqlite':
+        return insert(table).prefix_with('OR IGNORE')
+    raise RuntimeError(f"Order generation supports PostgreSQL and SQLite, not {dialect}")
+
+
+def generate_orders(start_date: date, end_date: Optional[date] = None, meal_type: str = 'lunch',
+                    exclude_customers: Iterable[int] = (),
+                    chunk_size: int = GENERATION_CHUNK_SIZE) -> Tuple[List[Dict], List[Dict]]:
+    """
+    Create the order and delivery of every active subscription for each
+    day from start_date to end_date (inclusive; a single day by default).
+
+    Subscriptions come from one joined query and excluded customers are
+    dropped with a hash-set lookup. Duplicates are left to the unique
+    constraint on (subscription_id, order_date, meal_type): orders are
+    inserted with ON CONFLICT DO NOTHING on PostgreSQL and INSERT OR
+    IGNORE on SQLite, returning the ids of the rows actually inserted,
+    so concurrent or repeated runs never create a second order. Databases
+    older than the constraint must get it from add_order_unique_index()
+    first; until then generation refuses to run. Each
+    chunk of orders is inserted in one executemany statement, its
+    deliveries in a second, and committed.
+
+    Returns:
+        (created orders as Order.to_dict() entries, skipped subscriptions)
+    """
+    if not has_order_unique_index():
+        raise RuntimeError('The orders table has no unique index on (subscription_id, order_date, meal_type), '
+                           'so duplicates would not be skipped; run scripts/add_order_unique_index.py first')
+    end_date = end_date or start_date
+    if end_date < start_date:
+        raise ValueError('end_date must not be before start_date')
+    days = [start_date + timedelta(days=offset) for offset in range((end_date - start_date).days + 1)]
+    if len(days) > MAX_GENERATION_DAYS:
+        raise ValueError(f'Orders can be generated for at most {MAX_GENERATION_DAYS} days at a time')
+
+    excluded = set(exclude_customers)
+    rows = [row for row in subscription_rows(start_date, end_date) if row.customer_id not in excluded]
+    pairs = [(row, day) for day in days for row in rows if delivers_on(row, day)]
+
+    created, skipped = [], []
+    addresses = {}
+    for start in range(0, len(pairs), chunk_size):
+        chunk_created, chunk_skipped = _insert_chunk(pairs[start:start + chunk_size], meal_type, addresses)
+        db.session.commit()
+        created.extend(chunk_created)
+        skipped.extend(chunk_skipped)
+    return created, skipped
+
+
+def _insert_chunk(pairs: List[Tuple], meal_type: str, addresses: Dict[int, str]) -> Tuple[List[Dict], List[Dict]]:
+    """Insert the orders of (subscription row, day) pairs and the deliveries of those not already present."""
+    now = datetime.utcnow()
+    order_rows = [{
+        'subscription_id': row.id,
+        'customer_id': row.customer_id,
+        'order_date': day,
+        'meal_type': meal_type,
+        'status': 'pending',
+        'total_amount': row.price / row.meals_per_week,  # Daily rate
+        'created_at': now,
+        'updated_at': now
+    } for row, day in pairs]
+    table = Order.__table__
+    inserted = db.session.execute(
+        _insert_ignoring_duplicates(table).returning(table.c.id, table.c.subscription_id, table.c.order_date),
+        order_rows
+    ).all()
+    order_ids = {(subscription_id, order_date): order_id for order_id, subscription_id, order_date in inserted}
+
+    created, skipped, delivery_rows = [], [], []
+    for (row, day), order in zip(pairs, order_rows):
+        order_id = order_ids.get((row.id, day))
+        if order_id is None:
+            skipped.append({
+                'customer_id': row.customer_id,
+                'customer_name': f"{row.first_name} {row.last_name}",
+                'order_date': day.isoformat(),
+                'reason': 'Order already exists'
+            })
+            continue
+        address = addresses.get(row.customer_id)
+        if address is None:
+            address = addresses[row.customer_id] = format_customer_address(row)
+        delivery_rows.append({
+            'order_id': order_id,
+            'delivery_date': day,
+            'delivery_zone': row.city,  # Use city as zone for now
+            'delivery_address': address,
+            'delivery_instructions': row.delivery_instructions,
+            'delivery_window_start': row.delivery_window_start,
+            'delivery_window_end': row.delivery_window_end,
+            'delivery_status': 'scheduled',
+            'created_at': now,
+            'updated_at': now
+        })
+        created.append({
+            'id': order_id,
+            'subscription_id': row.id,
+            'customer_id': row.customer_id,
+            'order_date': day.isoformat(),
+            'meal_type': meal_type,
+            'status': 'pending',
+            'preparation_notes': None,
+            'packing_notes': None,
+            'special_requests': None,
+            'total_amount': float(order['total_amount']) if order['total_amount'] else 0.00,
+            'created_at': now.isoformat(),
+            'updated_at': now.isoformat()
+        })
+    if delivery_rows:
+        db.session.execute(insert(Delivery.__table__), delivery_rows)
+    return created, skipped
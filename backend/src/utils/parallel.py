@@ -0,0 +1,145 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from .matrix_store import mapped_prefix, pin_file, unpin_file
+
+_worker_optimizer = None
+_worker_planner = None
+
+
+def default_worker_count() -> int:
+    """
+    Worker processes for parallel route solves, from ROUTE_OPTIMIZER_WORKERS.
+    Unset means 1 (solve in the calling thread); 0 means one per CPU.
+    """
+    configured = int(os.environ.get('ROUTE_OPTIMIZER_WORKERS') or 1)
+    if configured <= 0:
+        return os.cpu_count() or 1
+    return configured
+
+
+class SharedMatrix:
+    """
+    A NumPy array copied once into shared memory.
+
+    Worker processes attach to it by name, so each task only pickles the
+    handle and a short list of node indices instead of the matrix itself.
+    A matrix that is already a view of a DistanceMatrixStore file is not
+    copied at all: the handle names the file, which stays pinned so the
+    store keeps it even if it grows meanwhile, and workers map it read-only.
+    Use as a context manager; the block is unlinked (or the file unpinned)
+    on exit.
+    """
+
+    def __init__(self, array: np.ndarray):
+        self._shm = None
+        self._pin = None
+        mapped = mapped_prefix(array)
+        if mapped is not None:
+            path, capacity, _ = mapped
+            self._pin = pin_file(path)
+            if self._pin is not None:
+                self._handle = ('file', path, (capacity, capacity), array.dtype.str)
+                return
+        array = np.ascontiguousarray(array)
+        self._shm = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+        np.ndarray(array.shape, dtype=array.dtype, buffer=self._shm.buf)[...] = array
+        self._handle = ('shm', self._shm.name, array.shape, array.dtype.str)
+
+    @property
+    def handle(self) -> Tuple[str, str, Tuple[int, ...], str]:
+        return self._handle
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        unpin_file(self._pin)
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+
+
+def _sequence_stops(handle: Tuple[str, str, Tuple[int, ...], str], nodes: List[int],
+                    time_budget_ms: Optional[float],
+                    coordinates: Optional[List[Tuple[float, float]]] = None
+                    ) -> Tuple[List[int], str, float, Optional[Dict]]:
+    """Worker task: sequence one route over the rows/columns `nodes` of the shared matrix."""
+    global _worker_optimizer
+    if _worker_optimizer is None:
+        from .route_optimizer import RouteOptimizer
+        _worker_optimizer = RouteOptimizer()
+
+    kind, name, shape, dtype = handle
+    if kind == 'file':
+        matrix = np.memmap(name, dtype=dtype, mode='r', shape=shape)
+        sub_matrix = np.array(matrix[np.ix_(nodes, nodes)])
+        del matrix
+    else:
+        shm = shared_memory.SharedMemory(name=name)
+        matrix = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+        sub_matrix = matrix[np.ix_(nodes, nodes)]  # fancy indexing copies out of the shared block
+        del matrix
+        shm.close()
+    return _worker_optimizer._sequence_route(sub_matrix, {}, time_budget_ms, coordinates=coordinates)
+
+
+def sequence_routes_parallel(distance_matrix: np.ndarray, node_lists: List[List[int]],
+                             time_budgets_ms: List[Optional[float]],
+                             workers: int, coordinates: Optional[List[Tuple[float, float]]] = None
+                             ) -> List[Tuple[List[int], str, float, Optional[Dict]]]:
+    """
+    Sequence independent routes in a process pool.
+
+    Args:
+        distance_matrix: Full matrix; shared with the workers, not pickled
+        node_lists: Matrix indices of each route, depot (0) first
+        time_budgets_ms: Anytime budget of each route (None for plain 2-opt)
+        workers: Number of worker processes
+        coordinates: (lat, lon) of every matrix node, for the spatial grid
+
+    Returns:
+        _sequence_route results, in the order of node_lists
+    """
+    with SharedMatrix(distance_matrix) as shared:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(_sequence_stops, shared.handle, nodes, budget,
+                                   [coordinates[node] for node in nodes] if coordinates is not None else None)
+                       for nodes, budget in zip(node_lists, time_budgets_ms)]
+            return [future.result() for future in futures]
+
+
+def _init_depot_worker(config: Dict):
+    """Worker initializer: rebuild the calling process's optimizer from its worker_config()."""
+    global _worker_planner
+    from .route_optimizer import RouteOptimizer
+    _worker_planner = RouteOptimizer.from_worker_config(config)
+
+
+def _plan_depot(deliveries: List[Dict], start_location: Dict, options: Dict) -> List[Dict]:
+    """Worker task: plan the routes of one depot."""
+    return _worker_planner.plan_depot(deliveries, start_location, **options)
+
+
+def plan_depots_parallel(config: Dict, tasks: List[Tuple[List[Dict], Dict]], options: Dict,
+                         workers: int) -> List[List[Dict]]:
+    """
+    Plan the routes of several depots in a process pool.
+
+    Args:
+        config: RouteOptimizer.worker_config() of the calling optimizer; each
+            worker rebuilds it once, with the same road graph, postal table
+            and matrix store
+        tasks: (deliveries, start_location) of each depot
+        options: Keyword arguments for RouteOptimizer.plan_depot
+        workers: Number of worker processes
+
+    Returns:
+        The routes of each depot, in the order of tasks
+    """
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_depot_worker, initargs=(config,)) as pool:
+        futures = [pool.submit(_plan_depot, deliveries, start_location, options)
+                   for deliveries, start_location in tasks]
+        return [future.result() for future in futures]
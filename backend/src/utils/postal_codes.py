@@ -0,0 +1,68 @@
+import csv
+import os
+import re
+from typing import Dict, Optional, Tuple
+
+DEFAULT_CENTROIDS_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'postal_centroids.csv')
+
+# Canadian postal code, e.g. "V3S 1A1" or "v3s1a1"
+POSTAL_CODE_PATTERN = re.compile(r'\b([A-Za-z]\d[A-Za-z])\s?(\d[A-Za-z]\d)?\b')
+
+
+def normalize_postal_code(postal_code: str) -> str:
+    """Uppercase a postal code and strip spaces/dashes ("v3s 1a1" -> "V3S1A1")."""
+    return re.sub(r'[\s-]', '', postal_code or '').upper()
+
+
+class PostalCodeGeocoder:
+    """
+    Offline geocoder resolving postal codes to centroid coordinates.
+
+    The centroid table is a CSV with postal_code, latitude and longitude
+    columns. Rows may hold full six-character codes or three-character
+    forward sortation areas (FSAs); lookups try the full code first and
+    then fall back to its FSA. The bundled table covers Metro Vancouver and
+    the Fraser Valley at FSA level; set POSTAL_CENTROIDS_PATH to use a
+    more detailed table.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.environ.get('POSTAL_CENTROIDS_PATH') or DEFAULT_CENTROIDS_PATH
+        self._centroids: Optional[Dict[str, Tuple[float, float]]] = None
+
+    @property
+    def centroids(self) -> Dict[str, Tuple[float, float]]:
+        """Centroid table keyed by normalized code, loaded on first use."""
+        if self._centroids is None:
+            self._centroids = self._load(self.path)
+        return self._centroids
+
+    def _load(self, path: str) -> Dict[str, Tuple[float, float]]:
+        centroids = {}
+        try:
+            with open(path, newline='', encoding='utf-8') as f:
+                for row in csv.DictReader(f):
+                    try:
+                        centroids[normalize_postal_code(row['postal_code'])] = (
+                            float(row['latitude']), float(row['longitude'])
+                        )
+                    except (KeyError, TypeError, ValueError):
+                        continue
+        except OSError as e:
+            print(f"Could not load postal code centroids from {path}: {e}")
+        return centroids
+
+    def lookup(self, postal_code: str) -> Optional[Tuple[float, float]]:
+        """Return the centroid for a postal code or its FSA, if known."""
+        code = normalize_postal_code(postal_code)
+        if not code:
+            return None
+        return self.centroids.get(code) or self.centroids.get(code[:3])
+
+    def lookup_address(self, address: str) -> Optional[Tuple[float, float]]:
+        """Find a postal code inside a free-form address and look it up."""
+        for match in POSTAL_CODE_PATTERN.finditer(address or ''):
+            coord = self.lookup(''.join(part for part in match.groups() if part))
+            if coord:
+                return coord
+        return None
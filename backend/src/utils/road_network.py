@@ -0,0 +1,302 @@
+import heapq
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+import networkx as nx
+from .clustering import project_coordinates
+
+# Free-flow speeds (km/h) by OSM highway class, for edges without a speed or travel time
+DEFAULT_SPEEDS_KPH = {
+    'motorway': 90, 'motorway_link': 60, 'trunk': 70, 'trunk_link': 50,
+    'primary': 55, 'primary_link': 45, 'secondary': 50, 'secondary_link': 40,
+    'tertiary': 45, 'tertiary_link': 35, 'residential': 35, 'living_street': 15,
+    'service': 20, 'unclassified': 35,
+}
+FALLBACK_SPEED_KPH = 35
+INF = float('inf')
+
+# Time-of-day bands (start hour, end hour) and the factor travel times are
+# multiplied by in each; edges may override with a travel_time_<band> attribute
+TIME_BANDS = (
+    ('night', 0, 6, 0.9),
+    ('am_peak', 6, 9, 1.35),
+    ('midday', 9, 15, 1.1),
+    ('pm_peak', 15, 19, 1.4),
+    ('evening', 19, 24, 1.0),
+)
+
+
+def time_band(minutes_of_day: Optional[float]) -> str:
+    """Name of the time-of-day band for minutes from midnight (midday when unknown)."""
+    if minutes_of_day is None:
+        return 'midday'
+    hour = (minutes_of_day / 60) % 24
+    for name, start, end, _ in TIME_BANDS:
+        if start <= hour < end:
+            return name
+    return 'midday'
+
+
+class RoadNetwork:
+    """
+    Offline travel times over a local road-graph extract.
+
+    The graph is a GraphML file (e.g. an OSM extract of Metro Vancouver
+    converted with OSMnx) or networkx node-link JSON, loaded from
+    ROAD_GRAPH_PATH on first use. Nodes carry y/x (latitude/longitude);
+    edges carry length in meters and, optionally, travel_time in seconds,
+    speed_kph, maxspeed or highway. Stops are snapped to their nearest graph
+    node, and many-to-many matrices come from one Dijkstra per source that
+    stops as soon as every target is settled and never leaves the stops'
+    bounding box grown by search_margin_km. Matrices are cached per
+    (node set, time-of-day band). Rows and columns extending a matrix by a
+    few new stops come from searches rooted at the new stops only, forward
+    for the rows and over the reversed graph for the columns.
+    """
+
+    def __init__(self, path: Optional[str] = None, cache_size: int = 64, search_margin_km: float = 5.0):
+        self.path = path or os.environ.get('ROAD_GRAPH_PATH')
+        self.cache_size = cache_size
+        self.search_margin_km = search_margin_km
+        self._graph = None
+        self._node_ids: List = []
+        self._node_points: Optional[np.ndarray] = None
+        self._node_coords: Optional[np.ndarray] = None
+        self._adjacency: Dict[str, List[List[Tuple[int, float, float]]]] = {}
+        self._reverse_adjacency: Dict[str, List[List[Tuple[int, float, float]]]] = {}
+        self._matrices: 'OrderedDict[Tuple, Tuple[np.ndarray, np.ndarray]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._load_failed = False
+
+    @property
+    def available(self) -> bool:
+        """Whether a road graph is configured and loads."""
+        return self._load() is not None
+
+    def _load(self):
+        if self._graph is not None or self._load_failed:
+            return self._graph
+        if not self.path:
+            self._load_failed = True
+            return None
+        try:
+            if self.path.endswith('.json'):
+                import json
+                with open(self.path, encoding='utf-8') as f:
+                    graph = nx.node_link_graph(json.load(f), edges='links')
+            else:
+                graph = nx.read_graphml(self.path)
+        except (OSError, ValueError, nx.NetworkXError) as e:
+            print(f"Could not load road graph from {self.path}: {e}")
+            self._load_failed = True
+            return None
+
+        node_ids = [node for node, data in graph.nodes(data=True) if 'x' in data and 'y' in data]
+        self._node_ids = node_ids
+        self._node_coords = np.array([(float(graph.nodes[node]['y']), float(graph.nodes[node]['x']))
+                                      for node in node_ids], dtype=np.float64).reshape(-1, 2)
+        self._node_points = project_coordinates(self._node_coords, origin=self._origin())
+        self._graph = graph
+        return graph
+
+    def _origin(self) -> Tuple[float, float]:
+        return tuple(self._node_coords.mean(axis=0)) if len(self._node_coords) else (0.0, 0.0)
+
+    def _edge_seconds(self, data: Dict, band: str) -> float:
+        """Travel time of an edge in seconds for a time-of-day band."""
+        override = data.get(f'travel_time_{band}')
+        if override is not None:
+            return float(override)
+        factor = next(f for name, _, _, f in TIME_BANDS if name == band)
+        if data.get('travel_time') is not None:
+            return float(data['travel_time']) * factor
+        length_m = float(data.get('length', 0.0))
+        speed = data.get('speed_kph') or data.get('maxspeed')
+        try:
+            speed = float(str(speed).split()[0].split(';')[0]) if speed is not None else None
+        except ValueError:
+            speed = None
+        if not speed:
+            highway = data.get('highway')
+            highway = highway[0] if isinstance(highway, list) else highway
+            speed = DEFAULT_SPEEDS_KPH.get(highway, FALLBACK_SPEED_KPH)
+        return length_m / (speed / 3.6) * factor
+
+    def _adjacency_for(self, band: str) -> List[List[Tuple[int, float, float]]]:
+        """Per-node (neighbor index, seconds, meters) lists, fastest parallel edge only."""
+        adjacency = self._adjacency.get(band)
+        if adjacency is not None:
+            return adjacency
+        graph = self._graph
+        index = {node: k for k, node in enumerate(self._node_ids)}
+        best: List[Dict[int, Tuple[float, float]]] = [dict() for _ in self._node_ids]
+        edges = graph.edges(data=True)
+        for u, v, data in edges:
+            if u not in index or v not in index:
+                continue
+            seconds = self._edge_seconds(data, band)
+            meters = float(data.get('length', 0.0))
+            pairs = [(index[u], index[v])]
+            if not graph.is_directed():
+                pairs.append((index[v], index[u]))
+            for a, b in pairs:
+                current = best[a].get(b)
+                if current is None or seconds < current[0]:
+                    best[a][b] = (seconds, meters)
+        adjacency = [[(b, seconds, meters) for b, (seconds, meters) in neighbors.items()] for neighbors in best]
+        self._adjacency[band] = adjacency
+        return adjacency
+
+    def _reverse_adjacency_for(self, band: str) -> List[List[Tuple[int, float, float]]]:
+        """Adjacency of the graph with every edge reversed."""
+        reverse = self._reverse_adjacency.get(band)
+        if reverse is None:
+            reverse = [[] for _ in self._node_ids]
+            for a, neighbors in enumerate(self._adjacency_for(band)):
+                for b, seconds, meters in neighbors:
+                    reverse[b].append((a, seconds, meters))
+            self._reverse_adjacency[band] = reverse
+        return reverse
+
+    def snap(self, coordinates: Sequence[Tuple[float, float]], chunk_size: int = 256) -> np.ndarray:
+        """Index of the nearest graph node for each (lat, lon), searched in vectorized chunks."""
+        points = project_coordinates(coordinates, origin=self._origin())
+        nearest = np.empty(len(points), dtype=np.int64)
+        nodes = self._node_points
+        for start in range(0, len(points), chunk_size):
+            chunk = points[start:start + chunk_size]
+            dist = (np.subtract.outer(chunk[:, 0], nodes[:, 0]) ** 2 +
+                    np.subtract.outer(chunk[:, 1], nodes[:, 1]) ** 2)
+            nearest[start:start + chunk_size] = np.argmin(dist, axis=1)
+        return nearest
+
+    def matrices(self, coordinates: Sequence[Tuple[float, float]],
+                 departure_minutes: Optional[float] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Road travel times (minutes) and distances (km) between all coordinates.
+
+        Distances follow the fastest path. Pairs with no path are NaN so the
+        caller can fall back to its straight-line estimate.
+        """
+        if self._load() is None:
+            raise ValueError("No road graph available (set ROAD_GRAPH_PATH)")
+        band = time_band(departure_minutes)
+        snapped = self.snap(coordinates)
+        nodes = tuple(int(node) for node in snapped)
+        key = (nodes, band)
+
+        with self._lock:
+            cached = self._matrices.get(key)
+            if cached is not None:
+                self._matrices.move_to_end(key)
+                return cached[0].copy(), cached[1].copy()
+
+        unique = sorted(set(nodes))
+        column = {node: k for k, node in enumerate(unique)}
+        adjacency = self._adjacency_for(band)
+        blocked = self._outside_region(unique)
+        seconds = np.full((len(unique), len(unique)), np.nan)
+        meters = np.full((len(unique), len(unique)), np.nan)
+        for row, source in enumerate(unique):
+            for target, (time_s, length_m) in self._dijkstra(adjacency, source, column, blocked).items():
+                seconds[row, column[target]] = time_s
+                meters[row, column[target]] = length_m
+
+        positions = [column[node] for node in nodes]
+        minutes = (seconds[np.ix_(positions, positions)] / 60).astype(np.float32)
+        km = (meters[np.ix_(positions, positions)] / 1000).astype(np.float32)
+        np.fill_diagonal(minutes, 0.0)
+        np.fill_diagonal(km, 0.0)
+
+        with self._lock:
+            self._matrices[key] = (minutes, km)
+            while len(self._matrices) > self.cache_size:
+                self._matrices.popitem(last=False)
+        return minutes.copy(), km.copy()
+
+    def blocks(self, new: Sequence[Tuple[float, float]], coordinates: Sequence[Tuple[float, float]],
+               departure_minutes: Optional[float] = None) -> Tuple[Tuple[np.ndarray, np.ndarray],
+                                                                    Tuple[np.ndarray, np.ndarray]]:
+        """
+        Road travel times (minutes) and distances (km) from each new
+        coordinate to every coordinate, and from every coordinate to each
+        new one: the rows and columns that extend a matrix by new stops.
+
+        Takes two searches per new stop instead of one per stop of the
+        whole matrix. Pairs with no path are NaN, as in matrices().
+
+        Returns:
+            (minutes, km) rows of shape (len(new), len(coordinates)) and
+            (minutes, km) columns of shape (len(coordinates), len(new))
+        """
+        if self._load() is None:
+            raise ValueError("No road graph available (set ROAD_GRAPH_PATH)")
+        band = time_band(departure_minutes)
+        new_nodes = [int(node) for node in self.snap(new)]
+        nodes = [int(node) for node in self.snap(coordinates)]
+        unique_new = sorted(set(new_nodes))
+        unique = sorted(set(nodes) | set(unique_new))
+        column = {node: k for k, node in enumerate(unique)}
+        blocked = self._outside_region(unique)
+
+        def search(adjacency):
+            seconds = np.full((len(unique_new), len(unique)), np.nan)
+            meters = np.full((len(unique_new), len(unique)), np.nan)
+            for row, source in enumerate(unique_new):
+                for target, (time_s, length_m) in self._dijkstra(adjacency, source, column, blocked).items():
+                    seconds[row, column[target]] = time_s
+                    meters[row, column[target]] = length_m
+            row_of = {node: k for k, node in enumerate(unique_new)}
+            rows = [row_of[node] for node in new_nodes]
+            columns = [column[node] for node in nodes]
+            return ((seconds[np.ix_(rows, columns)] / 60).astype(np.float32),
+                    (meters[np.ix_(rows, columns)] / 1000).astype(np.float32))
+
+        forward = search(self._adjacency_for(band))
+        backward = search(self._reverse_adjacency_for(band))
+        return forward, (backward[0].T.copy(), backward[1].T.copy())
+
+    def _outside_region(self, nodes: Sequence[int]) -> bytearray:
+        """Flags for graph nodes outside the nodes' bounding box plus the search margin."""
+        points = self._node_points
+        low = points[list(nodes)].min(axis=0) - self.search_margin_km
+        high = points[list(nodes)].max(axis=0) + self.search_margin_km
+        outside = ((points < low) | (points > high)).any(axis=1)
+        return bytearray(outside.astype(np.uint8).tobytes())
+
+    @staticmethod
+    def _dijkstra(adjacency: List[List[Tuple[int, float, float]]], source: int,
+                  targets: Dict[int, int], blocked: bytearray) -> Dict[int, Tuple[float, float]]:
+        """
+        Shortest times (and their lengths) from source over the unblocked
+        nodes, stopping once every target is settled.
+        """
+        size = len(adjacency)
+        best = [INF] * size
+        length = [0.0] * size
+        settled = bytearray(blocked)
+        best[source] = 0.0
+        remaining = len(targets)
+        found = {}
+        heap = [(0.0, source)]
+        pop, push = heapq.heappop, heapq.heappush
+        while heap:
+            time_s, node = pop(heap)
+            if settled[node]:
+                continue
+            settled[node] = 1
+            if node in targets:
+                found[node] = (time_s, length[node])
+                remaining -= 1
+                if not remaining:
+                    break
+            node_length = length[node]
+            for neighbor, edge_s, edge_m in adjacency[node]:
+                candidate = time_s + edge_s
+                if candidate < best[neighbor] and not settled[neighbor]:
+                    best[neighbor] = candidate
+                    length[neighbor] = node_length + edge_m
+                    push(heap, (candidate, neighbor))
+        return found
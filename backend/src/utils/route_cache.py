@@ -0,0 +1,97 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple
+
+
+class RouteCache:
+    """
+    In-process cache of solved single-vehicle tours.
+
+    Tours are stored as ordered lists of stop keys (delivery id plus
+    coordinates), with whether they were solved exactly and their lower
+    bound, under a fingerprint of the whole stop set, start location,
+    distance mode and time budget, so an unchanged day is answered without
+    solving and reports the same optimality gap. The latest tour of each
+    scope (a start location and an optional plan key such as the delivery
+    date) is also kept, so a day that changed slightly can be patched from
+    its previous plan instead of solved from scratch.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._tours: 'OrderedDict[str, Dict]' = OrderedDict()
+        self._latest: 'OrderedDict[Hashable, List[str]]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def stop_key(delivery: Dict, coord: Tuple[float, float], index: Optional[int] = None) -> str:
+        """
+        Identity of a stop: the delivery id and where it is. Stops without an
+        id are told apart by their input index, so that two of them at the
+        same address stay two stops.
+        """
+        identity = delivery.get('id')
+        if identity is None:
+            identity = f"{delivery.get('delivery_address', '')}#{index}"
+        return f"{identity}@{coord[0]:.6f},{coord[1]:.6f}"
+
+    @classmethod
+    def stop_keys(cls, deliveries: Sequence[Dict], coordinates: Sequence[Tuple[float, float]]) -> List[str]:
+        """Keys of a route's stops, unique even when deliveries repeat an id."""
+        keys, seen = [], set()
+        for index, (delivery, coord) in enumerate(zip(deliveries, coordinates)):
+            key = cls.stop_key(delivery, coord, index)
+            if key in seen:
+                key = f"{key}#{index}"
+            seen.add(key)
+            keys.append(key)
+        return keys
+
+    @staticmethod
+    def fingerprint(stop_keys: Sequence[str], start_coord: Tuple[float, float], distance_mode: str = '',
+                    time_budget_ms: Optional[float] = None) -> str:
+        """Order-independent hash of the stop set, start location, distance mode and budget."""
+        digest = hashlib.sha1(
+            f"{start_coord[0]:.6f},{start_coord[1]:.6f}|{distance_mode}|{time_budget_ms}".encode()
+        )
+        for key in sorted(stop_keys):
+            digest.update(b'|')
+            digest.update(key.encode())
+        return digest.hexdigest()
+
+    @staticmethod
+    def scope(start_coord: Tuple[float, float], plan_key: Optional[str] = None) -> Hashable:
+        return (round(start_coord[0], 6), round(start_coord[1], 6), plan_key)
+
+    def get(self, fingerprint: str) -> Optional[Dict]:
+        """Cached {'tour', 'exact', 'lower_bound_km'} for exactly this stop set, if any."""
+        with self._lock:
+            entry = self._tours.get(fingerprint)
+            if entry is None:
+                return None
+            self._tours.move_to_end(fingerprint)
+            return dict(entry, tour=list(entry['tour']))
+
+    def latest(self, scope: Hashable) -> Optional[List[str]]:
+        """Most recently stored tour for a scope, if any."""
+        with self._lock:
+            tour = self._latest.get(scope)
+            return list(tour) if tour is not None else None
+
+    def store(self, fingerprint: str, scope: Hashable, tour: Sequence[str], exact: bool = False,
+              lower_bound_km: Optional[float] = None):
+        with self._lock:
+            self._tours[fingerprint] = {'tour': list(tour), 'exact': exact, 'lower_bound_km': lower_bound_km}
+            self._tours.move_to_end(fingerprint)
+            self._latest[scope] = list(tour)
+            self._latest.move_to_end(scope)
+            while len(self._tours) > self.max_entries:
+                self._tours.popitem(last=False)
+            while len(self._latest) > self.max_entries:
+                self._latest.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._tours.clear()
+            self._latest.clear()
@@ -1,20 +1,135 @@
 import math
 import random
-from typing import List, Dict, Tuple, Optional
+import time
+from typing import Callable, List, Dict, Tuple, Optional
+import numpy as np
 from geopy.distance import geodesic
 from geopy.geocoders import Nominatim
-import networkx as nx
 from datetime import datetime, timedelta
+from .postal_codes import PostalCodeGeocoder
+from .local_search import LocalSearch
+from .vrp import CVRPSolver
+from .clustering import CLUSTERING_METHODS, assign_to_depots, capacitated_kmeans, polar_sweep
+from .route_cache import RouteCache
+from .road_network import RoadNetwork
+from .parallel import default_worker_count, plan_depots_parallel, sequence_routes_parallel
+from .time_windows import VRPTWSolver, minutes_of_day, format_minutes
+from .spatial_index import GRID_MIN_TOUR_POINTS, SpatialGrid
+from .matrix_store import DistanceMatrixStore
+from .stops import StopTable
+from .held_karp import HELD_KARP_MAX_STOPS, held_karp_path, one_tree_bound
+from .workload import DEFAULT_SHIFT_MINUTES, WorkloadBalancer
+
+# Mean Earth radius and WGS-84 ellipsoid parameters (kilometers)
+EARTH_RADIUS_KM = 6371.0088
+WGS84_A_KM = 6378.137
+WGS84_F = 1 / 298.257223563
+
+DISTANCE_MODES = ('haversine', 'ellipsoidal', 'geodesic', 'road')
+
+
+def _central_angle(lat1, lon1, lat2, lon2):
+    """Great-circle central angle (radians) between broadcastable arrays of radians."""
+    sin_dlat = np.sin((lat2 - lat1) / 2)
+    sin_dlon = np.sin((lon2 - lon1) / 2)
+    h = sin_dlat ** 2 + np.cos(lat1) * np.cos(lat2) * sin_dlon ** 2
+    return 2 * np.arcsin(np.sqrt(np.clip(h, 0.0, 1.0)))
+
+
+def haversine_matrix(coords_a, coords_b=None) -> np.ndarray:
+    """
+    Spherical distance matrix (km) between two sets of (lat, lon) points.
+    Computed in a single NumPy broadcast; returns a float32 array.
+    """
+    a = np.radians(np.asarray(coords_a, dtype=np.float64).reshape(-1, 2))
+    b = a if coords_b is None else np.radians(np.asarray(coords_b, dtype=np.float64).reshape(-1, 2))
+    sigma = _central_angle(a[:, 0, None], a[:, 1, None], b[None, :, 0], b[None, :, 1])
+    return (EARTH_RADIUS_KM * sigma).astype(np.float32)
+
+
+def ellipsoidal_matrix(coords_a, coords_b=None) -> np.ndarray:
+    """
+    WGS-84 distance matrix (km) using Lambert's formula for long lines.
+    Agrees with geopy's geodesic to within a few meters at city scale.
+    """
+    a = np.radians(np.asarray(coords_a, dtype=np.float64).reshape(-1, 2))
+    b = a if coords_b is None else np.radians(np.asarray(coords_b, dtype=np.float64).reshape(-1, 2))
+
+    # Reduced latitudes on the ellipsoid
+    beta_a = np.arctan((1 - WGS84_F) * np.tan(a[:, 0]))[:, None]
+    beta_b = np.arctan((1 - WGS84_F) * np.tan(b[:, 0]))[None, :]
+    sigma = _central_angle(beta_a, a[:, 1, None], beta_b, b[None, :, 1])
+
+    p = (beta_a + beta_b) / 2
+    q = (beta_b - beta_a) / 2
+    with np.errstate(divide='ignore', invalid='ignore'):
+        x = (sigma - np.sin(sigma)) * (np.sin(p) ** 2 * np.cos(q) ** 2) / np.cos(sigma / 2) ** 2
+        y = (sigma + np.sin(sigma)) * (np.cos(p) ** 2 * np.sin(q) ** 2) / np.sin(sigma / 2) ** 2
+        distance = WGS84_A_KM * (sigma - WGS84_F / 2 * (x + y))
+    return np.where(sigma > 0, distance, 0.0).astype(np.float32)
+
 
 class RouteOptimizer:
-    def __init__(self):
+    # Driving and service time model used for delivery time estimates
+    SERVICE_MINUTES = 15
+    MINUTES_PER_KM = 3
+    MIN_TRAVEL_MINUTES = 5
+    # Routes of up to HELD_KARP_MAX_STOPS stops are solved exactly; longer
+    # ones spend at most this long tightening their lower bound. With an
+    # anytime budget the bounds get this share of it, taken from the search
+    EXACT_ALGORITHM = 'Held-Karp dynamic programming (exact)'
+    LOWER_BOUND_BUDGET_MS = 250
+    LOWER_BOUND_BUDGET_FRACTION = 0.1
+    
+    def __init__(self, distance_mode: str = 'haversine',
+                 postal_geocoder: Optional[PostalCodeGeocoder] = None,
+                 workers: Optional[int] = None,
+                 route_cache: Optional[RouteCache] = None,
+                 road_network: Optional[RoadNetwork] = None,
+                 matrix_store: Optional[DistanceMatrixStore] = None,
+                 geocode_store=None):
+        if distance_mode not in DISTANCE_MODES:
+            raise ValueError(f"Unknown distance mode: {distance_mode}")
         self.geocoder = Nominatim(user_agent="tiffin_crm")
+        self.postal_geocoder = postal_geocoder or PostalCodeGeocoder()
+        self.distance_mode = distance_mode
+        self.workers = workers
+        self.route_cache = route_cache or RouteCache()
+        self.road_network = road_network or RoadNetwork()
+        self.matrix_store = matrix_store or DistanceMatrixStore()
+        # A GeocodeStore (rate-limited, cached; needs an app context) that
+        # network geocodes go through, else the geocoder is called directly
+        self.geocode_store = geocode_store
         
+    def worker_config(self) -> Dict:
+        """Picklable settings worker processes rebuild an equivalent optimizer from."""
+        return {
+            'distance_mode': self.distance_mode,
+            'postal_centroids_path': self.postal_geocoder.path,
+            'road_graph_path': self.road_network.path,
+            'road_cache_size': self.road_network.cache_size,
+            'road_search_margin_km': self.road_network.search_margin_km,
+            'matrix_store_directory': self.matrix_store.directory,
+            'matrix_store_initial_capacity': self.matrix_store.initial_capacity
+        }
+    
+    @classmethod
+    def from_worker_config(cls, config: Dict) -> 'RouteOptimizer':
+        """Single-process optimizer with the road graph, postal table and matrix store of worker_config()."""
+        return cls(distance_mode=config['distance_mode'], workers=1,
+                   postal_geocoder=PostalCodeGeocoder(config['postal_centroids_path']),
+                   road_network=RoadNetwork(config['road_graph_path'], cache_size=config['road_cache_size'],
+                                            search_margin_km=config['road_search_margin_km']),
+                   matrix_store=DistanceMatrixStore(config['matrix_store_directory'],
+                                                    initial_capacity=config['matrix_store_initial_capacity']))
+    
     def geocode_address(self, address: str) -> Optional[Tuple[float, float]]:
         """
-        Convert address to latitude and longitude coordinates.
-        In a production environment, you would cache these results.
+        Convert address to latitude and longitude coordinates, through the
+        geocode store when there is one, else as an uncached network lookup.
         """
+        if self.geocode_store is not None:
+            return self.geocode_store.resolve(address)
         try:
             location = self.geocoder.geocode(address, timeout=10)
             if location:
@@ -23,244 +138,863 @@ class RouteOptimizer:
             print(f"Geocoding error for {address}: {e}")
         return None
     
+    def resolve_coordinates(self, delivery: Dict) -> Tuple[float, float]:
+        """
+        Coordinates for a delivery, cheapest source first: stored coordinates,
+        the offline postal-code centroid table, a network geocode, and finally
+        a city-level centroid.
+        """
+        if delivery.get('latitude') is not None and delivery.get('longitude') is not None:
+            return (delivery['latitude'], delivery['longitude'])
+        
+        address = delivery.get('delivery_address', '') or ''
+        coord = self.postal_geocoder.lookup(delivery.get('postal_code', '')) or \
+            self.postal_geocoder.lookup_address(address)
+        if coord:
+            return coord
+        
+        coord = self.geocode_address(address)
+        if coord:
+            return coord
+        
+        # Last resort: approximate coordinates based on city
+        city = delivery.get('city') or 'Langley'
+        if 'Surrey' in address or 'Surrey' in city:
+            return (49.1913, -122.8490)  # Surrey, BC
+        elif 'Vancouver' in address or 'Vancouver' in city:
+            return (49.2827, -123.1207)  # Vancouver, BC
+        elif 'Burnaby' in address or 'Burnaby' in city:
+            return (49.2488, -122.9805)  # Burnaby, BC
+        return (49.1042, -122.6604)  # Default to Langley, BC
+    
     def calculate_distance(self, coord1: Tuple[float, float], coord2: Tuple[float, float]) -> float:
         """Calculate distance between two coordinates in kilometers."""
         return geodesic(coord1, coord2).kilometers
     
-    def create_distance_matrix(self, coordinates: List[Tuple[float, float]]) -> List[List[float]]:
-        """Create a distance matrix for all coordinates."""
+    def create_distance_matrix(self, coordinates: List[Tuple[float, float]],
+                               mode: Optional[str] = None, plan_key: Optional[str] = None) -> np.ndarray:
+        """
+        Create a float32 distance matrix (km) for all coordinates.
+        
+        'haversine' and 'ellipsoidal' build the whole matrix in one vectorized
+        pass; 'geodesic' makes exact pairwise geopy calls and is meant for
+        validating the fast modes. 'road' uses driving distances along the
+        fastest paths of the local road graph, falling back to haversine for
+        pairs the graph cannot connect (or entirely, if no graph is loaded).
+        
+        With a plan_key (e.g. the delivery date) the matrix comes from the
+        day's memory-mapped store: only rows and columns of coordinates not
+        stored yet are computed, and the result may be a read-only view of
+        the mapped file. Geodesic matrices are never stored.
+        """
+        mode = mode or self.distance_mode
         n = len(coordinates)
-        matrix = [[0.0 for _ in range(n)] for _ in range(n)]
+        if n == 0:
+            return np.zeros((0, 0), dtype=np.float32)
         
-        for i in range(n):
-            for j in range(n):
-                if i != j:
-                    matrix[i][j] = self.calculate_distance(coordinates[i], coordinates[j])
+        if plan_key is not None and mode != 'geodesic':
+            if mode == 'road' and not self.road_network.available:
+                mode = 'haversine'
+            return self.matrix_store.matrix(plan_key, mode, coordinates,
+                                            lambda new, stored: self._append_blocks(new, stored, mode))
         
+        if mode == 'haversine':
+            matrix = haversine_matrix(coordinates)
+        elif mode == 'ellipsoidal':
+            matrix = ellipsoidal_matrix(coordinates)
+        elif mode == 'road':
+            matrix = haversine_matrix(coordinates)
+            if self.road_network.available:
+                _, road_km = self.road_network.matrices(coordinates)
+                matrix = np.where(np.isnan(road_km), matrix, road_km).astype(np.float32)
+            else:
+                print("Road graph not available, using haversine distances")
+        elif mode == 'geodesic':
+            matrix = np.zeros((n, n), dtype=np.float32)
+            for i in range(n):
+                for j in range(i + 1, n):
+                    matrix[i, j] = matrix[j, i] = self.calculate_distance(coordinates[i], coordinates[j])
+        else:
+            raise ValueError(f"Unknown distance mode: {mode}")
+        
+        np.fill_diagonal(matrix, 0.0)
         return matrix
     
-    def nearest_neighbor_tsp(self, distance_matrix: List[List[float]], start_index: int = 0) -> List[int]:
+    def _append_blocks(self, new: List[Tuple[float, float]], stored: List[Tuple[float, float]],
+                       mode: str) -> Tuple[np.ndarray, np.ndarray]:
+        """Rows (new to all) and columns (all to new) appended to a stored matrix."""
+        if mode == 'haversine':
+            rows = haversine_matrix(new, stored)
+            return rows, rows.T
+        if mode == 'ellipsoidal':
+            rows = ellipsoidal_matrix(new, stored)
+            return rows, rows.T
+        # Road distances may differ by direction: search from and back to the new stops only
+        straight = haversine_matrix(new, stored)
+        (_, rows), (_, columns) = self.road_network.blocks(new, stored)
+        return np.where(np.isnan(rows), straight, rows), np.where(np.isnan(columns), straight.T, columns)
+    
+    def travel_time_matrix(self, coordinates: List[Tuple[float, float]], distance_matrix: np.ndarray,
+                           departure_minutes: Optional[float] = None,
+                           minutes_per_km: Optional[List[float]] = None) -> np.ndarray:
+        """
+        Driving minutes between all coordinates.
+        
+        Road-graph times for the departure's time-of-day band in 'road' mode;
+        otherwise (and for pairs the graph cannot connect) distance times
+        minutes per km, with at least MIN_TRAVEL_MINUTES per leg. minutes_per_km
+        gives the rate for driving to each coordinate (default MINUTES_PER_KM).
+        """
+        rate = self.MINUTES_PER_KM if minutes_per_km is None else np.asarray(minutes_per_km, dtype=np.float32)[None, :]
+        minutes = np.maximum(distance_matrix * rate, self.MIN_TRAVEL_MINUTES).astype(np.float32)
+        if self.distance_mode == 'road' and self.road_network.available:
+            road_minutes, _ = self.road_network.matrices(coordinates, departure_minutes)
+            minutes = np.where(np.isnan(road_minutes), minutes, road_minutes).astype(np.float32)
+        np.fill_diagonal(minutes, 0.0)
+        return minutes
+    
+    def route_distance(self, route: List[int], distance_matrix: np.ndarray) -> float:
+        """Total length of a route given as a sequence of matrix indices."""
+        if len(route) < 2:
+            return 0.0
+        order = np.asarray(route)
+        return float(distance_matrix[order[:-1], order[1:]].sum(dtype=np.float64))
+    
+    def nearest_neighbor_tsp(self, distance_matrix: np.ndarray, start_index: int = 0,
+                             coordinates: Optional[List[Tuple[float, float]]] = None) -> List[int]:
         """
         Solve TSP using nearest neighbor heuristic.
         Returns the order of indices to visit.
+        
+        Large routes with known coordinates are built over a spatial grid
+        (see SpatialGrid.nearest_neighbor_tour), which only looks at the
+        cells around each stop instead of every unvisited row entry.
         """
+        distance_matrix = np.asarray(distance_matrix)
         n = len(distance_matrix)
         if n <= 1:
             return list(range(n))
+        if coordinates is not None and n >= GRID_MIN_TOUR_POINTS:
+            return SpatialGrid.from_coordinates(coordinates).nearest_neighbor_tour(start_index)
         
-        unvisited = set(range(n))
+        visited = np.zeros(n, dtype=bool)
         current = start_index
         route = [current]
-        unvisited.remove(current)
+        visited[current] = True
         
-        while unvisited:
-            nearest = min(unvisited, key=lambda x: distance_matrix[current][x])
+        for _ in range(n - 1):
+            candidates = np.where(visited, np.inf, distance_matrix[current])
+            nearest = int(candidates.argmin())
             route.append(nearest)
-            unvisited.remove(nearest)
+            visited[nearest] = True
             current = nearest
         
         return route
     
-    def two_opt_improvement(self, route: List[int], distance_matrix: List[List[float]]) -> List[int]:
+    def two_opt_improvement(self, route: List[int], distance_matrix: np.ndarray,
+                            neighbor_count: int = 10,
+                            coordinates: Optional[List[Tuple[float, float]]] = None) -> List[int]:
         """
         Improve route using 2-opt local search.
+        Moves are delta-evaluated over K-nearest-neighbor candidate lists
+        with don't-look bits; see LocalSearch.two_opt. Asymmetric (road)
+        matrices are searched on their symmetric part, and the search stops
+        after MAX_SEARCH_SECONDS at most.
         """
-        def calculate_route_distance(route_order):
-            total = 0
-            for i in range(len(route_order) - 1):
-                total += distance_matrix[route_order[i]][route_order[i + 1]]
-            return total
-        
-        best_route = route[:]
-        best_distance = calculate_route_distance(best_route)
-        improved = True
-        
-        while improved:
-            improved = False
-            for i in range(1, len(route) - 2):
-                for j in range(i + 1, len(route)):
-                    if j - i == 1:
-                        continue  # Skip adjacent edges
-                    
-                    # Create new route by reversing the segment between i and j
-                    new_route = route[:i] + route[i:j][::-1] + route[j:]
-                    new_distance = calculate_route_distance(new_route)
-                    
-                    if new_distance < best_distance:
-                        best_route = new_route[:]
-                        best_distance = new_distance
-                        route = new_route[:]
-                        improved = True
-        
-        return best_route
-    
-    def optimize_delivery_route(self, deliveries: List[Dict], start_location: Dict) -> Dict:
+        improved_route, _ = LocalSearch(distance_matrix, neighbor_count, coordinates).two_opt(route)
+        return improved_route
+    
+    def optimize_delivery_route(self, deliveries: List[Dict], start_location: Dict,
+                                time_budget_ms: Optional[int] = None,
+                                plan_key: Optional[str] = None,
+                                progress: Optional[Callable[[Dict], None]] = None) -> Dict:
         """
         Optimize delivery route using TSP algorithms.
         
         Args:
             deliveries: List of delivery dictionaries with address information
             start_location: Starting location with latitude and longitude
+            time_budget_ms: Enables anytime mode: keep improving the route with
+                2-opt, relocate, Or-opt and swap moves plus random kicks, and
+                return the best route found within this many milliseconds
+            plan_key: Identifies the plan being revised (e.g. the delivery date).
+                An unchanged delivery set is answered from the route cache; a
+                small change to the last plan with the same key and start is
+                patched in place (cheapest insertion of new stops, splice-out of
+                removed ones, local repair) instead of solved from scratch
+            progress: Called with {'stage', 'stops_geocoded', 'stops_total'}
+                while coordinates resolve and {'stage', 'best_distance_km'}
+                whenever the search finds a shorter route
             
         Returns:
-            Optimized route information
+            Optimized route information, including lower_bound_km and
+            optimality_gap_pct (0 when the route was solved exactly)
         """
+        started = time.perf_counter()
         if not deliveries:
             return {
                 'optimized_route': [],
                 'total_distance_km': 0,
                 'estimated_duration_minutes': 0,
-                'start_location': start_location
+                'start_location': start_location,
+                'optimality_gap_pct': 0.0
             }
         
         # Prepare coordinates
         start_coord = (start_location['latitude'], start_location['longitude'])
         coordinates = [start_coord]
-        delivery_info = []
         
-        # Geocode delivery addresses
-        for delivery in deliveries:
-            address = delivery.get('delivery_address', '')
-            coord = self.geocode_address(address)
-            
-            if coord:
-                coordinates.append(coord)
-                delivery_info.append(delivery)
-            else:
-                # Fallback: use approximate coordinates based on city/postal code
-                # In production, you'd have a more robust geocoding system
-                city = delivery.get('city', 'Langley')
-                if 'Surrey' in address or 'Surrey' in city:
-                    coord = (49.1913, -122.8490)  # Surrey, BC
-                elif 'Vancouver' in address or 'Vancouver' in city:
-                    coord = (49.2827, -123.1207)  # Vancouver, BC
-                elif 'Burnaby' in address or 'Burnaby' in city:
-                    coord = (49.2488, -122.9805)  # Burnaby, BC
-                else:
-                    coord = (49.1042, -122.6604)  # Default to Langley, BC
-                
-                coordinates.append(coord)
-                delivery_info.append(delivery)
+        for count, delivery in enumerate(deliveries, 1):
+            coordinates.append(self.resolve_coordinates(delivery))
+            if progress:
+                progress({'stage': 'geocoding', 'stops_geocoded': count, 'stops_total': len(deliveries)})
+        phase_ms = {'geocoding': (time.perf_counter() - started) * 1000}
         
         if len(coordinates) <= 1:
             return {
                 'optimized_route': [],
                 'total_distance_km': 0,
                 'estimated_duration_minutes': 0,
-                'start_location': start_location
+                'start_location': start_location,
+                'optimality_gap_pct': 0.0
             }
         
         # Create distance matrix
-        distance_matrix = self.create_distance_matrix(coordinates)
+        phase_started = time.perf_counter()
+        distance_matrix = self.create_distance_matrix(coordinates, plan_key=plan_key)
+        phase_ms['distance_matrix'] = (time.perf_counter() - phase_started) * 1000
         
-        # Solve TSP
-        route_indices = self.nearest_neighbor_tsp(distance_matrix, start_index=0)
+        # Reuse or patch a cached tour when the delivery set is known
+        stop_keys = RouteCache.stop_keys(deliveries, coordinates[1:])
+        fingerprint = RouteCache.fingerprint(stop_keys, start_coord, self.distance_mode, time_budget_ms)
+        scope = RouteCache.scope(start_coord, plan_key)
+        remaining_ms = self._search_budget(time_budget_ms, started)
         
-        # Improve with 2-opt if we have enough points
-        if len(route_indices) > 3:
-            route_indices = self.two_opt_improvement(route_indices, distance_matrix)
+        cached = self.route_cache.get(fingerprint)
+        previous = self.route_cache.latest(scope) if cached is None else None
+        lower_bound = None
+        if cached is not None and len(cached['tour']) == len(stop_keys):
+            position = {key: index for index, key in enumerate(stop_keys, 1)}
+            route_indices = [0] + [position[key] for key in cached['tour']]
+            algorithm_used = f"Cached route: {self.EXACT_ALGORITHM}" if cached['exact'] else 'Cached route'
+            lower_bound = cached['lower_bound_km']
+            initial_distance = self.route_distance(route_indices, distance_matrix)
+            search_stats = None
+        elif previous is not None and self._is_small_change(previous, stop_keys):
+            route_indices, initial_distance = self._repair_route(previous, stop_keys, distance_matrix,
+                                                                 phase_ms, remaining_ms, coordinates)
+            algorithm_used = 'Incremental insertion + local repair'
+            search_stats = None
+        else:
+            # Solve TSP
+            route_indices, algorithm_used, initial_distance, search_stats = self._sequence_route(
+                distance_matrix, phase_ms, remaining_ms, progress, coordinates
+            )
         
-        # Calculate total distance
-        total_distance = 0
-        for i in range(len(route_indices) - 1):
-            total_distance += distance_matrix[route_indices[i]][route_indices[i + 1]]
+        result = self._build_route_result(route_indices, distance_matrix,
+                                          self.stop_table(deliveries, coordinates[1:]), start_location,
+                                          algorithm_used, self._bound_budget(time_budget_ms, started),
+                                          lower_bound)
+        self.route_cache.store(fingerprint, scope, [stop_keys[index - 1] for index in route_indices[1:]],
+                               exact=algorithm_used.endswith(self.EXACT_ALGORITHM),
+                               lower_bound_km=result['lower_bound_km'])
+        result['optimization_stats'] = self._optimization_stats(
+            initial_distance, result['total_distance_km'], phase_ms, started, search_stats
+        )
+        return result
+    
+    def _sequence_route(self, distance_matrix: np.ndarray, phase_ms: Dict[str, float],
+                        time_budget_ms: Optional[float] = None,
+                        progress: Optional[Callable[[Dict], None]] = None,
+                        coordinates: Optional[List[Tuple[float, float]]] = None
+                        ) -> Tuple[List[int], str, float, Optional[Dict]]:
+        """
+        Order the stops of one route starting from matrix index 0.
+        Returns the order, the algorithm label, the construction distance and
+        the anytime search statistics (if a budget was given). Routes of up to
+        HELD_KARP_MAX_STOPS stops are solved exactly instead. Coordinates of
+        the matrix nodes, when known, let large routes use the spatial grid.
+        """
+        started = phase_started = time.perf_counter()
+        if 2 <= len(distance_matrix) - 1 <= HELD_KARP_MAX_STOPS:
+            route_indices, length = held_karp_path(distance_matrix)
+            phase_ms['exact'] = phase_ms.get('exact', 0.0) + (time.perf_counter() - phase_started) * 1000
+            if progress:
+                progress({'stage': 'solving', 'best_distance_km': round(length, 2)})
+            return route_indices, self.EXACT_ALGORITHM, length, None
         
-        # Build optimized route (excluding start location)
-        optimized_route = []
-        estimated_time = datetime.strptime('09:00', '%H:%M')  # Start at 9 AM
+        route_indices = self.nearest_neighbor_tsp(distance_matrix, start_index=0, coordinates=coordinates)
+        phase_ms['construction'] = phase_ms.get('construction', 0.0) + (time.perf_counter() - phase_started) * 1000
+        initial_distance = self.route_distance(route_indices, distance_matrix)
+        search_stats = None
+        report = None
+        if progress:
+            def report(distance: float):
+                progress({'stage': 'solving', 'best_distance_km': round(float(distance), 2)})
+            report(initial_distance)
         
-        for i, route_idx in enumerate(route_indices[1:], 1):  # Skip start location
-            delivery_idx = route_idx - 1  # Adjust for start location
-            delivery = delivery_info[delivery_idx]
-            
-            # Estimate time (15 minutes per delivery + travel time)
-            if i > 1:
-                travel_time = max(5, int(distance_matrix[route_indices[i-1]][route_idx] * 3))  # 3 min per km
-                estimated_time += timedelta(minutes=travel_time + 15)
+        phase_started = time.perf_counter()
+        if time_budget_ms is not None:
+            # Spend whatever is left of the budget, after construction and the
+            # neighbor lists, on local search
+            search = LocalSearch(distance_matrix, coordinates=coordinates)
+            remaining_ms = time_budget_ms - (time.perf_counter() - started) * 1000
+            route_indices, search_stats = search.anytime(route_indices, max(0.0, remaining_ms),
+                                                         on_improvement=report)
+            algorithm_used = 'Nearest Neighbor + anytime local search (2-opt, relocate, Or-opt, swap)'
+        else:
+            # Improve with 2-opt if we have enough points
+            if len(route_indices) > 3:
+                route_indices = self.two_opt_improvement(route_indices, distance_matrix,
+                                                         coordinates=coordinates)
+                if report:
+                    report(self.route_distance(route_indices, distance_matrix))
+            algorithm_used = 'Nearest Neighbor + 2-opt'
+        phase_ms['local_search'] = phase_ms.get('local_search', 0.0) + (time.perf_counter() - phase_started) * 1000
+        
+        return route_indices, algorithm_used, initial_distance, search_stats
+    
+    @staticmethod
+    def _is_small_change(previous: List[str], stop_keys: List[str], max_changed_fraction: float = 0.2) -> bool:
+        """Whether a previous tour differs from the stop set by few enough stops to patch."""
+        current = set(stop_keys)
+        changed = len(current.symmetric_difference(previous))
+        return changed <= max(3, int(len(stop_keys) * max_changed_fraction)) and not current.isdisjoint(previous)
+    
+    def _repair_route(self, previous: List[str], stop_keys: List[str], distance_matrix: np.ndarray,
+                      phase_ms: Dict[str, float], time_budget_ms: Optional[float] = None,
+                      coordinates: Optional[List[Tuple[float, float]]] = None) -> Tuple[List[int], float]:
+        """
+        Patch a previous tour to a new stop set: splice out stops that are gone,
+        cheapest-insert the new ones, then run local search around the changes.
+        Returns the route and its length before the repair.
+        """
+        phase_started = time.perf_counter()
+        position = {key: index for index, key in enumerate(stop_keys, 1)}
+        route = [0]
+        touched = set()
+        for key in previous:
+            if key in position:
+                route.append(position[key])
             else:
-                estimated_time += timedelta(minutes=15)  # First delivery
-            
-            optimized_route.append({
-                'delivery_id': delivery.get('id'),
-                'sequence': i,
-                'customer_name': delivery.get('customer_name', ''),
-                'customer_phone': delivery.get('customer_phone', ''),
-                'address': delivery.get('delivery_address', ''),
-                'estimated_time': estimated_time.strftime('%H:%M'),
-                'delivery_instructions': delivery.get('delivery_instructions', ''),
-                'coordinates': coordinates[route_idx]
-            })
+                touched.add(route[-1])  # its successor was spliced out
+        kept = set(route)
         
-        # Estimate total duration
-        estimated_duration_minutes = len(delivery_info) * 15 + int(total_distance * 3)
+        for node in range(1, len(stop_keys) + 1):
+            if node in kept:
+                continue
+            nodes = np.asarray(route)
+            # Inserting after route[k] costs d(k, u) + d(u, k+1) - d(k, k+1); after the last stop, d(last, u)
+            cost = distance_matrix[nodes, node].astype(np.float64)
+            cost[:-1] += distance_matrix[node, nodes[1:]] - distance_matrix[nodes[:-1], nodes[1:]]
+            k = int(np.argmin(cost))
+            route.insert(k + 1, node)
+            touched.update((route[k], node))
+        phase_ms['construction'] = phase_ms.get('construction', 0.0) + (time.perf_counter() - phase_started) * 1000
+        initial_distance = self.route_distance(route, distance_matrix)
+        
+        phase_started = time.perf_counter()
+        deadline = None if time_budget_ms is None else phase_started + max(0.0, time_budget_ms) / 1000
+        local = LocalSearch(distance_matrix, coordinates=coordinates)
+        neighbors = local.neighbors
+        active = set(touched)
+        for node in touched:
+            active.update(neighbors[node])
+        route = local.improve(route, deadline, active=active)
+        phase_ms['local_search'] = phase_ms.get('local_search', 0.0) + (time.perf_counter() - phase_started) * 1000
+        return route, initial_distance
+    
+    def stop_table(self, deliveries: List[Dict], coordinates: List[Tuple[float, float]]) -> StopTable:
+        """
+        Compact columns for deliveries and their coordinates: service minutes
+        and driving minutes per km from TravelModel.annotate(), else the
+        SERVICE_MINUTES / MINUTES_PER_KM defaults.
+        """
+        return StopTable.from_deliveries(deliveries, coordinates, self.SERVICE_MINUTES, self.MINUTES_PER_KM)
+    
+    def route_lower_bound(self, distance_matrix: np.ndarray, route_length: Optional[float] = None,
+                          time_budget_ms: Optional[float] = None) -> float:
+        """
+        Length no route over all of the matrix's nodes can beat: the Held-Karp
+        1-tree bound, tightened for up to time_budget_ms (LOWER_BOUND_BUDGET_MS
+        by default).
+        """
+        symmetric = self.distance_mode != 'road' or not self.road_network.available
+        if time_budget_ms is None:
+            time_budget_ms = self.LOWER_BOUND_BUDGET_MS
+        return one_tree_bound(distance_matrix, route_length, time_budget_ms=time_budget_ms, symmetric=symmetric)
+    
+    def _search_budget(self, time_budget_ms: Optional[float], started: float) -> Optional[float]:
+        """What is left of an anytime budget for searching, keeping the lower bounds' share back."""
+        if time_budget_ms is None:
+            return None
+        reserve = min(self.LOWER_BOUND_BUDGET_MS, time_budget_ms * self.LOWER_BOUND_BUDGET_FRACTION)
+        return time_budget_ms - reserve - (time.perf_counter() - started) * 1000
+    
+    def _bound_budget(self, time_budget_ms: Optional[float], started: float, routes_left: int = 1) -> float:
+        """Lower bound time of the next of routes_left routes: an even share of what is left of the budget."""
+        if time_budget_ms is None:
+            return self.LOWER_BOUND_BUDGET_MS
+        remaining = time_budget_ms - (time.perf_counter() - started) * 1000
+        return max(0.0, min(self.LOWER_BOUND_BUDGET_MS, remaining / routes_left))
+    
+    @staticmethod
+    def optimality_gap(distance: float, lower_bound: float) -> float:
+        """Percent by which a route may exceed the optimum."""
+        return round(max(0.0, distance - lower_bound) / lower_bound * 100, 2) if lower_bound > 0 else 0.0
+    
+    @classmethod
+    def combined_optimality_gap(cls, routes: List[Dict]) -> float:
+        """Optimality gap of several routes' sequencing taken together."""
+        return cls.optimality_gap(sum(route['total_distance_km'] for route in routes),
+                                  sum(route.get('lower_bound_km', 0.0) for route in routes))
+    
+    def _build_route_result(self, route_indices: List[int], distance_matrix: np.ndarray,
+                            stops: StopTable, start_location: Dict, algorithm_used: str,
+                            bound_budget_ms: Optional[float] = None,
+                            lower_bound: Optional[float] = None) -> Dict:
+        """
+        Turn a solved order of matrix indices (0 = start, k = stops[k - 1])
+        into the API route format, with the route's lower bound (computed
+        within bound_budget_ms unless already known) and optimality gap.
+        """
+        total_distance = self.route_distance(route_indices, distance_matrix)
+        
+        # Starting at 9 AM, each stop takes its service time plus, after the
+        # first, the drive from the previous stop (at least MIN_TRAVEL_MINUTES)
+        order = np.asarray(route_indices, dtype=np.int64)
+        positions = order[1:] - 1
+        legs = distance_matrix[order[:-1], order[1:]] * stops.minutes_per_km[positions]
+        travel = np.maximum(self.MIN_TRAVEL_MINUTES, np.floor(legs))
+        travel[:1] = 0
+        estimated_minutes = 9 * 60 + np.cumsum(travel + stops.service_minutes[positions])
+        estimated_duration_minutes = int(round(stops.service_minutes.sum())) + int(legs.sum())
+        
+        if algorithm_used.endswith(self.EXACT_ALGORITHM):
+            lower_bound = total_distance
+        elif lower_bound is None:
+            lower_bound = self.route_lower_bound(distance_matrix, total_distance, bound_budget_ms)
         
         return {
-            'optimized_route': optimized_route,
+            'optimized_route': stops.materialize(positions.tolist(), estimated_minutes),
             'total_distance_km': round(total_distance, 2),
             'estimated_duration_minutes': estimated_duration_minutes,
             'estimated_duration': f"{estimated_duration_minutes // 60}h {estimated_duration_minutes % 60}m",
             'start_location': start_location,
-            'algorithm_used': 'Nearest Neighbor + 2-opt',
-            'total_deliveries': len(delivery_info)
+            'algorithm_used': algorithm_used,
+            'total_deliveries': len(stops),
+            'lower_bound_km': round(lower_bound, 2),
+            'optimality_gap_pct': self.optimality_gap(total_distance, lower_bound)
+        }
+    
+    def _optimization_stats(self, initial_distance: float, final_distance: float, phase_ms: Dict[str, float],
+                            started: float, search_stats: Optional[Dict] = None) -> Dict:
+        """Per-phase timings and improvement figures reported with a route."""
+        stats = {
+            'phase_ms': {name: round(ms, 2) for name, ms in phase_ms.items()},
+            'total_ms': round((time.perf_counter() - started) * 1000, 2),
+            'initial_distance_km': round(initial_distance, 2),
+            'improvement_km': round(initial_distance - final_distance, 2),
+            'improvement_pct': round((initial_distance - final_distance) / initial_distance * 100, 2)
+            if initial_distance > 0 else 0.0
         }
+        if search_stats:
+            stats['kicks'] = search_stats['kicks']
+            stats['accepted_kicks'] = search_stats['accepted_kicks']
+            stats['moves'] = search_stats['moves']
+            stats['move_phase_ms'] = search_stats['phase_ms']
+        return stats
     
     def optimize_multiple_routes(self, deliveries: List[Dict], start_location: Dict, 
-                                max_deliveries_per_route: int = 15) -> List[Dict]:
+                                max_deliveries_per_route: int = 15, vehicle_count: Optional[int] = None,
+                                vehicle_capacity: Optional[int] = None,
+                                time_budget_ms: Optional[int] = None,
+                                clustering: Optional[str] = None,
+                                workers: Optional[int] = None,
+                                plan_key: Optional[str] = None) -> List[Dict]:
         """
         Optimize multiple routes when there are too many deliveries for one route.
+        
+        By default all deliveries are assigned to vehicles in one capacitated
+        VRP solve (Clarke-Wright savings + inter-route relocate/exchange).
+        With clustering set, deliveries are first split into compact,
+        balanced geographic clusters instead, one per vehicle. Each route is
+        then sequenced like a single route.
+        
+        Args:
+            deliveries: List of delivery dictionaries; 'tiffin_count' (default 1)
+                is the load each delivery puts on a vehicle
+            start_location: Starting location with latitude and longitude
+            max_deliveries_per_route: Vehicle capacity when none is given
+            vehicle_count: Number of vehicles available; with no capacity given,
+                the load is split about evenly between them (each may carry
+                the even share plus the largest delivery, less one tiffin, so
+                uneven tiffin counts always pack)
+            vehicle_capacity: Tiffins each vehicle can carry
+            time_budget_ms: Anytime budget shared by the per-route solves
+            clustering: 'kmeans' or 'sweep' to cluster instead of solving a VRP
+            workers: Processes used to sequence the routes in parallel; defaults
+                to the optimizer's setting, then ROUTE_OPTIMIZER_WORKERS
+                (1 sequences the routes one by one in the calling thread)
+            plan_key: Service day whose stored distance matrix is reused
         """
-        if len(deliveries) <= max_deliveries_per_route:
-            return [self.optimize_delivery_route(deliveries, start_location)]
+        if clustering is not None and clustering not in CLUSTERING_METHODS:
+            raise ValueError(f"Unknown clustering method: {clustering}")
+        started = time.perf_counter()
+        demands = [int(delivery.get('tiffin_count') or 1) for delivery in deliveries]
+        if vehicle_capacity is None and vehicle_count:
+            vehicle_capacity = math.ceil(sum(demands) / vehicle_count) + max(demands, default=1) - 1
+        elif vehicle_capacity is None:
+            vehicle_capacity = max_deliveries_per_route
+        
+        if sum(demands) <= vehicle_capacity:
+            return [self.optimize_delivery_route(deliveries, start_location, time_budget_ms, plan_key)]
         
-        # Group deliveries by zone/area for better route efficiency
-        zones = self.group_deliveries_by_zone(deliveries)
+        start_coord = (start_location['latitude'], start_location['longitude'])
+        coordinates = [start_coord] + [self.resolve_coordinates(delivery) for delivery in deliveries]
+        distance_matrix = self.create_distance_matrix(coordinates, plan_key=plan_key)
+        
+        if clustering:
+            labels = self._cluster_labels(coordinates[1:], start_coord, demands, vehicle_capacity,
+                                          vehicle_count, clustering)
+            vehicle_routes = [[int(node) + 1 for node in np.flatnonzero(labels == label)]
+                              for label in range(int(labels.max()) + 1)]
+            vehicle_routes = [stops for stops in vehicle_routes if stops]
+            construction = 'Capacitated k-means' if clustering == 'kmeans' else 'Polar sweep'
+        else:
+            vehicle_routes = CVRPSolver(distance_matrix, demands, vehicle_capacity, vehicle_count,
+                                        coordinates=coordinates).solve()
+            construction = 'Clarke-Wright savings CVRP'
+        
+        return self._sequence_vehicle_routes(vehicle_routes, distance_matrix, coordinates, deliveries,
+                                             demands, start_location, vehicle_capacity, construction,
+                                             started, time_budget_ms, workers)
+    
+    def _cluster_labels(self, coordinates: List[Tuple[float, float]], start_coord: Tuple[float, float],
+                        demands: List[int], capacity: Optional[int], cluster_count: Optional[int],
+                        method: str) -> np.ndarray:
+        """Cluster label for each delivery coordinate."""
+        if method == 'sweep':
+            return polar_sweep(coordinates, start_coord, demands, capacity, cluster_count)
+        return capacitated_kmeans(coordinates, demands, capacity, cluster_count)
+    
+    def _sequence_vehicle_routes(self, vehicle_routes: List[List[int]], distance_matrix: np.ndarray,
+                                 coordinates: List[Tuple[float, float]], deliveries: List[Dict],
+                                 demands: List[int], start_location: Dict, vehicle_capacity: int,
+                                 construction: str, started: float,
+                                 time_budget_ms: Optional[int] = None,
+                                 workers: Optional[int] = None) -> List[Dict]:
+        """Sequence each vehicle's stops (matrix indices, depot excluded) as a single route."""
+        node_lists = [[0] + stops for stops in vehicle_routes]
+        workers = min(workers or self.workers or default_worker_count(), len(node_lists))
+        
+        if workers > 1:
+            # Routes are independent: solve them side by side, each with the
+            # share of the remaining budget one worker gets
+            budgets = [None] * len(node_lists)
+            if time_budget_ms is not None:
+                remaining_ms = self._search_budget(time_budget_ms, started)
+                budgets = [remaining_ms * workers / len(node_lists)] * len(node_lists)
+            solved = sequence_routes_parallel(distance_matrix, node_lists, budgets, workers, coordinates)
+        else:
+            solved = []
+            for number, nodes in enumerate(node_lists, 1):
+                route_budget = None
+                if time_budget_ms is not None:
+                    route_budget = self._search_budget(time_budget_ms, started) / (len(node_lists) - number + 1)
+                solved.append(self._sequence_route(distance_matrix[np.ix_(nodes, nodes)], {}, route_budget,
+                                                   coordinates=[coordinates[node] for node in nodes]))
+        
+        stop_table = self.stop_table(deliveries, coordinates[1:])
         routes = []
+        for number, (nodes, (route_indices, algorithm_used, _, _)) in enumerate(zip(node_lists, solved), 1):
+            stops = nodes[1:]
+            route = self._build_route_result(
+                route_indices, distance_matrix[np.ix_(nodes, nodes)],
+                stop_table.take([node - 1 for node in stops]), start_location,
+                f"{construction} + {algorithm_used}",
+                self._bound_budget(time_budget_ms, started, len(node_lists) - number + 1)
+            )
+            route['zone'] = f"Route {number}"
+            route['vehicle'] = number
+            route['load'] = sum(demands[node - 1] for node in stops)
+            route['vehicle_capacity'] = vehicle_capacity
+            routes.append(route)
         
-        for zone, zone_deliveries in zones.items():
-            if len(zone_deliveries) > max_deliveries_per_route:
-                # Further split large zones
-                chunks = [zone_deliveries[i:i + max_deliveries_per_route] 
-                         for i in range(0, len(zone_deliveries), max_deliveries_per_route)]
-                for chunk in chunks:
-                    route = self.optimize_delivery_route(chunk, start_location)
-                    route['zone'] = f"{zone} (Part {chunks.index(chunk) + 1})"
-                    routes.append(route)
-            else:
-                route = self.optimize_delivery_route(zone_deliveries, start_location)
-                route['zone'] = zone
-                routes.append(route)
+        return routes
+    
+    def plan_depot(self, deliveries: List[Dict], start_location: Dict, vehicle_count: Optional[int] = None,
+                   vehicle_capacity: Optional[int] = None, time_budget_ms: Optional[int] = None,
+                   workers: Optional[int] = None, plan_key: Optional[str] = None) -> List[Dict]:
+        """Routes from one start location: one route, or several when vehicles are given."""
+        if vehicle_count or vehicle_capacity:
+            return self.optimize_multiple_routes(deliveries, start_location, vehicle_count=vehicle_count,
+                                                 vehicle_capacity=vehicle_capacity,
+                                                 time_budget_ms=time_budget_ms, workers=workers,
+                                                 plan_key=plan_key)
+        return [self.optimize_delivery_route(deliveries, start_location, time_budget_ms, plan_key)]
+    
+    def optimize_multi_depot_routes(self, deliveries: List[Dict], depots: List[Dict],
+                                    vehicle_count: Optional[int] = None,
+                                    vehicle_capacity: Optional[int] = None,
+                                    time_budget_ms: Optional[int] = None,
+                                    workers: Optional[int] = None,
+                                    plan_key: Optional[str] = None) -> List[Dict]:
+        """
+        Plan routes from several depots (kitchens).
+        
+        Each delivery goes to the depot it is cheapest to reach, within the
+        depots' max_deliveries; see assign_to_depots. The depots are then
+        planned independently, in a process pool when more than one worker
+        is configured.
+        
+        Args:
+            deliveries: List of delivery dictionaries
+            depots: [{'id', 'name', 'latitude', 'longitude', 'max_deliveries'}, ...]
+            vehicle_count: Vehicles per depot (plans one route per depot when
+                neither this nor vehicle_capacity is given)
+            vehicle_capacity: Tiffins each vehicle can carry
+            time_budget_ms: Anytime budget of each depot's solve
+            workers: Processes for the per-depot solves; defaults to the
+                optimizer's setting, then ROUTE_OPTIMIZER_WORKERS
+            plan_key: Service day whose stored distance matrix is reused; the
+                depots' own solves read it too, also in worker processes
+            
+        Returns:
+            One entry per depot with the depot, its routes (tagged with
+            depot_id) and totals; depots left without deliveries have no routes
+        """
+        if not depots:
+            raise ValueError("At least one depot is needed")
+        depot_coords = [(float(depot['latitude']), float(depot['longitude'])) for depot in depots]
+        coordinates = depot_coords + [self.resolve_coordinates(delivery) for delivery in deliveries]
+        m = len(depots)
+        costs = self.create_distance_matrix(coordinates, plan_key=plan_key)[m:, :m]
+        demands = [int(delivery.get('tiffin_count') or 1) for delivery in deliveries]
+        labels = assign_to_depots(costs, [depot.get('max_deliveries') for depot in depots], demands)
+        
+        tasks = []
+        for d, depot in enumerate(depots):
+            members = [deliveries[k] for k in np.flatnonzero(labels == d)]
+            start_location = {'latitude': depot_coords[d][0], 'longitude': depot_coords[d][1],
+                              'address': depot.get('address') or depot.get('name')}
+            tasks.append((members, start_location))
+        
+        workers = min(workers or self.workers or default_worker_count(), sum(1 for members, _ in tasks if members))
+        options = {'vehicle_count': vehicle_count, 'vehicle_capacity': vehicle_capacity,
+                   'time_budget_ms': time_budget_ms, 'plan_key': plan_key}
+        if workers > 1:
+            # Workers have no geocode store: hand them the coordinates resolved here
+            resolved = [dict(delivery, latitude=coord[0], longitude=coord[1])
+                        for delivery, coord in zip(deliveries, coordinates[m:])]
+            worker_tasks = [([resolved[k] for k in np.flatnonzero(labels == d)], start_location)
+                            for d, (members, start_location) in enumerate(tasks) if members]
+            planned = plan_depots_parallel(self.worker_config(), worker_tasks, dict(options, workers=1), workers)
+            planned_iter = iter(planned)
+            depot_routes = [next(planned_iter) if members else [] for members, _ in tasks]
+        else:
+            depot_routes = [self.plan_depot(members, start_location, **options) if members else []
+                            for members, start_location in tasks]
+        
+        results = []
+        for depot, (members, start_location), routes in zip(depots, tasks, depot_routes):
+            for number, route in enumerate(routes, 1):
+                route.setdefault('vehicle', number)
+                route['depot_id'] = depot.get('id')
+                route['depot_name'] = depot.get('name')
+            results.append({
+                'depot': depot,
+                'start_location': start_location,
+                'routes': routes,
+                'total_deliveries': len(members),
+                'total_distance_km': round(sum(route['total_distance_km'] for route in routes), 2)
+            })
+        return results
+    
+    def optimize_balanced_routes(self, deliveries: List[Dict], start_location: Dict, drivers: List[Dict],
+                                 time_budget_ms: Optional[int] = None,
+                                 plan_key: Optional[str] = None) -> List[Dict]:
+        """
+        Split the day between drivers so the busiest one finishes as early as possible.
+        
+        Args:
+            deliveries: List of delivery dictionaries
+            start_location: Starting location with latitude and longitude
+            drivers: [{'id': user id, 'shift_minutes': length of shift}, ...];
+                workloads are balanced relative to shift length
+            time_budget_ms: Time for the balancing moves and lower bounds (default 2000)
+            plan_key: Service day whose stored distance matrix is reused
+            
+        Returns:
+            One route per driver with driver_id, shift_minutes,
+            workload_minutes (drive plus service), utilization_pct and
+            overtime_minutes; drivers left without stops get empty routes
+        """
+        if not drivers:
+            raise ValueError("At least one driver is needed to balance routes")
+        started = time.perf_counter()
+        start_coord = (start_location['latitude'], start_location['longitude'])
+        coordinates = [start_coord] + [self.resolve_coordinates(delivery) for delivery in deliveries]
+        distance_matrix = self.create_distance_matrix(coordinates, plan_key=plan_key)
+        stop_table = self.stop_table(deliveries, coordinates[1:])
+        travel_minutes = self.travel_time_matrix(
+            coordinates, distance_matrix,
+            minutes_per_km=np.concatenate(([self.MINUTES_PER_KM], stop_table.minutes_per_km))
+        )
+        shifts = [float(driver.get('shift_minutes') or DEFAULT_SHIFT_MINUTES) for driver in drivers]
         
+        balancer = WorkloadBalancer(distance_matrix, travel_minutes, stop_table.service_minutes, shifts,
+                                    coordinates)
+        if time_budget_ms is None:
+            time_budget_ms = 2000.0
+        driver_routes, stats = balancer.balance(self._search_budget(time_budget_ms, started))
+        
+        routes = []
+        for number, (driver, shift, stops) in enumerate(zip(drivers, shifts, driver_routes), 1):
+            nodes = [0] + stops
+            route = self._build_route_result(
+                list(range(len(nodes))), distance_matrix[np.ix_(nodes, nodes)],
+                stop_table.take([node - 1 for node in stops]), start_location,
+                'Capacitated k-means + min-max workload balancing',
+                self._bound_budget(time_budget_ms, started, len(drivers) - number + 1)
+            )
+            workload = balancer.workload(stops)
+            route['zone'] = f"Route {number}"
+            route['vehicle'] = number
+            route['driver_id'] = driver['id']
+            route['shift_minutes'] = int(round(shift))
+            route['workload_minutes'] = int(round(workload))
+            route['utilization_pct'] = round(workload / shift * 100, 1)
+            route['overtime_minutes'] = max(0, int(round(workload - shift)))
+            routes.append(route)
+        
+        stats['elapsed_ms'] = round((time.perf_counter() - started) * 1000, 2)
+        for route in routes:
+            route['balancing_stats'] = stats
         return routes
     
-    def group_deliveries_by_zone(self, deliveries: List[Dict]) -> Dict[str, List[Dict]]:
+    def optimize_time_window_routes(self, deliveries: List[Dict], start_location: Dict,
+                                    vehicle_count: Optional[int] = None,
+                                    vehicle_capacity: Optional[int] = None,
+                                    route_start_time: str = '09:00',
+                                    plan_key: Optional[str] = None) -> List[Dict]:
         """
-        Group deliveries by geographical zone for better route planning.
+        Plan routes that respect each delivery's time window (VRPTW).
+        
+        Vehicles leave the start location at route_start_time; a driver who
+        arrives before a window opens waits for it. Deliveries that cannot be
+        made on time with the available vehicles are still routed, with their
+        lateness reported per stop and per route; so are deliveries that fit
+        in no vehicle, on a route flagged over_capacity.
+        
+        Args:
+            deliveries: List of delivery dictionaries; 'delivery_window_start' and
+                'delivery_window_end' ('HH:MM' or time, either may be missing)
+                bound when the delivery may be made
+            start_location: Starting location with latitude and longitude
+            vehicle_count: Maximum number of vehicles; unlimited when None
+            vehicle_capacity: Tiffins each vehicle can carry; unlimited when None
+            route_start_time: Departure time from the start location ('HH:MM')
+            plan_key: Service day whose stored distance matrix is reused
         """
-        zones = {}
+        if not deliveries:
+            return []
+        
+        start_coord = (start_location['latitude'], start_location['longitude'])
+        coordinates = [start_coord] + [self.resolve_coordinates(delivery) for delivery in deliveries]
+        distance_matrix = self.create_distance_matrix(coordinates, plan_key=plan_key)
+        
+        stop_table = self.stop_table(deliveries, coordinates[1:])
+        service_minutes = stop_table.service_minutes
+        travel_minutes = self.travel_time_matrix(coordinates, distance_matrix, minutes_of_day(route_start_time),
+                                                 np.concatenate(([self.MINUTES_PER_KM], stop_table.minutes_per_km)))
+        windows = [(minutes_of_day(delivery.get('delivery_window_start')),
+                    minutes_of_day(delivery.get('delivery_window_end'))) for delivery in deliveries]
+        demands = [int(delivery.get('tiffin_count') or 1) for delivery in deliveries]
         
-        for delivery in deliveries:
-            address = delivery.get('delivery_address', '').lower()
-            city = delivery.get('city', '').lower()
+        solver = VRPTWSolver(travel_minutes, service_minutes, windows,
+                             minutes_of_day(route_start_time), vehicle_count=vehicle_count,
+                             demands=demands, capacity=vehicle_capacity)
+        
+        routes = []
+        for number, stops in enumerate(solver.solve(), 1):
+            timeline = solver.schedule(stops)
+            schedule = []
+            for node, stop in zip(stops, timeline):
+                window_start, window_end = windows[node - 1]
+                schedule.append({
+                    'arrival_time': format_minutes(stop['arrival']),
+                    'window_start': format_minutes(window_start) if window_start is not None else None,
+                    'window_end': format_minutes(window_end) if window_end is not None else None,
+                    'wait_minutes': round(stop['wait']),
+                    'lateness_minutes': round(stop['lateness'])
+                })
+            # Service starts, rounded to the minute like the other times
+            starts = np.floor(np.asarray([stop['start'] for stop in timeline]) + 0.5)
+            optimized_route = stop_table.materialize([node - 1 for node in stops], starts, schedule)
             
-            # Simple zone classification based on city/area
-            if 'surrey' in address or 'surrey' in city:
-                zone = 'Surrey'
-            elif 'vancouver' in address or 'vancouver' in city:
-                zone = 'Vancouver'
-            elif 'burnaby' in address or 'burnaby' in city:
-                zone = 'Burnaby'
-            elif 'richmond' in address or 'richmond' in city:
-                zone = 'Richmond'
-            elif 'langley' in address or 'langley' in city:
-                zone = 'Langley'
-            elif 'coquitlam' in address or 'coquitlam' in city:
-                zone = 'Coquitlam'
-            else:
-                zone = 'Other'
+            total_distance = self.route_distance([0] + stops, distance_matrix)
+            lower_bound = self.route_lower_bound(distance_matrix[np.ix_([0] + stops, [0] + stops)], total_distance)
+            finish = timeline[-1]['start'] + service_minutes[stops[-1] - 1]
+            estimated_duration_minutes = int(round(finish - minutes_of_day(route_start_time)))
+            load = sum(demands[node - 1] for node in stops)
+            routes.append({
+                'optimized_route': optimized_route,
+                'total_distance_km': round(total_distance, 2),
+                'estimated_duration_minutes': estimated_duration_minutes,
+                'estimated_duration': f"{estimated_duration_minutes // 60}h {estimated_duration_minutes % 60}m",
+                'start_location': start_location,
+                'algorithm_used': 'Time-window insertion (VRPTW)',
+                'total_deliveries': len(stops),
+                'zone': f"Route {number}",
+                'vehicle': number,
+                'load': load,
+                'vehicle_capacity': vehicle_capacity,
+                'over_capacity': vehicle_capacity is not None and load > vehicle_capacity,
+                'late_stops': sum(1 for stop in optimized_route if stop['lateness_minutes'] > 0),
+                'total_lateness_minutes': sum(stop['lateness_minutes'] for stop in optimized_route),
+                'lower_bound_km': round(lower_bound, 2),
+                'optimality_gap_pct': self.optimality_gap(total_distance, lower_bound)
+            })
+        
+        return routes
+    
+    def group_deliveries_by_zone(self, deliveries: List[Dict], start_location: Optional[Dict] = None,
+                                 max_deliveries_per_zone: int = 15, zone_count: Optional[int] = None,
+                                 method: str = 'kmeans') -> Dict[str, List[Dict]]:
+        """
+        Group deliveries into compact geographical zones for route planning.
+        
+        Args:
+            deliveries: List of delivery dictionaries with address information
+            start_location: Depot the 'sweep' method sweeps around (defaults to
+                the centroid of the deliveries)
+            max_deliveries_per_zone: Zone size limit, in tiffins
+            zone_count: Number of zones; derived from the size limit when None
+            method: 'kmeans' (capacitated k-means) or 'sweep' (polar sweep)
             
-            if zone not in zones:
-                zones[zone] = []
-            zones[zone].append(delivery)
+        Returns:
+            Deliveries keyed by zone name ("Zone 1", "Zone 2", ...)
+        """
+        if method not in CLUSTERING_METHODS:
+            raise ValueError(f"Unknown clustering method: {method}")
+        if not deliveries:
+            return {}
+        
+        coordinates = [self.resolve_coordinates(delivery) for delivery in deliveries]
+        if start_location:
+            start_coord = (start_location['latitude'], start_location['longitude'])
+        else:
+            start_coord = tuple(np.mean(coordinates, axis=0))
+        demands = [int(delivery.get('tiffin_count') or 1) for delivery in deliveries]
+        labels = self._cluster_labels(coordinates, start_coord, demands, max_deliveries_per_zone,
+                                      zone_count, method)
+        
+        zones = {}
+        for label in range(int(labels.max()) + 1):
+            members = [deliveries[index] for index in np.flatnonzero(labels == label)]
+            if members:
+                zones[f"Zone {len(zones) + 1}"] = members
         
         return zones
     
@@ -283,4 +1017,3 @@ class RouteOptimizer:
             'total_stops': len(route),
             'total_distance': round(total_distance, 2)
         }
-
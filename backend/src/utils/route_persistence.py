@@ -0,0 +1,117 @@
+from datetime import date, datetime
+from typing import Dict, List, Optional
+from sqlalchemy import Integer, DateTime, bindparam, column, update, values
+from src.models.database import db, Delivery
+
+# Rows per UPDATE ... FROM (VALUES ...) statement; at most seven parameters
+# per row keeps each statement under PostgreSQL's 65535 bind parameter limit
+VALUES_CHUNK_SIZE = 5000
+
+# Delivery columns every write-back sets, and those set when every row has a value
+ROUTE_COLUMNS = ('route_sequence', 'estimated_delivery_time', 'route_id')
+OPTIONAL_COLUMNS = ('assigned_delivery_person_id', 'depot_id')
+
+
+def route_identifier(delivery_date: date, vehicle: Optional[int] = None, depot_id: Optional[int] = None) -> str:
+    """Identifier shared by every stop of one planned route, e.g. '2024-05-01-R2' or '2024-05-01-D1-R2'."""
+    depot = f"-D{depot_id}" if depot_id is not None else ''
+    return f"{delivery_date.isoformat()}{depot}-R{vehicle or 1}"
+
+
+def route_assignments(routes: List[Dict], delivery_date: date) -> List[Dict]:
+    """
+    Flatten optimizer routes into one write-back row per stop.
+
+    Each route is tagged with its route_id; estimated times are parsed
+    from 'HH:MM' into time values for the Time column. Routes planned for
+    a driver (driver_id) also assign their stops to that driver, and
+    routes from a depot (depot_id) record it on their stops.
+    """
+    rows = []
+    for route in routes:
+        route['route_id'] = route_identifier(delivery_date, route.get('vehicle'), route.get('depot_id'))
+        for item in route['optimized_route']:
+            if item.get('delivery_id') is None:
+                continue
+            row = {
+                'delivery_id': item['delivery_id'],
+                'route_sequence': item['sequence'],
+                'estimated_delivery_time': datetime.strptime(item['estimated_time'], '%H:%M').time(),
+                'route_id': route['route_id']
+            }
+            if route.get('driver_id') is not None:
+                row['assigned_delivery_person_id'] = route['driver_id']
+            if route.get('depot_id') is not None:
+                row['depot_id'] = route['depot_id']
+            rows.append(row)
+    return rows
+
+
+def save_route_assignments(rows: List[Dict]) -> int:
+    """
+    Write route_sequence, estimated_delivery_time and route_id (and
+    assigned_delivery_person_id / depot_id, when every row has one) for
+    many deliveries at once.
+
+    PostgreSQL gets a single UPDATE ... FROM (VALUES ...) joined on the
+    delivery id; other databases get one executemany of a parameterized
+    UPDATE. Either way it is one statement per call rather than a SELECT
+    and UPDATE per stop. The caller commits.
+
+    Returns:
+        Number of rows sent
+    """
+    if not rows:
+        return 0
+    updated_at = datetime.utcnow()
+    columns = list(ROUTE_COLUMNS) + [name for name in OPTIONAL_COLUMNS
+                                     if all(row.get(name) is not None for row in rows)]
+    
+    if db.session.get_bind().dialect.name == 'postgresql':
+        for start in range(0, len(rows), VALUES_CHUNK_SIZE):
+            _update_from_values(rows[start:start + VALUES_CHUNK_SIZE], columns, updated_at)
+    else:
+        table = Delivery.__table__
+        statement = update(table).where(table.c.id == bindparam('b_id')).values(
+            updated_at=bindparam('b_updated_at'),
+            **{name: bindparam(f'b_{name}') for name in columns}
+        )
+        db.session.execute(statement, [
+            dict({f'b_{name}': row[name] for name in columns}, b_id=row['delivery_id'], b_updated_at=updated_at)
+            for row in rows
+        ])
+    return len(rows)
+
+
+def _update_from_values(rows: List[Dict], columns: List[str], updated_at: datetime):
+    table = Delivery.__table__
+    plan = values(
+        column('id', Integer),
+        column('updated_at', DateTime),
+        *[column(name, table.c[name].type) for name in columns],
+        name='plan'
+    ).data([(row['delivery_id'], updated_at) + tuple(row[name] for name in columns) for row in rows])
+    db.session.execute(
+        update(table)
+        .where(table.c.id == plan.c.id)
+        .values(updated_at=plan.c.updated_at, **{name: plan.c[name] for name in columns})
+    )
+
+
+def assign_driver(delivery_ids: List[int], driver_id: Optional[int]) -> int:
+    """
+    Assign (or, with None, unassign) a driver to many deliveries in one
+    UPDATE ... WHERE id IN (...). The caller commits.
+
+    Returns:
+        Number of deliveries updated
+    """
+    if not delivery_ids:
+        return 0
+    table = Delivery.__table__
+    result = db.session.execute(
+        update(table)
+        .where(table.c.id.in_(delivery_ids))
+        .values(assigned_delivery_person_id=driver_id, updated_at=datetime.utcnow())
+    )
+    return result.rowcount
@@ -0,0 +1,145 @@
+import math
+from typing import List, Optional, Sequence, Tuple
+import numpy as np
+from .clustering import project_coordinates
+
+# Below these sizes a dense NumPy pass over the distance matrix is faster
+GRID_MIN_TOUR_POINTS = 5000
+GRID_MIN_CANDIDATE_POINTS = 1000
+
+
+class SpatialGrid:
+    """
+    Uniform grid over projected stop coordinates for nearest-point queries.
+
+    Points are bucketed into square cells sized for about two points each.
+    Queries search outward ring by ring from the query's cell and stop once
+    the best distance found is shorter than the distance to the next ring,
+    so each query touches a handful of cells instead of every point.
+    Distances are planar kilometers, which track the road and great-circle
+    matrices closely enough to pick construction moves and candidates.
+    """
+
+    def __init__(self, points: np.ndarray, points_per_cell: float = 2.0):
+        self.points = np.asarray(points, dtype=np.float64).reshape(-1, 2)
+        n = len(self.points)
+        self.low = self.points.min(axis=0) if n else np.zeros(2)
+        extent = (self.points.max(axis=0) - self.low) if n else np.zeros(2)
+        area = max(float(extent[0] * extent[1]), 1e-9)
+        self.cell_km = max(math.sqrt(area * points_per_cell / max(n, 1)), float(extent.max()) / max(n, 1), 1e-6)
+        self.shape = (int(extent[0] // self.cell_km) + 1, int(extent[1] // self.cell_km) + 1)
+
+        cells = self.cell_of(self.points)
+        cell_ids = cells[:, 0] * self.shape[1] + cells[:, 1]
+        self.order = np.argsort(cell_ids, kind='stable')
+        self.cell_start = np.searchsorted(cell_ids[self.order], np.arange(self.shape[0] * self.shape[1] + 1))
+        self.cells = cells
+
+    @classmethod
+    def from_coordinates(cls, coordinates: Sequence[Tuple[float, float]], **kwargs) -> 'SpatialGrid':
+        """Grid over (lat, lon) pairs projected onto a local plane."""
+        return cls(project_coordinates(coordinates), **kwargs)
+
+    def cell_of(self, points: np.ndarray) -> np.ndarray:
+        cells = ((np.asarray(points).reshape(-1, 2) - self.low) // self.cell_km).astype(np.int64)
+        return np.clip(cells, 0, np.array(self.shape) - 1)
+
+    def _ring(self, cx: int, cy: int, r: int):
+        """Cells at Chebyshev distance r from (cx, cy) that lie inside the grid."""
+        if r == 0:
+            yield cx, cy
+            return
+        nx, ny = self.shape
+        for x in range(max(cx - r, 0), min(cx + r, nx - 1) + 1):
+            if cy - r >= 0:
+                yield x, cy - r
+            if cy + r < ny:
+                yield x, cy + r
+        for y in range(max(cy - r + 1, 0), min(cy + r - 1, ny - 1) + 1):
+            if cx - r >= 0:
+                yield cx - r, y
+            if cx + r < nx:
+                yield cx + r, y
+
+    def nearest_neighbor_tour(self, start_index: int = 0) -> List[int]:
+        """
+        Nearest-neighbor tour over the points from start_index.
+
+        Visited points are removed from their cell lists, so each step only
+        scans the rings around the current point that can still hold a
+        closer unvisited point.
+        """
+        n = len(self.points)
+        if n <= 1:
+            return list(range(n))
+        ny = self.shape[1]
+        buckets = [self.order[self.cell_start[c]:self.cell_start[c + 1]].tolist()
+                   for c in range(len(self.cell_start) - 1)]
+        xs, ys = self.points[:, 0].tolist(), self.points[:, 1].tolist()
+        cells = self.cells.tolist()
+        max_ring = max(self.shape)
+        cell_km = self.cell_km
+
+        current = start_index
+        cx, cy = cells[current]
+        buckets[cx * ny + cy].remove(current)
+        route = [current]
+        for _ in range(n - 1):
+            px, py = xs[current], ys[current]
+            cx, cy = cells[current]
+            best, best_d = -1, math.inf
+            for r in range(max_ring + 1):
+                for x, y in self._ring(cx, cy, r):
+                    for j in buckets[x * ny + y]:
+                        d = (xs[j] - px) ** 2 + (ys[j] - py) ** 2
+                        if d < best_d:
+                            best, best_d = j, d
+                # Anything in ring r + 1 is at least r cells away
+                if best >= 0 and best_d <= (r * cell_km) ** 2:
+                    break
+            bx, by = cells[best]
+            buckets[bx * ny + by].remove(best)
+            route.append(best)
+            current = best
+        return route
+
+    def k_nearest(self, k: int) -> np.ndarray:
+        """
+        The k nearest other points of every point, nearest first.
+
+        Works one cell at a time: the points of a cell are compared against
+        the block of cells around it, grown until it holds enough points and
+        the k-th distance of every point is inside the block.
+
+        Returns:
+            (n, k) array of point indices
+        """
+        n = len(self.points)
+        k = min(k, n - 1)
+        result = np.zeros((n, max(k, 0)), dtype=np.int64)
+        if k <= 0:
+            return result
+        nx, ny = self.shape
+        counts = np.diff(self.cell_start).reshape(nx, ny)
+        for cell in np.flatnonzero(counts.ravel()):
+            cx, cy = divmod(int(cell), ny)
+            members = self.order[self.cell_start[cell]:self.cell_start[cell + 1]]
+            r = 1
+            while True:
+                x0, x1, y0, y1 = max(cx - r, 0), min(cx + r, nx - 1), max(cy - r, 0), min(cy + r, ny - 1)
+                covers_grid = x0 == 0 and y0 == 0 and x1 == nx - 1 and y1 == ny - 1
+                if counts[x0:x1 + 1, y0:y1 + 1].sum() > k or covers_grid:
+                    block = np.concatenate([self.order[self.cell_start[x * ny + y0]:self.cell_start[x * ny + y1 + 1]]
+                                            for x in range(x0, x1 + 1)])
+                    diff = self.points[members][:, None, :] - self.points[block][None, :, :]
+                    dist = (diff ** 2).sum(axis=2)
+                    dist[members[:, None] == block[None, :]] = np.inf
+                    nearest = np.argpartition(dist, k - 1, axis=1)[:, :k]
+                    kth = np.take_along_axis(dist, nearest, axis=1)
+                    # Points outside the block are at least r cells away
+                    if covers_grid or kth.max() <= (r * self.cell_km) ** 2:
+                        order = kth.argsort(axis=1)
+                        result[members] = block[np.take_along_axis(nearest, order, axis=1)]
+                        break
+                r += 1
+        return result
@@ -0,0 +1,83 @@
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+
+
+class StopTable:
+    """
+    Column-oriented state of the stops being routed.
+
+    The solvers only need coordinates and each stop's service time and
+    driving rate, so those are kept as NumPy columns. The delivery dicts
+    are referenced by row, never copied: one vehicle's stops are a take()
+    of the columns rather than a new list of dicts, and names, phones and
+    addresses are only read again by materialize(), when a solved route is
+    turned into the API format.
+    """
+
+    __slots__ = ('deliveries', 'rows', 'coordinates', 'service_minutes', 'minutes_per_km')
+
+    def __init__(self, deliveries: Sequence[Dict], rows: np.ndarray, coordinates: np.ndarray,
+                 service_minutes: np.ndarray, minutes_per_km: np.ndarray):
+        self.deliveries = deliveries
+        self.rows = rows
+        self.coordinates = coordinates
+        self.service_minutes = service_minutes
+        self.minutes_per_km = minutes_per_km
+
+    @classmethod
+    def from_deliveries(cls, deliveries: Sequence[Dict], coordinates: Sequence[Tuple[float, float]],
+                        default_service_minutes: float, default_minutes_per_km: float) -> 'StopTable':
+        """
+        Columns for deliveries, using the fitted 'service_minutes' and
+        'minutes_per_km' TravelModel.annotate() put on a delivery, else the defaults.
+        """
+        n = len(deliveries)
+        return cls(
+            deliveries,
+            np.arange(n),
+            np.asarray(coordinates, dtype=np.float64).reshape(n, 2),
+            np.fromiter((float(delivery.get('service_minutes') or default_service_minutes)
+                         for delivery in deliveries), dtype=np.float64, count=n),
+            # float32 like the distance matrices they multiply
+            np.fromiter((float(delivery.get('minutes_per_km') or default_minutes_per_km)
+                         for delivery in deliveries), dtype=np.float32, count=n)
+        )
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def take(self, positions: Sequence[int]) -> 'StopTable':
+        """The stops at the given positions of this table, in that order."""
+        positions = np.asarray(positions, dtype=np.int64)
+        return StopTable(self.deliveries, self.rows[positions], self.coordinates[positions],
+                         self.service_minutes[positions], self.minutes_per_km[positions])
+
+    def delivery(self, position: int) -> Dict:
+        return self.deliveries[self.rows[position]]
+
+    def materialize(self, order: Sequence[int], estimated_minutes: np.ndarray,
+                    extra: Optional[List[Dict]] = None) -> List[Dict]:
+        """
+        API entries for a route visiting the stops at positions order, with
+        estimated times given as minutes from midnight (shown as HH:MM).
+        extra, if given, holds fields added to each entry.
+        """
+        coordinates = self.coordinates[np.asarray(order, dtype=np.int64)].tolist() if len(order) else []
+        clock = np.floor(estimated_minutes).astype(np.int64) % 1440 if len(order) else []
+        entries = []
+        for sequence, (position, coord, minutes) in enumerate(zip(order, coordinates, clock), 1):
+            delivery = self.deliveries[self.rows[position]]
+            entry = {
+                'delivery_id': delivery.get('id'),
+                'sequence': sequence,
+                'customer_name': delivery.get('customer_name', ''),
+                'customer_phone': delivery.get('customer_phone', ''),
+                'address': delivery.get('delivery_address', ''),
+                'estimated_time': f"{minutes // 60:02d}:{minutes % 60:02d}",
+                'delivery_instructions': delivery.get('delivery_instructions', ''),
+                'coordinates': tuple(coord)
+            }
+            if extra is not None:
+                entry.update(extra[sequence - 1])
+            entries.append(entry)
+        return entries
@@ -0,0 +1,202 @@
+import math
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+
+INF = float('inf')
+
+# Routes, nearest first, a stop may be inserted into
+ROUTE_CANDIDATES = 8
+
+
+class VRPTWSolver:
+    """
+    Vehicle routing with delivery time windows from a single depot (index 0).
+
+    Stops are inserted one at a time, tightest deadline first, at the
+    cheapest position that keeps every stop of the route on time. Each route
+    keeps the service start time of every stop (forward schedule) and the
+    latest start that still keeps all later stops on time (backward slack),
+    so checking an insertion is O(1): the new stop must start within its
+    window and the push-forward it causes at the next stop must not exceed
+    that stop's latest start. Stops that cannot be served on time anywhere
+    are placed where they add the least lateness, and lateness is reported;
+    they go over a vehicle's capacity only when every vehicle is full and
+    no other may be added, and are then listed in over_capacity_stops;
+    the lateness an insertion adds is bounded in O(1) from the next stop's
+    slack (latest start minus start) and the number of stops after it.
+    Every position of a route is checked at once with NumPy, and only the
+    ROUTE_CANDIDATES routes passing closest to a stop are considered.
+
+    Times are minutes from midnight; arriving early means waiting for the
+    window to open. Routes are open and do not return to the depot.
+    """
+
+    def __init__(self, travel_minutes, service_minutes: Sequence[float],
+                 windows: Sequence[Tuple[Optional[float], Optional[float]]], start_minutes: float,
+                 vehicle_count: Optional[int] = None, demands: Optional[Sequence[int]] = None,
+                 capacity: Optional[int] = None):
+        self.travel_matrix = np.asarray(travel_minutes, dtype=np.float64)
+        self.travel = self.travel_matrix.tolist()
+        self.size = len(self.travel)
+        self.service = [0.0] + [float(s) for s in service_minutes]
+        self.earliest = [start_minutes] + [start_minutes if w[0] is None else float(w[0]) for w in windows]
+        self.latest = [INF] + [INF if w[1] is None else float(w[1]) for w in windows]
+        self.service_array = np.asarray(self.service)
+        self.earliest_array = np.asarray(self.earliest)
+        self.start_minutes = start_minutes
+        self.vehicle_count = vehicle_count
+        self.demands = [0] + list(demands) if demands is not None else [0] + [1] * (self.size - 1)
+        self.capacity = capacity if capacity is not None else INF
+        self.over_capacity_stops: List[int] = []
+
+    def solve(self) -> List[List[int]]:
+        """Return the routes as lists of stop indices, depot excluded."""
+        routes: List[Dict] = []
+        self.over_capacity_stops = []
+        order = sorted(range(1, self.size), key=lambda u: (self.latest[u], self.earliest[u]))
+
+        for u in order:
+            candidates = self._candidate_routes(routes, u)
+            best = self._best_feasible_insertion(routes, u, candidates)
+            if best is None and (self.vehicle_count is None or len(routes) < self.vehicle_count):
+                routes.append(self._new_route())
+                candidates = candidates + [len(routes) - 1]
+                best = self._best_feasible_insertion(routes, u, candidates[-1:])
+            if best is None:
+                best = self._least_late_insertion(routes, u, candidates)
+            _, r, k = best
+            route = routes[r]
+            if route['load'] + self.demands[u] > self.capacity:
+                self.over_capacity_stops.append(u)
+            route['nodes'].insert(k + 1, u)
+            route['load'] += self.demands[u]
+            self._refresh(route)
+
+        return [route['nodes'][1:] for route in routes if len(route['nodes']) > 1]
+
+    def schedule(self, route: List[int]) -> List[Dict]:
+        """Arrival, service start, wait and lateness (minutes) for each stop of a route."""
+        timeline = []
+        current, clock = 0, self.start_minutes
+        for node in route:
+            arrival = clock + self.service[current] + self.travel[current][node]
+            start = max(arrival, self.earliest[node])
+            timeline.append({
+                'arrival': arrival,
+                'start': start,
+                'wait': start - arrival,
+                'lateness': max(0.0, start - self.latest[node])
+            })
+            current, clock = node, start
+        return timeline
+
+    def _new_route(self) -> Dict:
+        route = {'nodes': [0], 'load': 0}
+        self._refresh(route)
+        return route
+
+    def _candidate_routes(self, routes: List[Dict], u: int) -> List[int]:
+        """Indices of the ROUTE_CANDIDATES routes whose stops come closest to u."""
+        if len(routes) <= ROUTE_CANDIDATES:
+            return list(range(len(routes)))
+        closest = [self.travel_matrix[route['array'], u].min() for route in routes]
+        return sorted(np.argsort(closest, kind='stable')[:ROUTE_CANDIDATES].tolist())
+
+    def _refresh(self, route: Dict):
+        """Recompute forward start times, backward latest starts and slack of a route."""
+        nodes = route['nodes']
+        travel, service, earliest, latest = self.travel, self.service, self.earliest, self.latest
+        start = [self.start_minutes]
+        for k in range(1, len(nodes)):
+            prev, node = nodes[k - 1], nodes[k]
+            start.append(max(earliest[node], start[-1] + service[prev] + travel[prev][node]))
+        latest_start = [0.0] * len(nodes)
+        latest_start[-1] = max(latest[nodes[-1]], start[-1])
+        for k in range(len(nodes) - 2, -1, -1):
+            node, nxt = nodes[k], nodes[k + 1]
+            # A stop that is already late can slip no further than it is now
+            latest_start[k] = max(min(latest[node], latest_start[k + 1] - service[node] - travel[node][nxt]),
+                                  start[k] if k else -INF)
+        route['start'] = start
+        route['latest_start'] = latest_start
+        route['array'] = np.asarray(nodes, dtype=np.int64)
+        route['start_array'] = np.asarray(start)
+        route['latest_start_array'] = np.asarray(latest_start)
+        route['slack'] = route['latest_start_array'] - route['start_array']
+
+    def _insertion_times(self, route: Dict, u: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        For u inserted after every position of a route: the start of u, the
+        new start of the following stop, and the minutes it adds.
+        """
+        nodes, start = route['array'], route['start_array']
+        travel = self.travel_matrix
+        to_u = travel[nodes, u]
+        begin_u = np.maximum(self.earliest[u], start + self.service_array[nodes] + to_u)
+        following = nodes[1:]
+        from_u = travel[u, following]
+        pushed = np.maximum(self.earliest_array[following], begin_u[:-1] + self.service[u] + from_u)
+        added = to_u.copy()
+        added[:-1] = to_u[:-1] + from_u - travel[nodes[:-1], following]
+        return begin_u, pushed, added
+
+    def _best_feasible_insertion(self, routes: List[Dict], u: int,
+                                 candidates: List[int]) -> Optional[Tuple[float, int, int]]:
+        """Cheapest on-time insertion of u as (added minutes, route index, insert after position)."""
+        best = None
+        for r in candidates:
+            route = routes[r]
+            if route['load'] + self.demands[u] > self.capacity:
+                continue
+            begin_u, pushed, added = self._insertion_times(route, u)
+            feasible = begin_u <= self.latest[u]
+            feasible[:-1] &= pushed <= route['latest_start_array'][1:]
+            if not feasible.any():
+                continue
+            k = int(np.argmin(np.where(feasible, added, INF)))
+            if best is None or added[k] < best[0]:
+                best = (float(added[k]), r, k)
+        return best
+
+    def _least_late_insertion(self, routes: List[Dict], u: int, candidates: List[int]) -> Tuple[float, int, int]:
+        """
+        Fallback for stops that cannot be served on time: add the least
+        lateness among the candidate routes with spare capacity, or any
+        route with spare capacity when no candidate has it. Only when no
+        route has room are full routes considered. The lateness of later
+        stops is bounded by the delay beyond the next stop's slack times
+        the number of stops it can reach.
+        """
+        fits = [r for r in range(len(routes)) if routes[r]['load'] + self.demands[u] <= self.capacity]
+        fitting = set(fits)
+        pool = [r for r in candidates if r in fitting] or fits or candidates or list(range(len(routes)))
+        best = None
+        for r in pool:
+            route = routes[r]
+            begin_u, pushed, _ = self._insertion_times(route, u)
+            lateness = np.maximum(0.0, begin_u - self.latest[u])
+            delay = pushed - route['start_array'][1:]
+            tail = np.arange(len(delay), 0, -1)
+            lateness[:-1] += np.maximum(0.0, delay - route['slack'][1:]) * tail
+            k = int(np.argmin(lateness))
+            if best is None or lateness[k] < best[0]:
+                best = (float(lateness[k]), r, k)
+        if best is None:
+            raise ValueError("No vehicle available for time-window routing")
+        return best
+
+
+def minutes_of_day(value) -> Optional[float]:
+    """Convert a time, datetime or 'HH:MM' string to minutes from midnight."""
+    if value is None or value == '':
+        return None
+    if isinstance(value, str):
+        hours, minutes = value.split(':')[:2]
+        return int(hours) * 60 + int(minutes)
+    return value.hour * 60 + value.minute
+
+
+def format_minutes(minutes: float) -> str:
+    """Format minutes from midnight as HH:MM."""
+    minutes = int(math.floor(minutes + 0.5))
+    return f"{(minutes // 60) % 24:02d}:{minutes % 60:02d}"
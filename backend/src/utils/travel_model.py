@@ -0,0 +1,185 @@
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from src.models.database import db, Delivery, Order, Customer, TravelModelParameter
+from .route_optimizer import EARTH_RADIUS_KM, RouteOptimizer, _central_angle
+
+# Legs outside these bounds are data-entry noise (breaks, missed scans)
+MAX_LEG_MINUTES = 120
+MAX_LEG_KM = 50
+
+# Fitted values are clamped to plausible ranges (minutes per km 0.8-10 = 75-6 km/h)
+SERVICE_MINUTES_RANGE = (1.0, 60.0)
+MINUTES_PER_KM_RANGE = (0.8, 10.0)
+
+
+def fit_groups(groups: np.ndarray, distances_km: np.ndarray, elapsed_minutes: np.ndarray, group_count: int,
+               prior: Tuple[float, float], prior_weight: float = 20.0) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Fit elapsed = service + minutes_per_km * distance for every group at once.
+
+    Per-group least squares from bincount sums; groups with few legs are
+    shrunk toward the prior (prior_weight pseudo-legs), and groups whose
+    legs all have the same length keep the prior speed.
+
+    Returns:
+        (service_minutes, minutes_per_km, leg_count) arrays indexed by group
+    """
+    count = np.bincount(groups, minlength=group_count).astype(np.float64)
+    sum_d = np.bincount(groups, weights=distances_km, minlength=group_count)
+    sum_dd = np.bincount(groups, weights=distances_km ** 2, minlength=group_count)
+    sum_y = np.bincount(groups, weights=elapsed_minutes, minlength=group_count)
+    sum_dy = np.bincount(groups, weights=distances_km * elapsed_minutes, minlength=group_count)
+
+    prior_service, prior_speed = prior
+    denominator = count * sum_dd - sum_d ** 2
+    spread = denominator > 1e-9 * np.maximum(count, 1) ** 2
+    slope = np.full(group_count, prior_speed)
+    slope[spread] = (count[spread] * sum_dy[spread] - sum_d[spread] * sum_y[spread]) / denominator[spread]
+    slope = np.clip(slope, *MINUTES_PER_KM_RANGE)
+    has_legs = count > 0
+    intercept = np.full(group_count, prior_service)
+    intercept[has_legs] = (sum_y[has_legs] - slope[has_legs] * sum_d[has_legs]) / count[has_legs]
+    intercept = np.clip(intercept, *SERVICE_MINUTES_RANGE)
+
+    weight = count / (count + prior_weight)
+    service = weight * intercept + (1 - weight) * prior_service
+    speed = weight * slope + (1 - weight) * prior_speed
+    return service, speed, count.astype(np.int64)
+
+
+class TravelModel:
+    """
+    Service time per stop and driving minutes per km, learned from delivery history.
+
+    Completed routes are rebuilt from actual_delivery_time per driver and
+    day. The time between two consecutive drops is the service time at the
+    first plus the drive to the second, so a linear fit over the legs of a
+    zone (the zone of the first drop) or driver gives both parameters.
+    Lookups prefer the driver's fit, then the zone's, then the global one.
+    """
+
+    def __init__(self, parameters: Optional[Dict[Tuple[str, str], Dict]] = None):
+        self.parameters = parameters or {}
+
+    @classmethod
+    def from_database(cls) -> 'TravelModel':
+        """Load the fitted parameters from the travel_model_parameters table."""
+        rows = TravelModelParameter.query.all()
+        return cls({(row.scope, row.scope_key): {
+            'service_minutes': row.service_minutes,
+            'minutes_per_km': row.minutes_per_km,
+            'sample_count': row.sample_count
+        } for row in rows})
+
+    @staticmethod
+    def load_history(since: date) -> Dict[str, np.ndarray]:
+        """Completed drops since a date, as column arrays."""
+        rows = db.session.query(
+            Delivery.delivery_date,
+            Delivery.assigned_delivery_person_id,
+            Delivery.delivery_zone,
+            Delivery.actual_delivery_time,
+            Customer.latitude,
+            Customer.longitude
+        ).join(Order, Delivery.order_id == Order.id)\
+         .join(Customer, Order.customer_id == Customer.id)\
+         .filter(Delivery.delivery_date >= since)\
+         .filter(Delivery.actual_delivery_time.isnot(None))\
+         .filter(Delivery.assigned_delivery_person_id.isnot(None))\
+         .filter(Customer.latitude.isnot(None), Customer.longitude.isnot(None))\
+         .all()
+
+        return {
+            'day': np.array([row.delivery_date.toordinal() for row in rows], dtype=np.int64),
+            'driver': np.array([row.assigned_delivery_person_id for row in rows], dtype=np.int64),
+            'zone': np.array([row.delivery_zone or '' for row in rows], dtype=object),
+            'minute': np.array([row.actual_delivery_time.hour * 60 + row.actual_delivery_time.minute +
+                                row.actual_delivery_time.second / 60 for row in rows], dtype=np.float64),
+            'latitude': np.array([row.latitude for row in rows], dtype=np.float64),
+            'longitude': np.array([row.longitude for row in rows], dtype=np.float64),
+        }
+
+    @staticmethod
+    def legs(history: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+        """Consecutive drops of the same driver and day: distance, elapsed time, zone and driver."""
+        order = np.lexsort((history['minute'], history['day'], history['driver']))
+        columns = {name: values[order] for name, values in history.items()}
+        same_route = (columns['driver'][1:] == columns['driver'][:-1]) & (columns['day'][1:] == columns['day'][:-1])
+
+        lat, lon = np.radians(columns['latitude']), np.radians(columns['longitude'])
+        distance = EARTH_RADIUS_KM * _central_angle(lat[:-1], lon[:-1], lat[1:], lon[1:])
+        elapsed = columns['minute'][1:] - columns['minute'][:-1]
+        valid = same_route & (elapsed > 0) & (elapsed <= MAX_LEG_MINUTES) & (distance <= MAX_LEG_KM)
+
+        return {
+            'distance': distance[valid],
+            'elapsed': elapsed[valid],
+            'zone': columns['zone'][:-1][valid],
+            'driver': columns['driver'][:-1][valid],
+        }
+
+    def fit(self, legs: Dict[str, np.ndarray], prior_weight: float = 20.0) -> Dict[Tuple[str, str], Dict]:
+        """Fit global, per-zone and per-driver parameters from legs."""
+        default = (float(RouteOptimizer.SERVICE_MINUTES), float(RouteOptimizer.MINUTES_PER_KM))
+        parameters = {}
+        if len(legs['elapsed']) == 0:
+            return parameters
+
+        service, speed, count = fit_groups(np.zeros(len(legs['elapsed']), dtype=np.int64), legs['distance'],
+                                           legs['elapsed'], 1, default, prior_weight=5.0)
+        global_prior = (float(service[0]), float(speed[0]))
+        parameters[('global', '')] = {'service_minutes': global_prior[0], 'minutes_per_km': global_prior[1],
+                                      'sample_count': int(count[0])}
+
+        for scope in ('zone', 'driver'):
+            keys, groups = np.unique(legs[scope].astype(str), return_inverse=True)
+            service, speed, count = fit_groups(groups, legs['distance'], legs['elapsed'], len(keys),
+                                               global_prior, prior_weight)
+            for k, key in enumerate(keys):
+                if key:
+                    parameters[(scope, str(key))] = {'service_minutes': float(service[k]),
+                                                     'minutes_per_km': float(speed[k]),
+                                                     'sample_count': int(count[k])}
+        self.parameters = parameters
+        return parameters
+
+    def fit_from_history(self, months: int = 6) -> Dict[Tuple[str, str], Dict]:
+        """Batch job: fit from the last months of completed deliveries and store the results."""
+        since = date.today() - timedelta(days=30 * months)
+        parameters = self.fit(self.legs(self.load_history(since)))
+        self.save()
+        return parameters
+
+    def save(self):
+        """Replace the stored parameters with the current fit."""
+        fitted_at = datetime.utcnow()
+        TravelModelParameter.query.delete()
+        db.session.add_all([
+            TravelModelParameter(scope=scope, scope_key=key, service_minutes=values['service_minutes'],
+                                 minutes_per_km=values['minutes_per_km'], sample_count=values['sample_count'],
+                                 fitted_at=fitted_at)
+            for (scope, key), values in self.parameters.items()
+        ])
+        db.session.commit()
+
+    def lookup(self, zone: Optional[str] = None, driver_id: Optional[int] = None) -> Optional[Dict]:
+        """Parameters for a stop: the driver's, else the zone's, else the global fit."""
+        for key in (('driver', str(driver_id)) if driver_id is not None else None,
+                    ('zone', zone) if zone else None,
+                    ('global', '')):
+            if key is not None and key in self.parameters:
+                return self.parameters[key]
+        return None
+
+    def annotate(self, deliveries: List[Dict]) -> List[Dict]:
+        """Set service_minutes and minutes_per_km on delivery dicts that have a fit."""
+        for delivery in deliveries:
+            values = self.lookup(delivery.get('delivery_zone'), delivery.get('assigned_delivery_person_id'))
+            if values:
+                delivery['service_minutes'] = values['service_minutes']
+                delivery['minutes_per_km'] = values['minutes_per_km']
+        return deliveries
+
+    def to_list(self) -> List[Dict]:
+        return [dict(values, scope=scope, scope_key=key) for (scope, key), values in sorted(self.parameters.items())]
@@ -0,0 +1,206 @@
+from typing import List, Optional, Sequence, Tuple
+import numpy as np
+from .local_search import LocalSearch
+
+
+class CVRPSolver:
+    """
+    Capacitated vehicle routing from a single depot (matrix index 0).
+
+    Routes are open, like the single-route optimizer: a vehicle leaves the
+    depot and finishes at its last stop. Routes are built with the
+    Clarke-Wright savings heuristic, restricted to each stop's nearest
+    neighbors, and then improved with inter-route relocate and exchange moves
+    that respect vehicle capacity.
+    """
+
+    def __init__(self, distance_matrix, demands: Sequence[int], capacity: int,
+                 vehicle_count: Optional[int] = None, neighbor_count: int = 20,
+                 coordinates: Optional[Sequence[Tuple[float, float]]] = None):
+        matrix = np.asarray(distance_matrix, dtype=np.float64)
+        self.size = len(matrix)
+        self.dist = matrix.tolist()
+        self.demands = [0] + [int(d) for d in demands]
+        if len(self.demands) != self.size:
+            raise ValueError("Expected one demand per stop (excluding the depot)")
+        self.capacity = capacity
+        self.vehicle_count = vehicle_count
+        self.neighbors = LocalSearch.build_neighbor_lists(matrix, neighbor_count, coordinates)
+        self._matrix = matrix
+
+        if any(d > capacity for d in self.demands):
+            raise ValueError("A single delivery exceeds the vehicle capacity")
+        if vehicle_count and sum(self.demands) > capacity * vehicle_count:
+            raise ValueError(
+                f"{sum(self.demands)} tiffins do not fit in {vehicle_count} vehicles of capacity {capacity}"
+            )
+
+    def route_length(self, route: List[int]) -> float:
+        """Length of an open route given without the depot."""
+        if not route:
+            return 0.0
+        dist = self.dist
+        return dist[0][route[0]] + sum(dist[route[k]][route[k + 1]] for k in range(len(route) - 1))
+
+    def solve(self, max_passes: int = 50) -> List[List[int]]:
+        """Return the routes as lists of stop indices, depot excluded."""
+        if self.size <= 1:
+            return []
+        routes = [self.sequence(route) for route in self.savings_routes()]
+        routes = self.improve(routes, max_passes)
+        return [self.sequence(route) for route in routes if route]
+
+    def sequence(self, route: List[int]) -> List[int]:
+        """Reorder the stops of one route with intra-route local search."""
+        if len(route) < 3:
+            return route
+        nodes = [0] + route
+        local = LocalSearch(self._matrix[np.ix_(nodes, nodes)])
+        order = local.improve(list(range(len(nodes))))
+        return [nodes[k] for k in order[1:]]
+
+    def savings_routes(self) -> List[List[int]]:
+        """Clarke-Wright savings construction for open routes."""
+        n = self.size
+        depot_dist = self._matrix[0]
+
+        # Appending route B (starting at j) after route A (ending at i) drops
+        # the depot->j edge and adds i->j: saving = d(0, j) - d(i, j)
+        rows = np.repeat(np.arange(n), [len(nbrs) for nbrs in self.neighbors])
+        cols = np.fromiter((j for nbrs in self.neighbors for j in nbrs), dtype=np.int64, count=len(rows))
+        valid = (rows > 0) & (cols > 0)
+        rows, cols = rows[valid], cols[valid]
+        savings = depot_dist[cols] - self._matrix[rows, cols]
+        order = np.argsort(-savings, kind='stable')
+
+        route_of = list(range(n))
+        members = {node: [node] for node in range(1, n)}
+        load = {node: self.demands[node] for node in range(1, n)}
+
+        for k in order:
+            if savings[k] <= 0:
+                break
+            i, j = int(rows[k]), int(cols[k])
+            ri, rj = route_of[i], route_of[j]
+            if ri == rj or members[ri][-1] != i or members[rj][0] != j:
+                continue
+            if load[ri] + load[rj] > self.capacity:
+                continue
+            self._merge(ri, rj, members, load, route_of)
+
+        # Too many routes for the fleet: keep merging the cheapest pairs
+        if self.vehicle_count:
+            while len(members) > self.vehicle_count:
+                best = None
+                for ra, a_nodes in members.items():
+                    for rb, b_nodes in members.items():
+                        if ra == rb or load[ra] + load[rb] > self.capacity:
+                            continue
+                        saving = self.dist[0][b_nodes[0]] - self.dist[a_nodes[-1]][b_nodes[0]]
+                        if best is None or saving > best[0]:
+                            best = (saving, ra, rb)
+                if best is not None:
+                    self._merge(best[1], best[2], members, load, route_of)
+                else:
+                    self._dissolve(min(members, key=lambda r: load[r]), members, load, route_of)
+
+        return list(members.values())
+
+    def _dissolve(self, rd: int, members, load, route_of):
+        """Spread the stops of route rd over the other routes by cheapest insertion."""
+        dist, edge = self.dist, self._edge
+        for node in members.pop(rd):
+            best = None
+            for r, nodes in members.items():
+                if load[r] + self.demands[node] > self.capacity:
+                    continue
+                path = [0] + nodes
+                for k in range(len(path)):
+                    after = path[k + 1] if k + 1 < len(path) else None
+                    cost = dist[path[k]][node] + edge(node, after) - edge(path[k], after)
+                    if best is None or cost < best[0]:
+                        best = (cost, r, k)
+            if best is None:
+                raise ValueError("Deliveries cannot be packed into the available vehicles")
+            _, r, k = best
+            members[r].insert(k, node)
+            load[r] += self.demands[node]
+            route_of[node] = r
+        load.pop(rd)
+
+    @staticmethod
+    def _merge(ra: int, rb: int, members, load, route_of):
+        """Append route rb to the end of route ra."""
+        for node in members[rb]:
+            route_of[node] = ra
+        members[ra].extend(members.pop(rb))
+        load[ra] += load.pop(rb)
+
+    def _edge(self, a: Optional[int], b: Optional[int]) -> float:
+        if a is None or b is None:
+            return 0.0
+        return self.dist[a][b]
+
+    def improve(self, routes: List[List[int]], max_passes: int = 50) -> List[List[int]]:
+        """
+        Inter-route relocate and exchange over neighbor candidates.
+        Routes carry the depot at position 0 while they are being improved.
+        """
+        routes = [[0] + route for route in routes]
+        loads = [sum(self.demands[node] for node in route) for route in routes]
+        route_of = [-1] * self.size
+        for r, route in enumerate(routes):
+            for node in route[1:]:
+                route_of[node] = r
+
+        dist, edge, demands = self.dist, self._edge, self.demands
+
+        for _ in range(max_passes):
+            improved = False
+            for u in range(1, self.size):
+                ru = route_of[u]
+                route_u = routes[ru]
+                pu = route_u.index(u)
+                prev_u = route_u[pu - 1]
+                next_u = route_u[pu + 1] if pu + 1 < len(route_u) else None
+                removal_gain = dist[prev_u][u] + edge(u, next_u) - edge(prev_u, next_u)
+
+                for v in self.neighbors[u]:
+                    rv = route_of[v] if v else -1
+                    if rv < 0 or rv == ru:
+                        continue
+                    route_v = routes[rv]
+                    pv = route_v.index(v)
+                    prev_v = route_v[pv - 1]
+                    next_v = route_v[pv + 1] if pv + 1 < len(route_v) else None
+
+                    # Relocate u next to v (after v, or before it)
+                    if loads[rv] + demands[u] <= self.capacity:
+                        after = dist[v][u] + edge(u, next_v) - edge(v, next_v)
+                        before = dist[prev_v][u] + dist[u][v] - dist[prev_v][v]
+                        insert_cost, insert_at = (after, pv + 1) if after <= before else (before, pv)
+                        if insert_cost - removal_gain < -1e-9:
+                            route_u.pop(pu)
+                            route_v.insert(insert_at, u)
+                            loads[ru] -= demands[u]
+                            loads[rv] += demands[u]
+                            route_of[u] = rv
+                            improved = True
+                            break
+
+                    # Exchange u and v between their routes
+                    if loads[ru] - demands[u] + demands[v] <= self.capacity and \
+                            loads[rv] - demands[v] + demands[u] <= self.capacity:
+                        delta = (dist[prev_u][v] + edge(v, next_u) - dist[prev_u][u] - edge(u, next_u) +
+                                 dist[prev_v][u] + edge(u, next_v) - dist[prev_v][v] - edge(v, next_v))
+                        if delta < -1e-9:
+                            route_u[pu], route_v[pv] = v, u
+                            loads[ru] += demands[v] - demands[u]
+                            loads[rv] += demands[u] - demands[v]
+                            route_of[u], route_of[v] = rv, ru
+                            improved = True
+                            break
+            if not improved:
+                break
+
+        return [route[1:] for route in routes]
@@ -0,0 +1,147 @@
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+import numpy as np
+from .clustering import capacitated_kmeans
+from .local_search import LocalSearch
+
+# Default shift for drivers given without one
+DEFAULT_SHIFT_MINUTES = 240
+
+
+class WorkloadBalancer:
+    """
+    Min-max partition of one day's stops between drivers.
+
+    Each driver gets an open route from the depot (matrix index 0); its
+    workload is the drive time along the route plus the service time of
+    its stops. The goal is to minimize the largest workload relative to
+    the driver's shift, so longer shifts take proportionally more work.
+
+    Routes start from capacitated k-means clusters, the heaviest cluster
+    going to the longest shift. Then, until no move helps or the time
+    budget runs out, the most loaded route hands one of its stops to the
+    route where it lowers the peak utilization most (cheapest insertion
+    into routes that hold the stop's nearest neighbors, and the least
+    loaded route), and both routes are re-sequenced with local search.
+    """
+
+    def __init__(self, distance_matrix: np.ndarray, travel_minutes: np.ndarray,
+                 service_minutes: Sequence[float], shift_minutes: Sequence[float],
+                 coordinates: Optional[List[Tuple[float, float]]] = None, neighbor_count: int = 8):
+        self.distance_matrix = np.asarray(distance_matrix)
+        self.travel = np.asarray(travel_minutes, dtype=np.float64)
+        self.service = np.concatenate([[0.0], np.asarray(service_minutes, dtype=np.float64)])
+        self.shifts = np.asarray(shift_minutes, dtype=np.float64)
+        if len(self.shifts) == 0:
+            raise ValueError("At least one driver is needed to balance routes")
+        if (self.shifts <= 0).any():
+            raise ValueError("Shift lengths must be positive")
+        self.coordinates = coordinates
+        self.neighbors = LocalSearch.build_neighbor_lists(self.distance_matrix, neighbor_count, coordinates)
+
+    def workload(self, route: List[int]) -> float:
+        """Drive plus service minutes of an open route given without the depot."""
+        if not route:
+            return 0.0
+        nodes = np.asarray([0] + route)
+        return float(self.travel[nodes[:-1], nodes[1:]].sum() + self.service[nodes[1:]].sum())
+
+    def sequence(self, route: List[int]) -> List[int]:
+        """Reorder a route's stops with intra-route local search."""
+        if len(route) < 3:
+            return route
+        nodes = [0] + route
+        coordinates = [self.coordinates[node] for node in nodes] if self.coordinates is not None else None
+        order = LocalSearch(self.distance_matrix[np.ix_(nodes, nodes)], coordinates=coordinates)\
+            .improve(list(range(len(nodes))))
+        return [nodes[k] for k in order[1:]]
+
+    def initial_routes(self) -> List[List[int]]:
+        """Capacitated k-means clusters, the heaviest cluster on the longest shift."""
+        stops = len(self.distance_matrix) - 1
+        drivers = len(self.shifts)
+        if stops == 0:
+            return [[] for _ in range(drivers)]
+        if self.coordinates is not None:
+            demands = np.maximum(np.rint(self.service[1:]), 1).astype(np.int64)
+            labels = capacitated_kmeans(self.coordinates[1:], demands, k=min(drivers, stops))
+        else:
+            labels = np.arange(stops) % min(drivers, stops)
+        clusters = [self.sequence([int(node) + 1 for node in np.flatnonzero(labels == label)])
+                    for label in range(drivers)]
+        clusters.sort(key=self.workload, reverse=True)
+        routes = [[] for _ in range(drivers)]
+        for driver, cluster in zip(np.argsort(-self.shifts, kind='stable').tolist(), clusters):
+            routes[driver] = cluster
+        return routes
+
+    def _removal(self, route: List[int], position: int) -> float:
+        """Minutes saved by taking the stop at position out of the route."""
+        travel = self.travel
+        prev = route[position - 1] if position > 0 else 0
+        node = route[position]
+        saved = travel[prev, node] + self.service[node]
+        if position + 1 < len(route):
+            nxt = route[position + 1]
+            saved += travel[node, nxt] - travel[prev, nxt]
+        return float(saved)
+
+    def _insertion(self, route: List[int], node: int) -> Tuple[float, int]:
+        """Cheapest (added minutes, position) to insert node into the route."""
+        travel = self.travel
+        nodes = np.asarray([0] + route)
+        # Inserting after nodes[k] costs t(k, u) + t(u, k+1) - t(k, k+1); after the last stop, t(last, u)
+        cost = travel[nodes, node].copy()
+        cost[:-1] += travel[node, nodes[1:]] - travel[nodes[:-1], nodes[1:]]
+        k = int(np.argmin(cost))
+        return float(cost[k] + self.service[node]), k
+
+    def balance(self, time_budget_ms: float = 2000.0, max_moves: int = 10000) -> Tuple[List[List[int]], Dict]:
+        """
+        Partition and sequence the stops.
+
+        Returns:
+            One route per driver (in shift order, depot excluded) and
+            statistics: initial and final peak utilization, moves applied
+        """
+        deadline = time.perf_counter() + time_budget_ms / 1000.0
+        routes = self.initial_routes()
+        loads = [self.workload(route) for route in routes]
+        initial_peak = max(load / shift for load, shift in zip(loads, self.shifts))
+        route_of = {node: r for r, route in enumerate(routes) for node in route}
+
+        moves = 0
+        while moves < max_moves and time.perf_counter() < deadline:
+            ratios = [load / shift for load, shift in zip(loads, self.shifts)]
+            source = int(np.argmax(ratios))
+            peak = ratios[source]
+            lightest = int(np.argmin(ratios))
+            best = None  # (new peak, added minutes, node, target, position)
+            for position, node in enumerate(routes[source]):
+                source_ratio = (loads[source] - self._removal(routes[source], position)) / self.shifts[source]
+                targets = {route_of[other] for other in self.neighbors[node] if other in route_of}
+                targets.add(lightest)
+                targets.discard(source)
+                for target in targets:
+                    added, insert_at = self._insertion(routes[target], node)
+                    new_peak = max(source_ratio, (loads[target] + added) / self.shifts[target])
+                    if new_peak < peak - 1e-9 and (best is None or (new_peak, added) < best[:2]):
+                        best = (new_peak, added, node, target, insert_at)
+            if best is None:
+                break
+
+            _, _, node, target, insert_at = best
+            routes[source].remove(node)
+            routes[target].insert(insert_at, node)
+            route_of[node] = target
+            for r in (source, target):
+                routes[r] = self.sequence(routes[r])
+                loads[r] = self.workload(routes[r])
+            moves += 1
+
+        final_peak = max(load / shift for load, shift in zip(loads, self.shifts))
+        return routes, {
+            'initial_peak_utilization_pct': round(initial_peak * 100, 1),
+            'peak_utilization_pct': round(final_peak * 100, 1),
+            'moves': moves
+        }
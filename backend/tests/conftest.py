@@ -0,0 +1,150 @@
+import hashlib
+import os
+import pytest
+
+# No rate limit and no network geocoder in tests
+os.environ.setdefault('GEOCODER_RATE_LIMIT', '0')
+os.environ.setdefault('GEOCODER_DOMAIN', '127.0.0.1:9')
+os.environ.setdefault('GEOCODER_SCHEME', 'http')
+
+
+class FakeLocation:
+    def __init__(self, latitude, longitude):
+        self.latitude = latitude
+        self.longitude = longitude
+
+
+class FakeGeocoder:
+    """Deterministic stand-in for a geopy geocoder; addresses containing 'Nowhere' do not resolve."""
+
+    def __init__(self):
+        self.calls = []
+
+    def geocode(self, address, timeout=None):
+        self.calls.append(address)
+        if 'Nowhere' in address:
+            return None
+        digest = int(hashlib.md5(address.encode()).hexdigest(), 16)
+        return FakeLocation(49.0 + (digest % 3000) / 10000, -123.0 + (digest // 3000 % 5000) / 10000)
+
+
+@pytest.fixture
+def app(monkeypatch, tmp_path):
+    from flask import Flask
+    from flask_jwt_extended import JWTManager
+    from src.models.database import db
+    from src.routes.customers import customers_bp
+    from src.routes.deliveries import deliveries_bp
+    from src.routes.orders import orders_bp
+
+    monkeypatch.setenv('ROUTE_MATRIX_CACHE_DIR', str(tmp_path / 'matrices'))
+    app = Flask(__name__)
+    app.config.update(SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / 'test.db'}",
+                      JWT_SECRET_KEY='test-secret-key-that-is-long-enough', TESTING=True)
+    db.init_app(app)
+    JWTManager(app)
+    app.register_blueprint(customers_bp, url_prefix='/api/customers')
+    app.register_blueprint(deliveries_bp, url_prefix='/api/deliveries')
+    app.register_blueprint(orders_bp, url_prefix='/api/orders')
+    with app.app_context():
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def auth_headers(app):
+    from flask_jwt_extended import create_access_token
+    return {'Authorization': f"Bearer {create_access_token(identity='1')}"}
+
+
+@pytest.fixture
+def fake_geocoder(monkeypatch):
+    from src.routes import customers, deliveries
+    geocoder = FakeGeocoder()
+    monkeypatch.setattr(customers.geocode_store, 'geocoder', geocoder)
+    monkeypatch.setattr(deliveries.geocode_store, 'geocoder', geocoder)
+    return geocoder
+
+
+@pytest.fixture
+def make_customer(app):
+    """Create a customer with an active subscription; returns the customer."""
+    from datetime import date
+    from src.models.database import db, Customer, Plan, Subscription
+
+    counter = {'n': 0}
+
+    def create(postal_code='V3S 1A1', latitude=None, longitude=None, address_line1=None, city='Surrey',
+               start_date=date(2026, 1, 1)):
+        plan = Plan.query.first()
+        if plan is None:
+            plan = Plan(name='Silver', price=240, duration_days=30, meals_per_week=6, rotis_count=5,
+                        sabji_size_oz=8, dal_kadhi_size_oz=8)
+            db.session.add(plan)
+            db.session.flush()
+        counter['n'] += 1
+        n = counter['n']
+        customer = Customer(first_name=f'Customer{n}', last_name='Test', phone_number=f'604-555-{n:04d}',
+                            address_line1=address_line1 or f'{n} Main St', city=city, province='BC',
+                            postal_code=postal_code, latitude=latitude, longitude=longitude)
+        db.session.add(customer)
+        db.session.flush()
+        db.session.add(Subscription(customer_id=customer.id, plan_id=plan.id, start_date=start_date))
+        db.session.commit()
+        return customer
+
+    return create
+
+
+@pytest.fixture
+def schedule_delivery(app):
+    """Create the order and scheduled delivery of a customer on a day."""
+    from src.models.database import db, Delivery, Order
+    from src.utils.geocoding import format_customer_address
+
+    def create(customer, delivery_date):
+        subscription = customer.subscriptions[0]
+        order = Order(subscription_id=subscription.id, customer_id=customer.id, order_date=delivery_date,
+                      meal_type='lunch')
+        db.session.add(order)
+        db.session.flush()
+        delivery = Delivery(order_id=order.id, delivery_date=delivery_date,
+                            delivery_address=format_customer_address(customer), delivery_status='scheduled')
+        db.session.add(delivery)
+        db.session.commit()
+        return delivery
+
+    return create
+
+
+@pytest.fixture
+def one_way_grid(tmp_path):
+    """
+    Path of a directed node-link JSON road graph: a 12 x 12 grid around
+    Langley (~550 m blocks) whose streets alternate direction, so road
+    distances differ by direction.
+    """
+    import json
+    size, step = 12, 0.005
+    nodes = [{'id': f'{r}-{c}', 'y': 49.08 + r * step, 'x': -122.70 + c * step * 1.5}
+             for r in range(size) for c in range(size)]
+    links = []
+    for r in range(size):
+        for c in range(size - 1):
+            a, b = (f'{r}-{c}', f'{r}-{c + 1}') if r % 2 == 0 else (f'{r}-{c + 1}', f'{r}-{c}')
+            links.append({'source': a, 'target': b, 'length': 548.0, 'highway': 'residential'})
+    for c in range(size):
+        for r in range(size - 1):
+            a, b = (f'{r}-{c}', f'{r + 1}-{c}') if c % 2 == 0 else (f'{r + 1}-{c}', f'{r}-{c}')
+            links.append({'source': a, 'target': b, 'length': 556.0, 'highway': 'residential'})
+    path = tmp_path / 'one_way_grid.json'
+    path.write_text(json.dumps({'directed': True, 'multigraph': False, 'graph': {}, 'nodes': nodes,
+                                'links': links}))
+    return str(path)
@@ -0,0 +1,85 @@
+import csv
+import json
+import os
+import random
+import subprocess
+import sys
+import pytest
+from src.utils.batch_planner import main
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIELDS = ('id', 'delivery_date', 'latitude', 'longitude', 'delivery_address', 'customer_name', 'tiffin_count')
+
+
+@pytest.fixture
+def deliveries_csv(tmp_path, monkeypatch):
+    """Twelve deliveries on each of 2026-10-19 and 2026-10-20, and one on 2026-10-21."""
+    monkeypatch.setenv('ROUTE_MATRIX_CACHE_DIR', str(tmp_path / 'matrices'))
+    rnd = random.Random(3)
+    days = ['2026-10-19'] * 12 + ['2026-10-20'] * 12 + ['2026-10-21']
+    path = tmp_path / 'deliveries.csv'
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(FIELDS)
+        for number, day in enumerate(days, 1):
+            writer.writerow([number, day, round(49.05 + rnd.random() * 0.2, 6), round(-122.9 + rnd.random() * 0.3, 6),
+                             f'{number} Main St', f'Customer {number}', rnd.choice(['', 1, 2])])
+    return str(path)
+
+
+def test_plan_writes_json_for_each_day_in_range(tmp_path, deliveries_csv):
+    output = tmp_path / 'week.json'
+    status = main(['plan', '--from', '2026-10-19', '--to', '2026-10-20', '--input', deliveries_csv,
+                   '--vehicle-count', '2', '--workers', '1', '--output', str(output)])
+
+    assert status == 0
+    result = json.loads(output.read_text())
+    assert [day['delivery_date'] for day in result['days']] == ['2026-10-19', '2026-10-20']
+    assert result['total_deliveries'] == 24
+    assert result['parameters']['vehicle_count'] == 2
+    for day in result['days']:
+        assert day['total_routes'] == 2
+        stops = [stop['delivery_id'] for route in day['routes'] for stop in route['optimized_route']]
+        assert len(stops) == len(set(stops)) == 12
+        assert {route['route_id'] for route in day['routes']} == {f"{day['delivery_date']}-R1",
+                                                                   f"{day['delivery_date']}-R2"}
+
+
+def test_plan_writes_one_csv_row_per_stop(tmp_path, deliveries_csv):
+    output = tmp_path / 'day.csv'
+    status = main(['plan', '--from', '2026-10-21', '--input', deliveries_csv, '--workers', '1',
+                   '--output', str(output)])
+
+    assert status == 0
+    with open(output, newline='', encoding='utf-8') as f:
+        rows = list(csv.DictReader(f))
+    assert len(rows) == 1
+    assert rows[0]['route_id'] == '2026-10-21-R1' and rows[0]['delivery_id'] == '25'
+    assert rows[0]['customer_name'] == 'Customer 25' and rows[0]['sequence'] == '1'
+
+
+def test_plan_rejects_bad_ranges_and_missing_sources(deliveries_csv, monkeypatch, capsys):
+    monkeypatch.delenv('DATABASE_URL', raising=False)
+
+    assert main(['plan', '--from', '2026-10-20', '--to', '2026-10-19', '--input', deliveries_csv]) == 2
+    assert main(['plan', '--from', '2026-10-20']) == 2
+    assert 'DATABASE_URL' in capsys.readouterr().err
+
+
+def test_module_runs_days_in_parallel_processes(tmp_path, deliveries_csv):
+    output = tmp_path / 'week.csv'
+    completed = subprocess.run(
+        [sys.executable, '-m', 'src.utils.batch_planner', 'plan', '--from', '2026-10-19', '--to', '2026-10-21',
+         '--input', deliveries_csv, '--workers', '2', '--vehicle-capacity', '8', '--output', str(output)],
+        cwd=BACKEND, env=dict(os.environ), capture_output=True, text=True, timeout=120
+    )
+
+    assert completed.returncode == 0, completed.stderr
+    assert 'Planned 3 days' in completed.stderr
+    with open(output, newline='', encoding='utf-8') as f:
+        rows = list(csv.DictReader(f))
+    assert sorted(int(row['delivery_id']) for row in rows) == list(range(1, 26))
+    loads = {}
+    for row in rows:
+        loads[row['route_id']] = loads.get(row['route_id'], 0) + 1
+    assert all(count <= 8 for count in loads.values())
@@ -0,0 +1,67 @@
+import random
+import numpy as np
+from src.utils.clustering import capacitated_kmeans, polar_sweep
+
+DEPOT = (49.1042, -122.6604)
+
+
+def random_points(count, seed=0):
+    rnd = random.Random(seed)
+    return [(49.05 + rnd.random() * 0.25, -123.0 + rnd.random() * 0.5) for _ in range(count)]
+
+
+def loads(labels, demands):
+    return np.bincount(labels, weights=demands)
+
+
+def test_kmeans_splits_unit_demands_evenly():
+    labels = capacitated_kmeans(random_points(40), capacity=5)
+
+    assert sorted(loads(labels, np.ones(40)).tolist()) == [5.0] * 8
+
+
+def test_kmeans_separates_distant_groups():
+    west = [(49.10 + i * 0.001, -123.10) for i in range(5)]
+    east = [(49.10 + i * 0.001, -122.50) for i in range(5)]
+    labels = capacitated_kmeans(west + east, k=2)
+
+    assert len(set(labels[:5].tolist())) == 1 and len(set(labels[5:].tolist())) == 1
+    assert labels[0] != labels[5]
+
+
+def test_kmeans_never_exceeds_capacity_with_uneven_demands():
+    for seed in range(20):
+        rnd = random.Random(seed)
+        points = random_points(60, seed)
+        demands = [rnd.randint(1, 4) for _ in points]
+        labels = capacitated_kmeans(points, demands, capacity=7)
+
+        assert len(labels) == 60
+        assert loads(labels, demands).max() <= 7
+
+
+def test_sweep_cuts_contiguous_sectors():
+    # Eight points evenly around the depot
+    points = [(DEPOT[0] + 0.01 * np.sin(angle), DEPOT[1] + 0.015 * np.cos(angle))
+              for angle in np.linspace(0, 2 * np.pi, 8, endpoint=False)]
+    labels = polar_sweep(points, DEPOT, k=4)
+
+    assert sorted(loads(labels, np.ones(8)).tolist()) == [2.0] * 4
+    # Neighbouring points share a sector with one side or the other
+    for index in range(8):
+        assert labels[index] in (labels[index - 1], labels[(index + 1) % 8])
+
+
+def test_sweep_never_exceeds_capacity():
+    # Four points of demand 2 cannot share sectors of capacity 3
+    points = [(DEPOT[0] + 0.01, DEPOT[1] + 0.01 * offset) for offset in range(4)]
+    labels = polar_sweep(points, DEPOT, demands=[2, 2, 2, 2], capacity=3)
+    assert loads(labels, [2, 2, 2, 2]).max() <= 3
+
+    for seed in range(20):
+        rnd = random.Random(seed)
+        points = random_points(60, seed)
+        demands = [rnd.randint(1, 4) for _ in points]
+        labels = polar_sweep(points, DEPOT, demands, capacity=7)
+
+        assert loads(labels, demands).max() <= 7
@@ -0,0 +1,49 @@
+CUSTOMER = {
+    'first_name': 'Asha', 'last_name': 'Patel', 'phone_number': '604-555-0101',
+    'address_line1': '123 Main St', 'city': 'Surrey', 'province': 'BC', 'postal_code': 'V3S 1A1'
+}
+
+
+def test_create_customer_geocodes_address(client, auth_headers, fake_geocoder):
+    response = client.post('/api/customers', headers=auth_headers, json=CUSTOMER)
+
+    assert response.status_code == 201
+    body = response.get_json()
+    assert body['data']['latitude'] is not None
+    assert 'warning' not in body
+
+
+def test_failed_geocode_on_address_change_clears_old_coordinates(client, auth_headers, fake_geocoder):
+    customer = client.post('/api/customers', headers=auth_headers, json=CUSTOMER).get_json()['data']
+
+    response = client.put(f"/api/customers/{customer['id']}", headers=auth_headers,
+                          json={'address_line1': '1 Nowhere Rd'})
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['data']['latitude'] is None and body['data']['longitude'] is None
+    assert 'warning' in body
+
+
+def test_geocode_job_resolves_customers_in_background(client, auth_headers, fake_geocoder, make_customer):
+    import time
+    resolvable = make_customer()
+    unresolvable = make_customer(address_line1='7 Nowhere Rd')
+    make_customer(latitude=49.1, longitude=-122.6)
+
+    response = client.post('/api/customers/geocode', headers=auth_headers, json={})
+    assert response.status_code == 202
+    job_id = response.get_json()['data']['id']
+
+    deadline = time.monotonic() + 10
+    while True:
+        job = client.get(f'/api/customers/geocode/jobs/{job_id}', headers=auth_headers).get_json()['data']
+        if job['status'] in ('completed', 'failed') or time.monotonic() > deadline:
+            break
+        time.sleep(0.05)
+
+    assert job['status'] == 'completed'
+    assert job['result'] == {'total': 2, 'geocoded': 1, 'unresolved_ids': [unresolvable.id]}
+    assert job['progress']['customers_done'] == 2
+    detail = client.get(f'/api/customers/{resolvable.id}', headers=auth_headers).get_json()['data']
+    assert detail['latitude'] is not None
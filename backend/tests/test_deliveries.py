@@ -0,0 +1,29 @@
+from datetime import date
+from src.models.database import db, Delivery, User
+
+DAY = date(2026, 10, 20)
+
+
+def test_bulk_assign_sets_driver(client, auth_headers, make_customer, schedule_delivery):
+    driver = User(username='driver', email='driver@example.com', password_hash='x', first_name='D',
+                  last_name='River', role='delivery')
+    db.session.add(driver)
+    db.session.commit()
+    delivery = schedule_delivery(make_customer(), DAY)
+
+    response = client.post('/api/deliveries/bulk-assign', headers=auth_headers,
+                           json={'delivery_ids': [delivery.id], 'driver_id': driver.id})
+
+    assert response.status_code == 200
+    assert response.get_json()['data']['updated_count'] == 1
+    assert db.session.get(Delivery, delivery.id).assigned_delivery_person_id == driver.id
+
+
+def test_bulk_assign_rejects_vehicle_id(client, auth_headers, make_customer, schedule_delivery):
+    delivery = schedule_delivery(make_customer(), DAY)
+
+    response = client.post('/api/deliveries/bulk-assign', headers=auth_headers,
+                           json={'delivery_ids': [delivery.id], 'vehicle_id': 3})
+
+    assert response.status_code == 400
+    assert 'vehicle' in response.get_json()['message']
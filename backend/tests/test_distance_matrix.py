@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+from src.utils.route_optimizer import RouteOptimizer, ellipsoidal_matrix, haversine_matrix
+
+# Metro Vancouver stops, up to ~80 km apart
+COORDINATES = [(49.1042, -122.6604), (49.2827, -123.1207), (49.1913, -122.8490), (49.0504, -122.3045),
+               (49.1666, -123.1336), (49.2838, -122.7932), (49.0847, -123.0586)]
+
+# Spherical vs ellipsoidal Earth: haversine is within 0.5% of geodesic at this latitude;
+# Lambert's formula is within 10 m (plus float32 rounding)
+HAVERSINE_RELATIVE_TOLERANCE = 0.005
+ELLIPSOIDAL_ABSOLUTE_TOLERANCE_KM = 0.01
+
+
+@pytest.fixture(scope='module')
+def geodesic():
+    return RouteOptimizer(distance_mode='geodesic', workers=1).create_distance_matrix(COORDINATES)
+
+
+def test_haversine_matrix_is_close_to_geodesic(geodesic):
+    matrix = haversine_matrix(COORDINATES)
+
+    assert matrix.dtype == np.float32
+    assert np.all(np.diag(matrix) == 0)
+    assert np.allclose(matrix, matrix.T)
+    assert np.allclose(matrix, geodesic, rtol=HAVERSINE_RELATIVE_TOLERANCE, atol=1e-3)
+
+
+def test_ellipsoidal_matrix_matches_geodesic(geodesic):
+    matrix = ellipsoidal_matrix(COORDINATES)
+
+    assert matrix.dtype == np.float32
+    assert np.all(np.diag(matrix) == 0)
+    assert np.abs(matrix - geodesic).max() <= ELLIPSOIDAL_ABSOLUTE_TOLERANCE_KM
+
+
+@pytest.mark.parametrize('mode', ['haversine', 'ellipsoidal', 'geodesic'])
+def test_create_distance_matrix_returns_float32_with_zero_diagonal(mode):
+    matrix = RouteOptimizer(distance_mode=mode, workers=1).create_distance_matrix(COORDINATES)
+
+    assert matrix.dtype == np.float32 and matrix.shape == (7, 7)
+    assert np.all(np.diag(matrix) == 0)
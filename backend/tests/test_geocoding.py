@@ -0,0 +1,92 @@
+import threading
+import time
+from datetime import date, datetime, timedelta
+from src.models.database import db, GeocodeCache, GeocodeMiss
+from src.utils.geocoding import GeocodeStore, RateLimiter, normalize_address
+from conftest import FakeGeocoder
+
+
+def test_normalize_address_ignores_case_and_punctuation():
+    assert normalize_address('12 Main St., Surrey') == normalize_address('12  main st surrey')
+
+
+def test_resolve_many_dedupes_and_caches(app):
+    geocoder = FakeGeocoder()
+    store = GeocodeStore(geocoder, requests_per_second=0)
+    addresses = ['1 Main St, Surrey', '1 main st surrey', '2 Main St, Surrey']
+
+    first = store.resolve_many(addresses)
+    db.session.commit()
+
+    assert len(geocoder.calls) == 2
+    assert first['1 Main St, Surrey'] == first['1 main st surrey'] is not None
+    assert GeocodeCache.query.count() == 2
+
+    second = store.resolve_many(addresses)
+    assert second == first
+    assert len(geocoder.calls) == 2
+
+
+def test_failed_lookups_are_negatively_cached_until_ttl(app):
+    geocoder = FakeGeocoder()
+    store = GeocodeStore(geocoder, requests_per_second=0, miss_ttl_hours=1)
+
+    assert store.resolve_many(['1 Nowhere Rd']) == {'1 Nowhere Rd': None}
+    db.session.commit()
+    assert store.resolve('1 Nowhere Rd') is None
+    assert store.resolve_many(['1 Nowhere Rd']) == {'1 Nowhere Rd': None}
+    assert len(geocoder.calls) == 1
+
+    miss = GeocodeMiss.query.one()
+    miss.last_attempt_at = datetime.utcnow() - timedelta(hours=2)
+    db.session.commit()
+    store.resolve_many(['1 Nowhere Rd'])
+    assert len(geocoder.calls) == 2
+    assert GeocodeMiss.query.one().attempts == 2
+
+
+def test_network_errors_are_not_negatively_cached(app):
+    class Failing:
+        def geocode(self, address, timeout=None):
+            raise OSError('connection refused')
+
+    store = GeocodeStore(Failing(), requests_per_second=0)
+    assert store.resolve_many(['3 Main St']) == {'3 Main St': None}
+    assert GeocodeMiss.query.count() == 0
+
+
+def test_rate_limiter_spaces_calls_across_threads():
+    limiter = RateLimiter(50)
+    stamps = []
+    lock = threading.Lock()
+
+    def call():
+        limiter.wait()
+        with lock:
+            stamps.append(time.monotonic())
+
+    threads = [threading.Thread(target=call) for _ in range(10)]
+    started = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # Ten calls at 50/s need at least nine 20 ms intervals
+    assert max(stamps) - started >= 9 * 0.02 - 0.005
+
+
+def test_planning_uses_postal_table_before_network(client, auth_headers, fake_geocoder, make_customer,
+                                                  schedule_delivery):
+    day = date(2026, 10, 20)
+    schedule_delivery(make_customer(postal_code='V1M 2A1'), day)
+    schedule_delivery(make_customer(postal_code='X0X 0X0', address_line1='9 Nowhere Rd', city='Hope'), day)
+
+    for _ in range(2):
+        response = client.post('/api/deliveries/optimize-route', headers=auth_headers,
+                               json={'delivery_date': day.isoformat()})
+        assert response.status_code == 200
+
+    # Only the address outside the postal table went to the network, once
+    assert len(fake_geocoder.calls) == 1
+    assert 'Nowhere' in fake_geocoder.calls[0]
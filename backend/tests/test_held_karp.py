@@ -0,0 +1,31 @@
+import itertools
+import random
+import numpy as np
+import pytest
+from src.utils.held_karp import HELD_KARP_MAX_STOPS, held_karp_path
+
+
+def brute_force_length(matrix):
+    n = len(matrix)
+    return min(sum(matrix[a][b] for a, b in zip((0,) + order, order))
+               for order in itertools.permutations(range(1, n)))
+
+
+@pytest.mark.parametrize('size', [2, 3, 5, 8])
+@pytest.mark.parametrize('symmetric', [True, False])
+def test_held_karp_matches_brute_force(size, symmetric):
+    rnd = random.Random(size * 2 + symmetric)
+    matrix = np.array([[0.0 if a == b else rnd.uniform(1, 50) for b in range(size)] for a in range(size)])
+    if symmetric:
+        matrix = np.triu(matrix) + np.triu(matrix).T
+
+    route, length = held_karp_path(matrix)
+
+    assert route[0] == 0 and sorted(route) == list(range(size))
+    assert length == pytest.approx(sum(matrix[a][b] for a, b in zip(route, route[1:])))
+    assert length == pytest.approx(brute_force_length(matrix))
+
+
+def test_held_karp_refuses_large_routes():
+    with pytest.raises(ValueError):
+        held_karp_path(np.zeros((HELD_KARP_MAX_STOPS + 2, HELD_KARP_MAX_STOPS + 2)))
@@ -0,0 +1,71 @@
+import random
+import numpy as np
+import pytest
+from src.utils.local_search import LocalSearch
+
+
+def euclidean_matrix(count, seed):
+    rnd = random.Random(seed)
+    points = np.array([(rnd.random() * 100, rnd.random() * 100) for _ in range(count)])
+    return np.sqrt(((points[:, None, :] - points[None, :, :]) ** 2).sum(axis=2))
+
+
+def assert_valid_route(route, size):
+    assert route[0] == 0
+    assert sorted(route) == list(range(size))
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_improve_returns_a_shorter_valid_route(seed):
+    matrix = euclidean_matrix(40, seed)
+    search = LocalSearch(matrix)
+    initial = [0] + random.Random(seed).sample(range(1, 40), 39)
+
+    route = search.improve(initial)
+
+    assert_valid_route(route, 40)
+    assert search.route_length(route) < search.route_length(initial)
+
+
+def test_improve_reaches_a_two_opt_local_optimum():
+    matrix = euclidean_matrix(25, 7)
+    search = LocalSearch(matrix, neighbor_count=24)
+    route = search.improve(list(range(25)))
+    length = search.route_length(route)
+
+    for i in range(1, 25):
+        for j in range(i + 1, 25):
+            candidate = route[:i] + route[i:j + 1][::-1] + route[j + 1:]
+            assert search.route_length(candidate) >= length - 1e-9
+
+
+def test_anytime_never_returns_worse_than_its_start():
+    matrix = euclidean_matrix(60, 3)
+    search = LocalSearch(matrix)
+    initial = list(range(60))
+
+    route, stats = search.anytime(initial, time_budget_ms=50, seed=0)
+
+    assert_valid_route(route, 60)
+    assert search.route_length(route) <= search.route_length(search.improve(initial)) + 1e-9
+
+
+def test_asymmetric_matrix_search_terminates_without_lengthening_the_route():
+    import time
+    rnd = np.random.default_rng(4)
+    matrix = rnd.uniform(1, 100, size=(120, 120))
+    np.fill_diagonal(matrix, 0)
+    search = LocalSearch(matrix)
+    initial = list(range(120))
+
+    started = time.perf_counter()
+    two_opt_route, _ = search.two_opt(initial)
+    route = search.improve(initial)
+    anytime_route, _ = search.anytime(initial, time_budget_ms=100, seed=0)
+    assert time.perf_counter() - started < 5
+
+    for candidate in (two_opt_route, route, anytime_route):
+        assert_valid_route(candidate, 120)
+        assert search.route_length(candidate) <= search.route_length(initial) + 1e-9
+    assert search.route_length(route) == pytest.approx(
+        sum(matrix[a][b] for a, b in zip(route, route[1:])))
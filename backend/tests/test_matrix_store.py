@@ -0,0 +1,39 @@
+import os
+import numpy as np
+from src.utils.matrix_store import DistanceMatrixStore
+from src.utils.parallel import SharedMatrix
+
+
+def euclidean_block(new_coordinates, all_coordinates):
+    new = np.asarray(new_coordinates)
+    every = np.asarray(all_coordinates)
+    rows = np.hypot(*(new[:, None, :] - every[None, :, :]).transpose(2, 0, 1))
+    return rows, rows.T
+
+
+def coordinates(count, offset=0):
+    return [(49.0 + (offset + i) * 0.001, -123.0) for i in range(count)]
+
+
+def test_superseded_file_is_kept_while_a_worker_handle_names_it(tmp_path):
+    store = DistanceMatrixStore(str(tmp_path), initial_capacity=4)
+    first = store.matrix('2026-10-17', 'haversine', coordinates(3), euclidean_block)
+
+    with SharedMatrix(first) as shared:
+        kind, path, shape, dtype = shared.handle
+        assert kind == 'file'
+        store.matrix('2026-10-17', 'haversine', coordinates(10), euclidean_block)
+
+        reopened = np.memmap(path, dtype=np.dtype(dtype), mode='r', shape=shape)
+        assert np.allclose(reopened[:3, :3], first)
+
+    store.matrix('2026-10-17', 'haversine', coordinates(20), euclidean_block)
+    assert not os.path.exists(path)
+
+
+def test_superseded_file_without_handles_is_removed(tmp_path):
+    store = DistanceMatrixStore(str(tmp_path), initial_capacity=4)
+    store.matrix('2026-10-17', 'haversine', coordinates(3), euclidean_block)
+    store.matrix('2026-10-17', 'haversine', coordinates(10), euclidean_block)
+
+    assert len([name for name in os.listdir(tmp_path) if name.endswith('.f32')]) == 1
@@ -0,0 +1,74 @@
+import re
+import pytest
+from datetime import date
+from sqlalchemy import text
+from sqlalchemy.schema import CreateTable
+from src.models.database import db, Delivery, Order
+from src.utils.order_generation import add_order_unique_index, generate_orders, has_order_unique_index
+
+DAY = date(2026, 10, 20)
+
+
+def recreate_orders_without_unique_constraint():
+    """Rebuild the orders table as databases created before the constraint have it."""
+    ddl = str(CreateTable(Order.__table__).compile(db.engine))
+    ddl = re.sub(r',\s*CONSTRAINT uq_order_subscription_date_meal UNIQUE \([^)]*\)', '', ddl)
+    db.session.execute(text('DROP TABLE orders'))
+    db.session.execute(text(ddl))
+    db.session.commit()
+
+
+def test_generate_orders_refuses_without_unique_index(app, make_customer):
+    recreate_orders_without_unique_constraint()
+    make_customer()
+
+    with pytest.raises(RuntimeError, match='add_order_unique_index'):
+        generate_orders(DAY)
+    assert Order.query.count() == 0
+
+
+def test_add_order_unique_index_reports_before_deleting(app, make_customer, schedule_delivery):
+    recreate_orders_without_unique_constraint()
+    customer = make_customer()
+    kept = schedule_delivery(customer, DAY)
+    duplicate = schedule_delivery(customer, DAY)
+
+    report = add_order_unique_index()
+    assert [(entry['order_id'], entry['kept_order_id'], entry['delivery_ids']) for entry in report] == \
+        [(duplicate.order_id, kept.order_id, [duplicate.id])]
+    assert not has_order_unique_index()
+    assert Order.query.count() == 2 and Delivery.query.count() == 2
+
+    assert len(add_order_unique_index(apply=True)) == 1
+    assert has_order_unique_index()
+    assert [order.id for order in Order.query.all()] == [kept.order_id]
+    assert Delivery.query.count() == 1
+    assert add_order_unique_index(apply=True) == []
+
+    created, skipped = generate_orders(DAY)
+    assert created == [] and len(skipped) == 1
+    assert Order.query.count() == 1
+
+
+def test_generate_orders_is_idempotent(app, make_customer):
+    customers = [make_customer() for _ in range(3)]
+    end = date(2026, 10, 22)
+
+    created, skipped = generate_orders(DAY, end)
+    assert len(created) == 9 and skipped == []
+
+    created_again, skipped_again = generate_orders(DAY, end)
+    assert created_again == []
+    assert len(skipped_again) == 9
+    assert Order.query.count() == 9 and Delivery.query.count() == 9
+    assert {order.customer_id for order in Order.query} == {customer.id for customer in customers}
+
+
+def test_generate_orders_fills_in_only_missing_days(app, make_customer):
+    make_customer()
+    generate_orders(DAY)
+
+    created, skipped = generate_orders(DAY, date(2026, 10, 21))
+
+    assert [order['order_date'] for order in created] == ['2026-10-21']
+    assert [entry['order_date'] for entry in skipped] == ['2026-10-20']
@@ -0,0 +1,118 @@
+import json
+import numpy as np
+import pytest
+from src.utils.road_network import RoadNetwork, time_band
+from src.utils.route_optimizer import RouteOptimizer, haversine_matrix
+
+# Two streets 10 km apart with no road between them
+ISLANDS = [(49.10, -122.70), (49.10, -122.69), (49.19, -122.70), (49.19, -122.69)]
+
+
+def write_graph(tmp_path, nodes, links, directed=False):
+    path = tmp_path / 'graph.json'
+    path.write_text(json.dumps({
+        'directed': directed, 'multigraph': False, 'graph': {},
+        'nodes': [{'id': str(k), 'y': lat, 'x': lon} for k, (lat, lon) in enumerate(nodes)],
+        'links': [dict(source=str(a), target=str(b), **data) for a, b, data in links]
+    }))
+    return str(path)
+
+
+@pytest.fixture
+def islands(tmp_path):
+    return write_graph(tmp_path, ISLANDS, [
+        (0, 1, {'length': 800.0, 'travel_time': 60.0}),
+        (2, 3, {'length': 800.0, 'travel_time': 60.0, 'travel_time_am_peak': 150.0}),
+    ])
+
+
+def grid_node(row, column):
+    return (49.08 + row * 0.005, -122.70 + column * 0.0075)
+
+
+def test_matrices_follow_one_way_streets(one_way_grid):
+    # Row 2 runs east and column 2 north, so going back means going round the block
+    minutes, km = RoadNetwork(one_way_grid).matrices([grid_node(2, 2), grid_node(2, 3), grid_node(3, 2)])
+
+    assert km[0, 1] == pytest.approx(0.548) and km[0, 2] == pytest.approx(0.556)
+    assert km[1, 0] == pytest.approx(0.556 + 0.548 + 0.556)
+    assert km[2, 0] > km[0, 2]
+    assert minutes[1, 0] > minutes[0, 1]
+    assert np.all(np.diag(km) == 0)
+
+
+def test_time_bands_scale_travel_times_but_not_distances(one_way_grid):
+    network = RoadNetwork(one_way_grid)
+    coordinates = [grid_node(2, 2), grid_node(5, 7), grid_node(9, 3)]
+    peak_minutes, peak_km = network.matrices(coordinates, departure_minutes=8 * 60)
+    midday_minutes, midday_km = network.matrices(coordinates, departure_minutes=12 * 60)
+
+    np.testing.assert_allclose(peak_minutes, midday_minutes * 1.35 / 1.1, rtol=1e-5)
+    np.testing.assert_array_equal(peak_km, midday_km)
+    assert not np.isnan(peak_minutes).any()
+
+
+def test_band_specific_edge_times_override_the_factor(islands):
+    network = RoadNetwork(islands)
+    midday, _ = network.matrices(ISLANDS, departure_minutes=12 * 60)
+    peak, _ = network.matrices(ISLANDS, departure_minutes=8 * 60)
+
+    assert midday[0, 1] == pytest.approx(1.1) and peak[0, 1] == pytest.approx(1.35)
+    assert midday[2, 3] == pytest.approx(1.1) and peak[2, 3] == pytest.approx(2.5)
+
+
+def test_unreachable_pairs_are_nan(islands):
+    minutes, km = RoadNetwork(islands).matrices(ISLANDS)
+
+    assert km[0, 1] == pytest.approx(0.8)
+    assert np.isnan(km[0, 2]) and np.isnan(minutes[3, 1])
+
+
+def test_road_mode_falls_back_to_haversine_for_unreachable_pairs(islands):
+    optimizer = RouteOptimizer(distance_mode='road', workers=1, road_network=RoadNetwork(islands))
+    matrix = optimizer.create_distance_matrix(ISLANDS)
+    straight = haversine_matrix(ISLANDS)
+
+    assert matrix[0, 1] == pytest.approx(0.8)
+    assert matrix[0, 2] == pytest.approx(straight[0, 2]) and matrix[3, 1] == pytest.approx(straight[3, 1])
+    minutes = optimizer.travel_time_matrix(ISLANDS, matrix)
+    assert not np.isnan(minutes).any()
+    assert minutes[0, 1] == pytest.approx(1.1)
+
+
+def test_time_band_boundaries():
+    assert time_band(None) == 'midday'
+    assert time_band(5 * 60 + 59) == 'night'
+    assert time_band(6 * 60) == 'am_peak'
+    assert time_band(17 * 60) == 'pm_peak'
+    assert time_band(24 * 60 + 30) == 'night'
+
+
+def test_blocks_match_the_full_matrix(one_way_grid):
+    network = RoadNetwork(one_way_grid)
+    coordinates = [grid_node(row, column) for row, column in [(2, 2), (2, 3), (3, 2), (7, 9), (10, 1), (5, 5)]]
+    minutes, km = network.matrices(coordinates, departure_minutes=8 * 60)
+
+    (row_minutes, row_km), (column_minutes, column_km) = network.blocks(coordinates[4:], coordinates, 8 * 60)
+    np.testing.assert_allclose(row_minutes, minutes[4:], rtol=1e-6)
+    np.testing.assert_allclose(row_km, km[4:], rtol=1e-6)
+    np.testing.assert_allclose(column_minutes, minutes[:, 4:], rtol=1e-6)
+    np.testing.assert_allclose(column_km, km[:, 4:], rtol=1e-6)
+
+
+def test_growing_a_stored_road_matrix_searches_from_new_stops_only(tmp_path, one_way_grid, monkeypatch):
+    from src.utils.matrix_store import DistanceMatrixStore
+    optimizer = RouteOptimizer(distance_mode='road', workers=1, road_network=RoadNetwork(one_way_grid),
+                               matrix_store=DistanceMatrixStore(str(tmp_path / 'matrices')))
+    coordinates = [grid_node(row, column) for row in range(1, 11, 2) for column in range(1, 11, 3)]
+    optimizer.create_distance_matrix(coordinates[:-2], plan_key='2026-10-20')
+
+    searches = []
+    dijkstra = RoadNetwork._dijkstra
+    monkeypatch.setattr(RoadNetwork, '_dijkstra', staticmethod(
+        lambda *args: searches.append(args[1]) or dijkstra(*args)))
+    grown = optimizer.create_distance_matrix(coordinates, plan_key='2026-10-20')
+
+    assert len(searches) == 4
+    monkeypatch.setattr(RoadNetwork, '_dijkstra', staticmethod(dijkstra))
+    np.testing.assert_allclose(grown, optimizer.create_distance_matrix(coordinates), rtol=1e-6)
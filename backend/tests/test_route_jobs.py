@@ -0,0 +1,103 @@
+import json
+import time
+import uuid
+from datetime import date, datetime, timedelta
+from src.models.database import db, RouteOptimizationJob
+from src.utils.optimization_jobs import fail_stale_jobs
+
+DAY = date(2026, 10, 20)
+
+
+def add_job(status, parameters=None, updated_minutes_ago=0):
+    touched = datetime.utcnow() - timedelta(minutes=updated_minutes_ago)
+    job = RouteOptimizationJob(id=uuid.uuid4().hex, status=status, parameters=parameters or {}, progress={},
+                               created_at=touched, updated_at=touched)
+    db.session.add(job)
+    db.session.commit()
+    # Keep updated_at as given instead of the onupdate default
+    db.session.execute(RouteOptimizationJob.__table__.update()
+                       .where(RouteOptimizationJob.id == job.id).values(updated_at=touched))
+    db.session.commit()
+    return job.id
+
+
+def read_events(response):
+    events = []
+    for block in response.get_data(as_text=True).split('\n\n'):
+        lines = dict(line.split(': ', 1) for line in block.splitlines() if not line.startswith(':'))
+        if 'event' in lines:
+            events.append((lines['event'], json.loads(lines['data'])))
+    return events
+
+
+def test_job_runs_and_its_stream_ends_with_done(client, auth_headers, fake_geocoder, make_customer,
+                                                schedule_delivery):
+    for k in range(3):
+        schedule_delivery(make_customer(latitude=49.1 + k * 0.01, longitude=-122.7), DAY)
+
+    response = client.post('/api/deliveries/optimize-route/jobs', headers=auth_headers,
+                           json={'delivery_date': DAY.isoformat()})
+    assert response.status_code == 202
+    job_id = response.get_json()['data']['id']
+
+    events = read_events(client.get(f'/api/deliveries/optimize-route/jobs/{job_id}/events',
+                                    headers=auth_headers))
+    assert events[-1][0] == 'done'
+    assert events[-1][1]['status'] == 'completed'
+
+    job = client.get(f'/api/deliveries/optimize-route/jobs/{job_id}', headers=auth_headers).get_json()['data']
+    assert job['status'] == 'completed'
+
+
+def test_geocode_jobs_are_not_route_jobs(client, auth_headers):
+    job_id = add_job('completed', {'task': 'geocode_customers'})
+
+    assert client.get(f'/api/deliveries/optimize-route/jobs/{job_id}', headers=auth_headers).status_code == 404
+    assert client.get(f'/api/deliveries/optimize-route/jobs/{job_id}/events',
+                      headers=auth_headers).status_code == 404
+
+
+def test_stream_of_a_job_run_elsewhere_backs_off_and_times_out(client, auth_headers, monkeypatch):
+    from src.routes import deliveries
+    monkeypatch.setattr(deliveries, 'EVENT_STREAM_MAX_SECONDS', 1.0)
+    reads = []
+    original_get = db.session.get
+
+    def counting_get(model, ident, *args, **kwargs):
+        reads.append(ident)
+        return original_get(model, ident, *args, **kwargs)
+
+    job_id = add_job('running', {'task': 'optimize_route'})
+    monkeypatch.setattr(db.session, 'get', counting_get)
+
+    started = time.monotonic()
+    events = read_events(client.get(f'/api/deliveries/optimize-route/jobs/{job_id}/events',
+                                    headers=auth_headers))
+
+    assert time.monotonic() - started >= 1.0
+    assert [name for name, _ in events] == ['progress', 'timeout']
+    assert len(reads) < 10
+
+
+def test_stream_of_an_abandoned_job_ends_failed(client, auth_headers):
+    job_id = add_job('running', {'task': 'optimize_route'}, updated_minutes_ago=120)
+
+    events = read_events(client.get(f'/api/deliveries/optimize-route/jobs/{job_id}/events',
+                                    headers=auth_headers))
+
+    assert events[-1][0] == 'done'
+    assert events[-1][1]['status'] == 'failed'
+
+
+def test_fail_stale_jobs_only_touches_old_unfinished_jobs(app):
+    stale_queued = add_job('queued', updated_minutes_ago=120)
+    stale_running = add_job('running', updated_minutes_ago=120)
+    fresh_running = add_job('running')
+    old_completed = add_job('completed', updated_minutes_ago=120)
+
+    assert fail_stale_jobs() == 2
+    db.session.expire_all()
+    statuses = {job_id: db.session.get(RouteOptimizationJob, job_id).status
+                for job_id in (stale_queued, stale_running, fresh_running, old_completed)}
+    assert statuses == {stale_queued: 'failed', stale_running: 'failed', fresh_running: 'running',
+                        old_completed: 'completed'}
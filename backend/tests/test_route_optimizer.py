@@ -0,0 +1,132 @@
+import random
+import time
+import pytest
+from src.utils.route_optimizer import RouteOptimizer
+
+START = {'latitude': 49.1042, 'longitude': -122.6604, 'address': 'Langley, BC'}
+
+# Wall time allowed beyond an anytime budget, for result building and timer granularity
+BUDGET_SLACK_MS = 60
+
+
+def make_deliveries(count, seed=0):
+    rnd = random.Random(seed)
+    return [{'id': i + 1, 'latitude': 49.05 + rnd.random() * 0.25, 'longitude': -123.0 + rnd.random() * 0.5}
+            for i in range(count)]
+
+
+@pytest.fixture
+def optimizer(tmp_path):
+    from src.utils.matrix_store import DistanceMatrixStore
+    return RouteOptimizer(workers=1, matrix_store=DistanceMatrixStore(str(tmp_path)))
+
+
+@pytest.mark.parametrize('budget_ms', [100, 300])
+def test_single_route_stays_within_time_budget(optimizer, budget_ms):
+    deliveries = make_deliveries(150)
+    started = time.perf_counter()
+    result = optimizer.optimize_delivery_route(deliveries, START, time_budget_ms=budget_ms)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    assert elapsed_ms <= budget_ms + BUDGET_SLACK_MS
+    assert result['total_deliveries'] == 150
+    assert 0 < result['lower_bound_km'] <= result['total_distance_km']
+
+
+def test_multiple_routes_stay_within_time_budget(optimizer):
+    deliveries = make_deliveries(150, seed=1)
+    started = time.perf_counter()
+    routes = optimizer.optimize_multiple_routes(deliveries, START, vehicle_count=3, time_budget_ms=300)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+
+    assert elapsed_ms <= 300 + BUDGET_SLACK_MS
+    assert sum(route['total_deliveries'] for route in routes) == 150
+    for route in routes:
+        assert route['lower_bound_km'] <= route['total_distance_km'] + 1e-6
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_vehicle_count_without_capacity_packs_uneven_tiffin_counts(optimizer, seed):
+    deliveries = make_deliveries(25, seed=seed)
+    rnd = random.Random(seed)
+    for delivery in deliveries:
+        delivery['tiffin_count'] = rnd.choice([1, 2, 3])
+    routes = optimizer.optimize_multiple_routes(deliveries, START, vehicle_count=3)
+
+    assert len(routes) <= 3
+    assert sorted(stop['delivery_id'] for route in routes for stop in route['optimized_route']) == \
+        list(range(1, 26))
+
+
+def test_small_route_is_solved_exactly(optimizer):
+    result = optimizer.optimize_delivery_route(make_deliveries(10), START)
+
+    assert result['algorithm_used'] == RouteOptimizer.EXACT_ALGORITHM
+    assert result['optimality_gap_pct'] == 0.0
+
+
+def test_depot_workers_rebuild_the_optimizer_configuration(tmp_path):
+    from src.utils.matrix_store import DistanceMatrixStore
+    from src.utils.postal_codes import PostalCodeGeocoder
+    centroids = tmp_path / 'centroids.csv'
+    centroids.write_text('postal_code,latitude,longitude\nV9Z,49.2,-122.8\n')
+    optimizer = RouteOptimizer(workers=1, postal_geocoder=PostalCodeGeocoder(str(centroids)),
+                               matrix_store=DistanceMatrixStore(str(tmp_path / 'matrices')))
+
+    rebuilt = RouteOptimizer.from_worker_config(optimizer.worker_config())
+    assert rebuilt.worker_config() == optimizer.worker_config()
+    assert rebuilt.postal_geocoder.lookup('V9Z 1A1') == (49.2, -122.8)
+
+    deliveries = make_deliveries(30, seed=2) + [{'id': 31, 'postal_code': 'V9Z 1A1', 'delivery_address': ''}]
+    depots = [{'id': 1, 'name': 'West', 'latitude': 49.1, 'longitude': -122.9},
+              {'id': 2, 'name': 'East', 'latitude': 49.2, 'longitude': -122.6}]
+    sequential = optimizer.optimize_multi_depot_routes(deliveries, depots, workers=1, plan_key='2026-10-20')
+    parallel = optimizer.optimize_multi_depot_routes(deliveries, depots, workers=2, plan_key='2026-10-20')
+
+    assert [depot['total_distance_km'] for depot in parallel] == \
+        [depot['total_distance_km'] for depot in sequential]
+
+
+def test_cached_route_keeps_exactness_and_lower_bound(optimizer):
+    deliveries = make_deliveries(8)
+    first = optimizer.optimize_delivery_route(deliveries, START)
+    second = optimizer.optimize_delivery_route(deliveries, START)
+
+    assert second['algorithm_used'].startswith('Cached route')
+    assert second['algorithm_used'].endswith(RouteOptimizer.EXACT_ALGORITHM)
+    assert second['lower_bound_km'] == first['lower_bound_km']
+    assert second['optimality_gap_pct'] == 0.0
+
+
+def test_route_cache_separates_distance_modes_and_id_less_stops(tmp_path):
+    from src.utils.matrix_store import DistanceMatrixStore
+    from src.utils.route_cache import RouteCache
+    cache = RouteCache()
+    store = DistanceMatrixStore(str(tmp_path))
+    haversine = RouteOptimizer(workers=1, route_cache=cache, matrix_store=store)
+    geodesic = RouteOptimizer(distance_mode='geodesic', workers=1, route_cache=cache, matrix_store=store)
+    deliveries = make_deliveries(8)
+    haversine.optimize_delivery_route(deliveries, START)
+
+    assert not geodesic.optimize_delivery_route(deliveries, START)['algorithm_used'].startswith('Cached route')
+
+    twins = [{'delivery_address': '1 Main St', 'latitude': 49.1, 'longitude': -122.7} for _ in range(2)]
+    assert len(set(RouteCache.stop_keys(twins, [(49.1, -122.7)] * 2))) == 2
+    assert haversine.optimize_delivery_route(twins, START)['total_deliveries'] == 2
+
+
+def test_road_mode_on_one_way_streets_finishes_without_a_budget(tmp_path, one_way_grid):
+    from src.utils.matrix_store import DistanceMatrixStore
+    from src.utils.road_network import RoadNetwork
+    optimizer = RouteOptimizer(distance_mode='road', workers=1, road_network=RoadNetwork(one_way_grid),
+                               matrix_store=DistanceMatrixStore(str(tmp_path / 'matrices')))
+    rnd = random.Random(5)
+    deliveries = [{'id': i + 1, 'latitude': 49.08 + rnd.random() * 0.055, 'longitude': -122.70 + rnd.random() * 0.08}
+                  for i in range(40)]
+
+    started = time.perf_counter()
+    result = optimizer.optimize_delivery_route(deliveries, START)
+
+    assert time.perf_counter() - started < 15
+    assert result['total_deliveries'] == 40
+    assert result['lower_bound_km'] <= result['total_distance_km']
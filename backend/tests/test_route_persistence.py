@@ -0,0 +1,76 @@
+from datetime import date, time
+from types import SimpleNamespace
+from sqlalchemy.dialects import postgresql
+from src.models.database import db, Delivery
+from src.utils import route_persistence
+from src.utils.route_persistence import (assign_driver, route_assignments, route_identifier,
+                                         save_route_assignments)
+
+DAY = date(2026, 10, 20)
+
+
+def planned_route(delivery_ids, vehicle=1, **extra):
+    return dict({'vehicle': vehicle, 'optimized_route': [
+        {'delivery_id': delivery_id, 'sequence': position, 'estimated_time': f'10:{position:02d}'}
+        for position, delivery_id in enumerate(delivery_ids, 1)
+    ] + [{'delivery_id': None, 'sequence': len(delivery_ids) + 1, 'estimated_time': '11:00'}]}, **extra)
+
+
+def test_route_assignments_flatten_routes():
+    routes = [planned_route([11, 12], vehicle=1), planned_route([13], vehicle=2, driver_id=5, depot_id=3)]
+    rows = route_assignments(routes, DAY)
+
+    assert [row['delivery_id'] for row in rows] == [11, 12, 13]
+    assert rows[1] == {'delivery_id': 12, 'route_sequence': 2, 'estimated_delivery_time': time(10, 2),
+                       'route_id': '2026-10-20-R1'}
+    assert rows[2]['route_id'] == '2026-10-20-D3-R2' == routes[1]['route_id']
+    assert rows[2]['assigned_delivery_person_id'] == 5 and rows[2]['depot_id'] == 3
+    assert route_identifier(DAY) == '2026-10-20-R1'
+
+
+def test_save_route_assignments_updates_every_delivery(app, make_customer, schedule_delivery):
+    deliveries = [schedule_delivery(make_customer(), DAY) for _ in range(3)]
+    ids = [delivery.id for delivery in deliveries]
+    rows = route_assignments([planned_route(ids[:2], vehicle=1, driver_id=4),
+                              planned_route(ids[2:], vehicle=2)], DAY)
+
+    assert save_route_assignments(rows) == 3
+    db.session.commit()
+    db.session.expire_all()
+
+    saved = [db.session.get(Delivery, delivery_id) for delivery_id in ids]
+    assert [(d.route_id, d.route_sequence, d.estimated_delivery_time) for d in saved] == [
+        ('2026-10-20-R1', 1, time(10, 1)), ('2026-10-20-R1', 2, time(10, 2)), ('2026-10-20-R2', 1, time(10, 1))]
+    # Not every row has a driver, so none is written
+    assert all(d.assigned_delivery_person_id is None for d in saved)
+    assert save_route_assignments([]) == 0
+
+
+def test_postgresql_gets_one_update_from_values_per_chunk(app, monkeypatch):
+    statements = []
+    monkeypatch.setattr(db.session, 'get_bind', lambda: SimpleNamespace(dialect=postgresql.dialect()))
+    monkeypatch.setattr(db.session, 'execute', lambda statement, *args: statements.append(statement))
+    monkeypatch.setattr(route_persistence, 'VALUES_CHUNK_SIZE', 2)
+    rows = route_assignments([planned_route([1, 2, 3, 4, 5], driver_id=9)], DAY)
+
+    assert save_route_assignments(rows) == 5
+    assert len(statements) == 3
+    compiled = statements[0].compile(dialect=postgresql.dialect())
+    sql = ' '.join(str(compiled).split())
+    assert sql.startswith('UPDATE deliveries SET')
+    assert 'FROM (VALUES' in sql and 'WHERE deliveries.id = plan.id' in sql
+    assert 'assigned_delivery_person_id=plan.assigned_delivery_person_id' in sql
+    assert 'depot_id' not in sql
+
+
+def test_assign_driver_updates_and_clears_in_one_statement(app, make_customer, schedule_delivery):
+    ids = [schedule_delivery(make_customer(), DAY).id for _ in range(3)]
+
+    assert assign_driver(ids[:2], 6) == 2
+    db.session.commit()
+    assert [db.session.get(Delivery, i).assigned_delivery_person_id for i in ids] == [6, 6, None]
+
+    assert assign_driver(ids, None) == 3 and assign_driver([], 6) == 0
+    db.session.commit()
+    db.session.expire_all()
+    assert all(db.session.get(Delivery, i).assigned_delivery_person_id is None for i in ids)
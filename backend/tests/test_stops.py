@@ -0,0 +1,52 @@
+import numpy as np
+from src.utils.stops import StopTable
+
+DELIVERIES = [
+    {'id': 1, 'customer_name': 'Asha', 'customer_phone': '604-555-0001', 'delivery_address': '1 Main St'},
+    {'id': 2, 'customer_name': 'Ravi', 'delivery_address': '2 Main St', 'service_minutes': 9.5,
+     'minutes_per_km': 3.0},
+    {'id': 3, 'delivery_address': '3 Main St', 'delivery_instructions': 'Side door'},
+]
+COORDINATES = [(49.10, -122.70), (49.11, -122.71), (49.12, -122.72)]
+
+
+def make_table():
+    return StopTable.from_deliveries(DELIVERIES, COORDINATES, default_service_minutes=5.0,
+                                     default_minutes_per_km=2.0)
+
+
+def test_columns_use_fitted_values_else_defaults():
+    table = make_table()
+
+    assert len(table) == 3
+    assert table.service_minutes.tolist() == [5.0, 9.5, 5.0]
+    assert table.minutes_per_km.tolist() == [2.0, 3.0, 2.0]
+    assert table.minutes_per_km.dtype == np.float32
+    assert table.coordinates.shape == (3, 2)
+
+
+def test_take_selects_rows_without_copying_deliveries():
+    table = make_table()
+    vehicle = table.take([2, 0])
+    nested = vehicle.take([1])
+
+    assert vehicle.rows.tolist() == [2, 0] and nested.rows.tolist() == [0]
+    assert vehicle.deliveries is DELIVERIES and nested.deliveries is DELIVERIES
+    assert vehicle.delivery(0) is DELIVERIES[2] and nested.delivery(0) is DELIVERIES[0]
+    assert vehicle.service_minutes.tolist() == [5.0, 5.0]
+    assert vehicle.coordinates.tolist() == [list(COORDINATES[2]), list(COORDINATES[0])]
+
+
+def test_materialize_builds_api_entries_in_route_order():
+    vehicle = make_table().take([1, 2])
+    entries = vehicle.materialize([1, 0], np.array([615.9, 1445.0]), extra=[{'wait_minutes': 0},
+                                                                             {'wait_minutes': 4}])
+
+    assert entries[0] == {
+        'delivery_id': 3, 'sequence': 1, 'customer_name': '', 'customer_phone': '',
+        'address': '3 Main St', 'estimated_time': '10:15', 'delivery_instructions': 'Side door',
+        'coordinates': COORDINATES[2], 'wait_minutes': 0
+    }
+    # Times past midnight wrap around the clock
+    assert (entries[1]['delivery_id'], entries[1]['estimated_time'], entries[1]['wait_minutes']) == (2, '00:05', 4)
+    assert vehicle.materialize([], np.array([])) == []
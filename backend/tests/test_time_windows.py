@@ -0,0 +1,105 @@
+import random
+import time
+import numpy as np
+from src.utils.route_optimizer import haversine_matrix
+from src.utils.time_windows import VRPTWSolver, format_minutes, minutes_of_day
+
+START_MINUTES = 9 * 60
+
+
+def make_instance(count, seed=0, windowed_fraction=0.5):
+    rnd = random.Random(seed)
+    points = [(49.1042, -122.6604)] + [(49.05 + rnd.random() * 0.25, -123.0 + rnd.random() * 0.5)
+                                      for _ in range(count)]
+    travel = haversine_matrix(points).astype(np.float64) * 2  # 30 km/h
+    windows = []
+    for _ in range(count):
+        if rnd.random() < windowed_fraction:
+            opens = rnd.randint(9 * 60, 15 * 60)
+            windows.append((opens, opens + rnd.choice([60, 90, 120])))
+        else:
+            windows.append((None, None))
+    return travel, [10.0] * count, windows
+
+
+def test_unlimited_fleet_serves_every_stop_on_time():
+    travel, service, windows = make_instance(200)
+    solver = VRPTWSolver(travel, service, windows, START_MINUTES)
+    routes = solver.solve()
+
+    assert sorted(node for route in routes for node in route) == list(range(1, 201))
+    for route in routes:
+        for node, stop in zip(route, solver.schedule(route)):
+            assert stop['lateness'] == 0
+            opens, closes = windows[node - 1]
+            if opens is not None:
+                assert opens <= stop['start'] <= closes
+
+
+def test_capacity_is_respected():
+    travel, service, windows = make_instance(60, seed=1)
+    demands = [random.Random(i).randint(1, 3) for i in range(60)]
+    routes = VRPTWSolver(travel, service, windows, START_MINUTES, demands=demands, capacity=12).solve()
+
+    assert sorted(node for route in routes for node in route) == list(range(1, 61))
+    assert all(sum(demands[node - 1] for node in route) <= 12 for route in routes)
+
+
+def test_fixed_fleet_reports_lateness_and_scales():
+    travel, service, windows = make_instance(1000, seed=2)
+    solver = VRPTWSolver(travel, service, windows, START_MINUTES, vehicle_count=5)
+    started = time.perf_counter()
+    routes = solver.solve()
+
+    assert time.perf_counter() - started < 5
+    assert len(routes) == 5
+    assert sorted(node for route in routes for node in route) == list(range(1, 1001))
+    late = [stop for route in routes for stop in solver.schedule(route) if stop['lateness'] > 0]
+    assert 0 < len(late) < 1000
+
+
+def test_insertion_goes_before_a_stop_only_while_its_window_allows():
+    # A lies on the way to B
+    travel = [[0, 5, 10], [5, 0, 5], [10, 5, 0]]
+    relaxed = VRPTWSolver(travel, [5, 5], [(None, None), (580, 590)], START_MINUTES, vehicle_count=1)
+    assert relaxed.solve() == [[1, 2]]
+
+    # Visiting A first would reach B at 09:15, after its window closes
+    tight = VRPTWSolver(travel, [5, 5], [(None, None), (550, 552)], START_MINUTES, vehicle_count=1)
+    routes = tight.solve()
+    assert routes == [[2, 1]]
+    assert [stop['lateness'] for stop in tight.schedule(routes[0])] == [0, 0]
+
+
+def test_stops_that_cannot_be_on_time_report_their_lateness():
+    travel = [[0, 10, 10], [10, 0, 10], [10, 10, 0]]
+    solver = VRPTWSolver(travel, [5, 5], [(None, 545), (None, None)], START_MINUTES, vehicle_count=1)
+    routes = solver.solve()
+
+    assert routes == [[1, 2]]
+    timeline = solver.schedule(routes[0])
+    assert timeline[0]['arrival'] == 550 and timeline[0]['lateness'] == 5
+    assert timeline[1]['lateness'] == 0
+
+
+def test_late_stops_open_a_vehicle_before_overloading_one():
+    travel = np.full((3, 3), 10.0)
+    np.fill_diagonal(travel, 0)
+    windows = [(None, 500), (None, 500)]  # Closed before the vehicles leave
+
+    solver = VRPTWSolver(travel, [5, 5], windows, START_MINUTES, vehicle_count=2, capacity=1)
+    routes = solver.solve()
+    assert sorted(routes) == [[1], [2]]
+    assert solver.over_capacity_stops == []
+
+    # With one vehicle the overload cannot be avoided, and is reported
+    solver = VRPTWSolver(travel, [5, 5], windows, START_MINUTES, vehicle_count=1, capacity=1)
+    routes = solver.solve()
+    assert len(routes) == 1 and sorted(routes[0]) == [1, 2]
+    assert len(solver.over_capacity_stops) == 1
+
+
+def test_minutes_round_trip():
+    assert minutes_of_day('09:30') == 570
+    assert format_minutes(570.4) == '09:30'
+    assert minutes_of_day(None) is None
@@ -0,0 +1,112 @@
+from datetime import date, time
+import numpy as np
+import pytest
+from src.models.database import db, TravelModelParameter
+from src.utils.travel_model import MINUTES_PER_KM_RANGE, TravelModel, fit_groups
+
+PRIOR = (5.0, 2.0)
+
+
+def synthetic_legs(count, service, minutes_per_km, zone='Surrey', driver=1, seed=0):
+    rng = np.random.default_rng(seed)
+    distance = rng.uniform(0.5, 6.0, count)
+    return {
+        'distance': distance,
+        'elapsed': service + minutes_per_km * distance,
+        'zone': np.array([zone] * count, dtype=object),
+        'driver': np.full(count, driver, dtype=np.int64),
+    }
+
+
+def concatenate(*legs):
+    return {name: np.concatenate([part[name] for part in legs]) for name in legs[0]}
+
+
+def test_fit_groups_recovers_each_groups_line():
+    first, second = synthetic_legs(200, 4.0, 1.5), synthetic_legs(200, 8.0, 3.0, seed=1)
+    groups = np.repeat([0, 1], 200)
+    service, speed, count = fit_groups(groups, np.concatenate([first['distance'], second['distance']]),
+                                       np.concatenate([first['elapsed'], second['elapsed']]), 3, PRIOR,
+                                       prior_weight=0.0001)
+
+    np.testing.assert_allclose(service[:2], [4.0, 8.0], rtol=1e-3)
+    np.testing.assert_allclose(speed[:2], [1.5, 3.0], rtol=1e-3)
+    # A group without legs keeps the prior
+    assert (service[2], speed[2], count[2]) == (5.0, 2.0, 0)
+
+
+def test_fit_groups_shrinks_small_groups_and_keeps_prior_speed_without_spread():
+    legs = synthetic_legs(5, 10.0, 4.0)
+    service, speed, _ = fit_groups(np.zeros(5, dtype=np.int64), legs['distance'], legs['elapsed'], 1, PRIOR)
+    weight = 5 / 25
+    assert service[0] == pytest.approx(weight * 10.0 + (1 - weight) * 5.0)
+    assert speed[0] == pytest.approx(weight * 4.0 + (1 - weight) * 2.0)
+
+    # Legs of one length cannot separate service time from speed
+    service, speed, _ = fit_groups(np.zeros(50, dtype=np.int64), np.full(50, 2.0), np.full(50, 12.0), 1, PRIOR)
+    assert speed[0] == pytest.approx(2.0)
+
+
+def test_fitted_speeds_are_clamped():
+    legs = synthetic_legs(100, 3.0, 40.0)
+    _, speed, _ = fit_groups(np.zeros(100, dtype=np.int64), legs['distance'], legs['elapsed'], 1, PRIOR,
+                             prior_weight=0.0001)
+    assert speed[0] == pytest.approx(MINUTES_PER_KM_RANGE[1], rel=1e-3)
+
+
+def test_legs_stay_within_a_drivers_day_and_drop_outliers():
+    # Driver 1 on day 1 (listed out of order), driver 2 on day 1, driver 1 on day 2
+    history = {
+        'day': np.array([1, 1, 1, 1, 1, 2, 2]),
+        'driver': np.array([1, 1, 1, 2, 2, 1, 1]),
+        'zone': np.array(['A', 'A', 'A', 'B', 'B', 'A', 'A'], dtype=object),
+        'minute': np.array([600.0, 610.0, 605.0, 600.0, 900.0, 600.0, 612.0]),
+        'latitude': np.array([49.10, 49.12, 49.11, 49.10, 49.11, 49.10, 49.10]),
+        'longitude': np.array([-122.70] * 7),
+    }
+    legs = TravelModel.legs(history)
+
+    # 10:00 -> 10:05 -> 10:10 for driver 1 on day 1 and 10:00 -> 10:12 on day 2;
+    # driver 2's five-hour gap is dropped
+    np.testing.assert_allclose(legs['elapsed'], [5.0, 5.0, 12.0])
+    np.testing.assert_allclose(legs['distance'][:2], [1.112, 1.112], rtol=1e-3)
+    assert legs['distance'][2] == 0
+    assert legs['driver'].tolist() == [1, 1, 1]
+
+
+def test_lookup_prefers_driver_then_zone_then_global():
+    model = TravelModel()
+    model.fit(concatenate(synthetic_legs(300, 4.0, 1.5, zone='Surrey', driver=1),
+                          synthetic_legs(300, 9.0, 3.0, zone='Langley', driver=2, seed=1)), prior_weight=1.0)
+
+    assert model.lookup(driver_id=1)['minutes_per_km'] == pytest.approx(1.5, rel=0.05)
+    assert model.lookup('Langley')['service_minutes'] == pytest.approx(9.0, rel=0.05)
+    assert model.lookup('Langley', driver_id=1) == model.parameters[('driver', '1')]
+    assert model.lookup('Delta', driver_id=3) == model.parameters[('global', '')]
+    assert model.parameters[('global', '')]['sample_count'] == 600
+
+    deliveries = model.annotate([{'delivery_zone': 'Surrey'}])
+    assert deliveries[0]['service_minutes'] == pytest.approx(4.0, rel=0.05)
+    assert TravelModel().lookup('Surrey') is None and TravelModel().fit(synthetic_legs(0, 0, 0)) == {}
+
+
+def test_fit_from_history_stores_parameters(app, make_customer, schedule_delivery):
+    day = date.today()
+    drops = [(49.10, time(10, 0)), (49.11, time(10, 6)), (49.13, time(10, 14)), (49.16, time(10, 25))]
+    for latitude, dropped_at in drops:
+        delivery = schedule_delivery(make_customer(latitude=latitude, longitude=-122.70), day)
+        delivery.delivery_zone = 'Surrey'
+        delivery.assigned_delivery_person_id = 7
+        delivery.actual_delivery_time = dropped_at
+        delivery.delivery_status = 'delivered'
+    db.session.commit()
+
+    parameters = TravelModel().fit_from_history()
+
+    assert parameters[('global', '')]['sample_count'] == 3
+    assert set(parameters) == {('global', ''), ('zone', 'Surrey'), ('driver', '7')}
+    assert TravelModelParameter.query.count() == 3
+    stored = TravelModel.from_database().parameters
+    assert stored.keys() == parameters.keys()
+    for key, values in parameters.items():
+        assert stored[key] == pytest.approx(values)
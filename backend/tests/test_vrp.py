@@ -0,0 +1,32 @@
+import random
+import numpy as np
+import pytest
+from src.utils.vrp import CVRPSolver
+
+
+def instance(count, seed):
+    rnd = random.Random(seed)
+    points = np.array([(50.0, 50.0)] + [(rnd.random() * 100, rnd.random() * 100) for _ in range(count)])
+    matrix = np.sqrt(((points[:, None, :] - points[None, :, :]) ** 2).sum(axis=2))
+    return matrix, [rnd.randint(1, 4) for _ in range(count)]
+
+
+@pytest.mark.parametrize('seed', range(4))
+def test_routes_respect_capacity_and_visit_every_stop_once(seed):
+    matrix, demands = instance(60, seed)
+    solver = CVRPSolver(matrix, demands, capacity=12, vehicle_count=20)
+
+    routes = solver.solve()
+
+    assert sorted(stop for route in routes for stop in route) == list(range(1, 61))
+    assert len(routes) <= 20
+    for route in routes:
+        assert sum(demands[stop - 1] for stop in route) <= 12
+
+
+def test_oversized_delivery_or_fleet_is_rejected():
+    matrix, demands = instance(10, 0)
+    with pytest.raises(ValueError):
+        CVRPSolver(matrix, [13] + demands[1:], capacity=12)
+    with pytest.raises(ValueError):
+        CVRPSolver(matrix, demands, capacity=2, vehicle_count=1)